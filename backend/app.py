@@ -1,63 +1,214 @@
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from datetime import datetime
-import random
+from datetime import timedelta
+import io
+import logging
 import os
+import queue
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Import database configuration and models
+# Import configuration, database configuration and models
+from config import Config
+from validation import (
+    ValidationError, parse_datetime, parse_duration, to_naive_utc, encode_cursor,
+    validate_location, validate_newsletter_signup, validate_reservation,
+    validate_availability_args, validate_availability_feed_args, validate_party_size, validate_party_fits, parse_interval,
+    validate_listing_filters, validate_listing_page, validate_report_range
+)
+from instrumentation import init_instrumentation, metrics
+from json_provider import FastJSONProvider, dumps
+from idempotency import DuplicateRequest, idempotent_request, replay
+from jobs import job_worker
+from consistency import HEADER as PIN_HEADER, route_reads, pin_to_primary
+from rate_limit import (
+    BOOKING_PER_IP, BOOKING_PER_EMAIL, SIGNUP_PER_IP, SIGNUP_PER_EMAIL,
+    rate_limiter, admission, limit_write, too_many_requests, overloaded
+)
 from database.db_config import db, init_app
+from database.locations import use_location, reading_own_writes
+from database.commands import register_commands
+from newsletter_import import format_from_content_type, import_newsletter_signups
+from availability_feed import AvailabilityFeed, KEEPALIVE
+from database.events import availability_bus
+from http_cache import (
+    PUBLIC_CACHE_CONTROL, FLOOR_PLAN_CACHE_CONTROL, PRIVATE_CACHE_CONTROL,
+    etag_for, etag_matches, cache_headers
+)
+from database.pool import all_pool_stats, pool_gauges
+from database.schedule import day_window
 from database.models import (
-    Customer, Reservation,
-    create_or_update_customer, create_reservation,
-    get_reservations_by_timeslot, get_used_tables,
-    add_newsletter_signup, get_all_reservations
+    book_table,
+    get_availability, get_floor_plan, load_schedule, max_duration, suggest_alternatives,
+    add_newsletter_signup, get_reservations_page, iter_reservation_dicts,
+    get_reservation_by_id, get_stored_response,
+    get_daily_report, get_hourly_report, job_stats,
+    occupancy_cache, response_etags, response_etag_key, cached_etag, remember_etag
 )
 
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
-CORS(app)  # Enable CORS for React frontend
+app.json = FastJSONProvider(app)  # orjson when installed, stdlib otherwise
+CORS(app, expose_headers=[PIN_HEADER])  # Enable CORS for React frontend (it reads the primary pin)
 
-# Initialize database
+# Initialize database (no connection is opened until the first request)
 init_app(app)
+register_commands(app)
+
+# Request timing, query counting and structured logging
+init_instrumentation(app)
+metrics.register_gauges(lambda: {
+    f'availability_cache_{name}': value
+    for name, value in occupancy_cache.stats().items()
+    if name in ('hits', 'misses', 'evictions', 'size')
+})
+metrics.register_gauges(lambda: pool_gauges(db.engines))
+metrics.register_gauges(lambda: {
+    f'availability_stream_{name}': int(value)
+    for name, value in availability_bus.stats().items()
+})
+
+metrics.register_gauges(lambda: {
+    f'job_worker_{name}': int(value)
+    for name, value in job_worker.stats().items()
+    if name in ('running', 'completed', 'retried', 'failed')
+})
+
+metrics.register_gauges(lambda: {
+    'rate_limit_limited': rate_limiter.stats()['limited'],
+    **{f'admission_{name}': value for name, value in admission.stats().items()}
+})
+
+# Write endpoints under admission control (they rate limit themselves once a
+# retry with a stored response has been answered)
+ADMITTED_ENDPOINTS = ('create_reservation_endpoint', 'newsletter_signup')
+
+# Shed bookings and signups when too many are in flight
+@app.before_request
+def admit_request():
+    if request.endpoint not in ADMITTED_ENDPOINTS or request.method != 'POST':
+        return None
+
+    if not admission.try_acquire():
+        return overloaded(Response)
+    g.admitted = True
+    return None
+
+@app.teardown_request
+def release_admission(error=None):
+    if g.pop('admitted', False):
+        admission.release()
+
+# Pin clients that wrote to the primary so their next reads see the write
+@app.after_request
+def pin_writers_to_primary(response):
+    if request.method == 'POST':
+        pin_to_primary(response)
+    return response
+
+# Background jobs run in this process unless `flask run-jobs` workers handle them
+@app.before_request
+def start_job_worker():
+    if Config.JOBS_IN_PROCESS:
+        job_worker.start(app)
 
 # Health check endpoint
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'ok', 'message': 'Backend is running'}), 200
 
+# Connection pool statistics for this worker
+@app.route('/api/health/pool', methods=['GET'])
+def pool_health():
+    return jsonify(all_pool_stats(db.engines)), 200
+
+# Background job queue of a location's database: counts by status and this process's worker
+@app.route('/api/health/jobs', methods=['GET'])
+def jobs_health():
+    try:
+        use_location(validate_location(request.args.get('location')))
+        return jsonify({**job_stats(), 'worker': job_worker.stats()}), 200
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error fetching job statistics")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Prometheus-style metrics for this worker
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4'), 200
+
 # Newsletter signup endpoint
 @app.route('/api/newsletter/signup', methods=['POST'])
 def newsletter_signup():
     try:
         data = request.get_json()
-
-        # Validate required fields
-        if not data or 'email' not in data:
-            return jsonify({'error': 'Email is required'}), 400
-
-        email = data['email'].strip()
-        name = data.get('name', '').strip()
-
-        # Basic email validation
-        if '@' not in email or '.' not in email:
-            return jsonify({'error': 'Invalid email format'}), 400
-
-        # Add to database
-        success = add_newsletter_signup(email, name)
+        email, name = validate_newsletter_signup(data)
+        location = validate_location(data.get('location'))
+        use_location(location)
+
+        # A retried request returns the stored response without signing up again
+        keyed_request = idempotent_request('POST /api/newsletter/signup', request.headers, data, location, email)
+        if keyed_request is not None:
+            stored = get_stored_response(keyed_request)
+            if stored is not None:
+                return replay(stored, keyed_request, Response)
+
+        retry_after = limit_write(request, SIGNUP_PER_IP, SIGNUP_PER_EMAIL, email)
+        if retry_after:
+            return too_many_requests(retry_after, Response)
+
+        # Add to database, storing the response for a keyed request in the same transaction
+        body = {
+            'message': 'Successfully subscribed to newsletter!',
+            'email': email
+        }
+        success = add_newsletter_signup(location, email, name, keyed_request, body)
 
         if success:
-            return jsonify({
-                'message': 'Successfully subscribed to newsletter!',
-                'email': email
-            }), 201
+            job_worker.wake()
+            return jsonify(body), 201
         else:
             return jsonify({'error': 'Failed to subscribe. Please try again.'}), 400
 
-    except Exception as e:
-        print(f"Error in newsletter signup: {str(e)}")
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error in newsletter signup")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Bulk newsletter import endpoint (CSV or NDJSON request body)
+@app.route('/api/newsletter/import', methods=['POST'])
+def newsletter_import():
+    try:
+        fmt = request.args.get('format') or format_from_content_type(request.content_type)
+        if not fmt:
+            return jsonify({'error': 'Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson'}), 400
+
+        batch_size = request.args.get('batch_size', type=int)
+        if batch_size is not None and batch_size < 1:
+            return jsonify({'error': 'Batch size must be a positive number'}), 400
+
+        location = validate_location(request.args.get('location'))
+        use_location(location)
+
+        # Read the body as a stream so large lists are never held in memory
+        lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        summary = import_newsletter_signups(location, lines, fmt, batch_size)
+        job_worker.wake()
+
+        return jsonify(summary), 200
+
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Request body must be UTF-8 encoded'}), 400
+    except Exception:
+        logger.exception("Error importing newsletter signups")
         return jsonify({'error': 'Internal server error'}), 500
 
 # Create reservation endpoint
@@ -65,144 +216,374 @@ def newsletter_signup():
 def create_reservation_endpoint():
     try:
         data = request.get_json()
-
-        # Validate required fields
-        required_fields = ['name', 'email', 'timeslot', 'guests']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({'error': f'{field.capitalize()} is required'}), 400
-
-        name = data['name'].strip()
-        email = data['email'].strip()
-        phone = data.get('phone', '').strip()
-        timeslot = data['timeslot']
-        guests = int(data['guests'])
-        newsletter_signup = data.get('newsletter_signup', False)
-
-        # Validate email format
-        if '@' not in email or '.' not in email:
-            return jsonify({'error': 'Invalid email format'}), 400
-
-        # Validate number of guests
-        if guests < 1 or guests > 20:
-            return jsonify({'error': 'Number of guests must be between 1 and 20'}), 400
-
-        # Parse and validate timeslot
-        try:
-            reservation_datetime = datetime.fromisoformat(timeslot.replace('Z', '+00:00'))
-        except ValueError:
-            return jsonify({'error': 'Invalid timeslot format'}), 400
-
-        # Check if timeslot is in the future
-        if reservation_datetime < datetime.now(reservation_datetime.tzinfo or None):
-            return jsonify({'error': 'Reservation must be in the future'}), 400
-
-        # Check table availability (30 tables total)
-        existing_reservations = get_reservations_by_timeslot(reservation_datetime)
-
-        if existing_reservations >= 30:
-            return jsonify({
-                'error': 'Sorry, all tables are booked for this time slot. Please choose another time.',
-                'available': False
-            }), 409
-
-        # Get used tables and find available ones
-        used_tables = get_used_tables(reservation_datetime)
-        available_tables = [t for t in range(1, 31) if t not in used_tables]
-
-        if not available_tables:
-            return jsonify({
-                'error': 'Sorry, all tables are booked for this time slot. Please choose another time.',
-                'available': False
-            }), 409
-
-        # Assign a random available table
-        table_number = random.choice(available_tables)
-
-        # Create or update customer
-        customer = create_or_update_customer(name, email, phone, newsletter_signup)
-
-        if not customer:
-            return jsonify({'error': 'Failed to create customer record'}), 500
-
-        # Create reservation
-        reservation = create_reservation(customer.customer_id, reservation_datetime, table_number, guests)
-
-        if reservation:
-            return jsonify({
+        reservation = validate_reservation(data)
+        location = reservation['location']
+        name = reservation['name']
+        timeslot = reservation['timeslot']
+        reservation_datetime = reservation['reservation_datetime']
+        guests = reservation['guests']
+
+        # Everything below reads and writes the location's database
+        use_location(location)
+
+        # A retried request returns the stored response without booking again
+        keyed_request = idempotent_request(
+            'POST /api/reservations', request.headers, data, location, reservation['email']
+        )
+        if keyed_request is not None:
+            stored = get_stored_response(keyed_request)
+            if stored is not None:
+                return replay(stored, keyed_request, Response)
+
+        retry_after = limit_write(request, BOOKING_PER_IP, BOOKING_PER_EMAIL, reservation['email'])
+        if retry_after:
+            return too_many_requests(retry_after, Response)
+
+        validate_party_fits(guests, get_floor_plan(location))
+
+        def confirmation(reservation_id, table_number):
+            return {
                 'success': True,
                 'message': 'Reservation confirmed successfully!',
-                'reservation_id': reservation.reservation_id,
+                'reservation_id': reservation_id,
+                'location': location,
                 'table_number': table_number,
                 'timeslot': timeslot,
+                'ends_at': reservation_datetime + reservation['duration'],
                 'guests': guests,
                 'customer_name': name
-            }), 201
-        else:
-            return jsonify({'error': 'Failed to create reservation'}), 500
+            }
 
-    except ValueError as ve:
-        return jsonify({'error': f'Invalid data format: {str(ve)}'}), 400
-    except Exception as e:
-        print(f"Error creating reservation: {str(e)}")
+        # Upsert the customer and claim a free table in one transaction
+        allocation = book_table(
+            location, name, reservation['email'], reservation['phone'], reservation['newsletter_signup'],
+            reservation_datetime, reservation['duration'], guests,
+            idempotent_request=keyed_request, confirmation=confirmation
+        )
+
+        if not allocation:
+            alternatives = suggest_alternatives(location, reservation_datetime, reservation['duration'], guests)
+            return jsonify({
+                'error': 'Sorry, no table for your party is free at this time. Please choose another time.',
+                'available': False,
+                'alternatives': alternatives
+            }), 409
+
+        # The confirmation email was enqueued with the booking; let the worker send it now
+        job_worker.wake()
+        return jsonify(confirmation(*allocation)), 201
+
+    except DuplicateRequest as duplicate:
+        return replay(duplicate.stored, keyed_request, Response)
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error creating reservation")
         return jsonify({'error': 'Internal server error'}), 500
 
-# Get all reservations (for admin purposes)
+# Get reservations (for admin purposes)
 @app.route('/api/reservations', methods=['GET'])
 def get_all_reservations_endpoint():
     try:
-        reservations = get_all_reservations()
-        return jsonify([r.to_dict() for r in reservations]), 200
-
-    except Exception as e:
-        print(f"Error fetching reservations: {str(e)}")
+        location = validate_location(request.args.get('location'))
+        filters = validate_listing_filters(request.args)
+        use_location(location)
+        route_reads(request)
+
+        # Stream every matching row as NDJSON for exports
+        if request.args.get('format') == 'ndjson':
+            def generate():
+                for reservation in iter_reservation_dicts(location, **filters):
+                    yield dumps(reservation) + '\n'
+
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson'), 200
+
+        # Otherwise return one keyset-paginated page
+        limit, after = validate_listing_page(request.args)
+
+        # An unchanged page is answered from the remembered ETag without a query
+        key = response_etag_key('listing', location, *sorted(request.args.items(multi=True)))
+        etag = None if reading_own_writes() else cached_etag(key)
+        if etag_matches(request, etag):
+            return cache_headers(Response(status=304), etag, PRIVATE_CACHE_CONTROL)
+
+        generation = response_etags.generation()
+        reservations, has_more = get_reservations_page(location, limit, after, **filters)
+        last = reservations[-1] if has_more else None
+
+        page = {
+            'reservations': [r.to_dict() for r in reservations],
+            'next_cursor': encode_cursor(last.timeslot, last.reservation_id) if last else None
+        }
+        etag = etag_for(page)
+        remember_etag(key, etag, generation)
+
+        if etag_matches(request, etag):
+            return cache_headers(Response(status=304), etag, PRIVATE_CACHE_CONTROL)
+        return cache_headers(jsonify(page), etag, PRIVATE_CACHE_CONTROL), 200
+
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error fetching reservations")
         return jsonify({'error': 'Internal server error'}), 500
 
 # Get single reservation by ID
 @app.route('/api/reservations/<int:reservation_id>', methods=['GET'])
 def get_reservation_by_id_endpoint(reservation_id):
     try:
-        reservation = Reservation.query.get(reservation_id)
+        location = validate_location(request.args.get('location'))
+        use_location(location)
+        route_reads(request)
+
+        # An unchanged reservation is answered from the remembered ETag without a query
+        key = response_etag_key('reservation', location, reservation_id)
+        etag = None if reading_own_writes() else cached_etag(key)
+        if etag_matches(request, etag):
+            return cache_headers(Response(status=304), etag, PRIVATE_CACHE_CONTROL)
+
+        generation = response_etags.generation()
+        reservation = get_reservation_by_id(location, reservation_id)
 
         if not reservation:
             return jsonify({'error': 'Reservation not found'}), 404
 
-        return jsonify(reservation.to_dict()), 200
+        data = reservation.to_dict()
+        etag = etag_for(data)
+        remember_etag(key, etag, generation, reservation.customer_id)
 
-    except Exception as e:
-        print(f"Error fetching reservation: {str(e)}")
+        if etag_matches(request, etag):
+            return cache_headers(Response(status=304), etag, PRIVATE_CACHE_CONTROL)
+        return cache_headers(jsonify(data), etag, PRIVATE_CACHE_CONTROL), 200
+
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error fetching reservation")
         return jsonify({'error': 'Internal server error'}), 500
 
 # Check availability for a specific timeslot
 @app.route('/api/reservations/availability', methods=['GET'])
 def check_availability():
     try:
-        timeslot = request.args.get('timeslot')
-
-        if not timeslot:
-            return jsonify({'error': 'Timeslot parameter is required'}), 400
+        location = validate_location(request.args.get('location'))
+        timeslot, reservation_datetime, duration = validate_availability_args(request.args)
 
-        # Parse timeslot
-        try:
-            reservation_datetime = datetime.fromisoformat(timeslot.replace('Z', '+00:00'))
-        except ValueError:
-            return jsonify({'error': 'Invalid timeslot format'}), 400
+        guests = validate_party_size(request.args)
 
-        existing_reservations = get_reservations_by_timeslot(reservation_datetime)
-        available_tables = 30 - existing_reservations
+        use_location(location)
+        route_reads(request)
+        validate_party_fits(guests, get_floor_plan(location))
+        availability = get_availability(location, reservation_datetime, duration, guests)
 
-        return jsonify({
+        # The answer depends only on the slot's occupancy, so its ETag is the same on every worker
+        data = {
+            'location': location,
             'timeslot': timeslot,
-            'total_tables': 30,
-            'booked_tables': existing_reservations,
-            'available_tables': available_tables,
-            'is_available': available_tables > 0
+            'duration_minutes': int(duration.total_seconds() // 60),
+            **availability
+        }
+        etag = etag_for(data)
+
+        if etag_matches(request, etag):
+            return cache_headers(Response(status=304), etag, PUBLIC_CACHE_CONTROL)
+        return cache_headers(jsonify(data), etag, PUBLIC_CACHE_CONTROL), 200
+
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error checking availability")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Check availability for every slot in a date range
+@app.route('/api/reservations/availability/range', methods=['GET'])
+def check_availability_range():
+    try:
+        location = validate_location(request.args.get('location'))
+        start = request.args.get('start')
+        end = request.args.get('end')
+
+        if not start or not end:
+            return jsonify({'error': 'Start and end parameters are required'}), 400
+
+        # Parse range boundaries
+        start_datetime = to_naive_utc(parse_datetime(start, 'Invalid start or end format'))
+        end_datetime = to_naive_utc(parse_datetime(end, 'Invalid start or end format'))
+        duration = parse_duration(request.args.get('duration'))
+        guests = validate_party_size(request.args)
+        interval = parse_interval(request.args.get('interval'))
+
+        if end_datetime < start_datetime:
+            return jsonify({'error': 'End must not be before start'}), 400
+
+        if end_datetime - start_datetime > timedelta(days=Config.MAX_AVAILABILITY_RANGE_DAYS):
+            return jsonify({
+                'error': f'Range cannot exceed {Config.MAX_AVAILABILITY_RANGE_DAYS} days'
+            }), 400
+
+        use_location(location)
+        route_reads(request)
+        floor_plan = get_floor_plan(location)
+        validate_party_fits(guests, floor_plan)
+
+        def generate():
+            # One query loads every booking that can overlap a slot in the range
+            schedule = load_schedule(location, start_datetime - max_duration(), end_datetime + duration)
+
+            yield dumps({
+                'location': location,
+                'start': start,
+                'end': end,
+                'interval_minutes': int(interval.total_seconds() // 60),
+                'duration_minutes': int(duration.total_seconds() // 60),
+                'total_tables': floor_plan.total_tables
+            })[:-1] + ', "slots": ['
+
+            slot = start_datetime
+            first = True
+            while slot <= end_datetime:
+                availability = floor_plan.availability(schedule.occupancy(slot, slot + duration), guests)
+                del availability['total_tables']
+
+                yield ('' if first else ', ') + dumps({'timeslot': slot, **availability})
+                first = False
+                slot += interval
+
+            yield ']}'
+
+        return Response(stream_with_context(generate()), mimetype='application/json'), 200
+
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error checking availability range")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Live availability for one day (Server-Sent Events)
+@app.route('/api/reservations/availability/stream', methods=['GET'])
+def availability_stream():
+    try:
+        location = validate_location(request.args.get('location'))
+        day, interval, duration, guests = validate_availability_feed_args(request.args)
+
+        # Stays on the primary: replicas cannot LISTEN, and a lagging snapshot
+        # could miss bookings announced before the subscription
+        use_location(location)
+        floor_plan = get_floor_plan(location)
+        validate_party_fits(guests, floor_plan)
+        feed = AvailabilityFeed(location, day, interval, duration, guests, floor_plan)
+        database_url = db.session.get_bind().url
+
+        def generate():
+            # Subscribe before the snapshot is loaded so no booking falls in between
+            subscription = availability_bus.subscribe(database_url)
+            try:
+                yield feed.snapshot(load_schedule(location, *day_window(day, max_duration())))
+                # Do not hold a pooled connection for the life of the stream
+                db.session.close()
+
+                while True:
+                    try:
+                        event = subscription.get(timeout=Config.SSE_KEEPALIVE_SECONDS)
+                    except queue.Empty:
+                        yield KEEPALIVE
+                        continue
+
+                    if subscription.overflowed:
+                        # Events were dropped: start over from the database
+                        subscription.reset()
+                        yield feed.snapshot(load_schedule(location, *day_window(day, max_duration())))
+                        db.session.close()
+                        continue
+
+                    message = feed.apply(event)
+                    if message:
+                        yield message
+            except Exception:
+                logger.exception("Error streaming availability")
+            finally:
+                availability_bus.unsubscribe(subscription)
+
+        return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
         }), 200
 
-    except Exception as e:
-        print(f"Error checking availability: {str(e)}")
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error opening availability stream")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Floor plan of a location: tables and seat counts by room
+@app.route('/api/floor-plan', methods=['GET'])
+def floor_plan():
+    try:
+        location = validate_location(request.args.get('location'))
+        use_location(location)
+
+        data = {'location': location, **get_floor_plan(location).to_dict()}
+        etag = etag_for(data)
+
+        if etag_matches(request, etag):
+            return cache_headers(Response(status=304), etag, FLOOR_PLAN_CACHE_CONTROL)
+        return cache_headers(jsonify(data), etag, FLOOR_PLAN_CACHE_CONTROL), 200
+
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error fetching floor plan")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Daily covers, reservations and repeat-customer rate for a date range (from the aggregates)
+@app.route('/api/reports/daily', methods=['GET'])
+def daily_report():
+    try:
+        location = validate_location(request.args.get('location'))
+        start, end = validate_report_range(request.args)
+
+        use_location(location)
+        route_reads(request)
+        data = {'location': location, **get_daily_report(location, start, end)}
+        etag = etag_for(data)
+
+        if etag_matches(request, etag):
+            return cache_headers(Response(status=304), etag, PRIVATE_CACHE_CONTROL)
+        return cache_headers(jsonify(data), etag, PRIVATE_CACHE_CONTROL), 200
+
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error building daily report")
         return jsonify({'error': 'Internal server error'}), 500
 
+# Table utilization per hour for a date range (from the aggregates)
+@app.route('/api/reports/hourly', methods=['GET'])
+def hourly_report():
+    try:
+        location = validate_location(request.args.get('location'))
+        start, end = validate_report_range(request.args)
+
+        use_location(location)
+        route_reads(request)
+        data = {'location': location, **get_hourly_report(location, start, end)}
+        etag = etag_for(data)
+
+        if etag_matches(request, etag):
+            return cache_headers(Response(status=304), etag, PRIVATE_CACHE_CONTROL)
+        return cache_headers(jsonify(data), etag, PRIVATE_CACHE_CONTROL), 200
+
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error building hourly report")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Availability cache statistics
+@app.route('/api/reservations/availability/cache', methods=['GET'])
+def availability_cache_stats():
+    return jsonify(occupancy_cache.stats()), 200
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
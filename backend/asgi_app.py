@@ -0,0 +1,346 @@
+"""
+Async (ASGI) serving mode for the reservations API
+Serves availability (including the live availability stream), booking and
+listing with async handlers on an async database pool; everything else stays
+on the WSGI app in app.py. Availability and listing read from the replica
+when one is configured (see consistency.py).
+Run with: hypercorn asgi_app:app --bind 0.0.0.0:5001 --workers 4
+"""
+
+from quart import Quart, Response, g, request, jsonify, make_response
+from quart_cors import cors
+import asyncio
+import logging
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from config import Config
+from validation import (
+    ValidationError, encode_cursor,
+    validate_location, validate_reservation, validate_availability_args, validate_availability_feed_args, validate_party_size,
+    validate_party_fits, validate_listing_filters, validate_listing_page
+)
+from instrumentation import init_async_instrumentation, metrics
+from jobs import create_job_app, job_worker
+from json_provider import FastJSONProvider
+from idempotency import DuplicateRequest, idempotent_request, replay
+from consistency import HEADER as PIN_HEADER, reads_from_replica, wrote_recently, pin_to_primary
+from rate_limit import (
+    BOOKING_PER_IP, BOOKING_PER_EMAIL, rate_limiter, admission, limit_write, too_many_requests, overloaded
+)
+from availability_feed import AvailabilityFeed, KEEPALIVE
+from http_cache import PUBLIC_CACHE_CONTROL, PRIVATE_CACHE_CONTROL, etag_for, etag_matches, cache_headers
+from database.async_db import create_location_dbs
+from database.locations import database_url
+from database.events import availability_bus
+from database.pool import pool_gauges
+from database.models import occupancy_cache, response_etags, response_etag_key, cached_etag, remember_etag
+from database.async_models import (
+    book_table, suggest_alternatives, get_stored_response,
+    get_availability, get_floor_plan, load_schedule, get_reservations_page
+)
+
+logger = logging.getLogger(__name__)
+
+app = Quart(__name__)
+app.json = FastJSONProvider(app)  # orjson when installed, stdlib otherwise
+app = cors(app, expose_headers=[PIN_HEADER])  # Enable CORS for React frontend (it reads the primary pin)
+
+# Request timing, query counting and structured logging, as on the WSGI app
+init_async_instrumentation(app)
+metrics.register_gauges(lambda: {
+    f'availability_cache_{name}': value
+    for name, value in occupancy_cache.stats().items()
+    if name in ('hits', 'misses', 'evictions', 'size')
+})
+metrics.register_gauges(lambda: pool_gauges(db.get('engines', {})))
+metrics.register_gauges(lambda: {
+    f'availability_stream_{name}': int(value)
+    for name, value in availability_bus.stats().items()
+})
+metrics.register_gauges(lambda: {
+    f'job_worker_{name}': int(value)
+    for name, value in job_worker.stats().items()
+    if name in ('running', 'completed', 'retried', 'failed')
+})
+metrics.register_gauges(lambda: {
+    'rate_limit_limited': rate_limiter.stats()['limited'],
+    **{f'admission_{name}': value for name, value in admission.stats().items()}
+})
+
+# Async engines, and session factories by location (created in each worker on startup)
+db = {}
+
+@app.before_serving
+async def open_database():
+    db['engines'], db['sessions'], db['replicas'] = create_location_dbs()
+
+# Background jobs run in each worker unless `flask run-jobs` workers handle them
+@app.before_serving
+async def start_job_worker():
+    if Config.JOBS_IN_PROCESS:
+        job_worker.start(create_job_app())
+
+@app.after_serving
+async def stop_job_worker():
+    if Config.JOBS_IN_PROCESS:
+        await asyncio.to_thread(job_worker.stop)
+
+@app.after_serving
+async def close_database():
+    for engine in db['engines'].values():
+        await engine.dispose()
+
+def read_sessions(location):
+    """Return the session factory for a read-only request: the replica unless its client wrote recently"""
+    return db['replicas' if reads_from_replica(request) else 'sessions'][location]
+
+# Pin clients that wrote to the primary so their next reads see the write
+@app.after_request
+async def pin_writers_to_primary(response):
+    if request.method == 'POST':
+        pin_to_primary(response)
+    return response
+
+# Shed bookings when too many are in flight (they rate limit themselves once a
+# retry with a stored response has been answered)
+@app.before_request
+async def admit_request():
+    if request.endpoint != 'create_reservation_endpoint' or request.method != 'POST':
+        return None
+
+    if not admission.try_acquire():
+        return overloaded(Response)
+    g.admitted = True
+    return None
+
+@app.teardown_request
+async def release_admission(error=None):
+    if g.pop('admitted', False):
+        admission.release()
+
+# Health check endpoint
+@app.route('/api/health', methods=['GET'])
+async def health_check():
+    return jsonify({'status': 'ok', 'message': 'Async backend is running'}), 200
+
+# Prometheus-style metrics for this worker
+@app.route('/api/metrics', methods=['GET'])
+async def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4'), 200
+
+# Create reservation endpoint
+@app.route('/api/reservations', methods=['POST'])
+async def create_reservation_endpoint():
+    try:
+        data = await request.get_json()
+        reservation = validate_reservation(data)
+        location = reservation['location']
+
+        keyed_request = idempotent_request(
+            'POST /api/reservations', request.headers, data, location, reservation['email']
+        )
+
+        def confirmation(reservation_id, table_number):
+            return {
+                'success': True,
+                'message': 'Reservation confirmed successfully!',
+                'reservation_id': reservation_id,
+                'location': location,
+                'table_number': table_number,
+                'timeslot': reservation['timeslot'],
+                'ends_at': reservation['reservation_datetime'] + reservation['duration'],
+                'guests': reservation['guests'],
+                'customer_name': reservation['name']
+            }
+
+        async with db['sessions'][location]() as session:
+            # A retried request returns the stored response without booking again
+            if keyed_request is not None:
+                stored = await get_stored_response(session, keyed_request)
+                if stored is not None:
+                    return replay(stored, keyed_request, Response)
+
+            retry_after = limit_write(request, BOOKING_PER_IP, BOOKING_PER_EMAIL, reservation['email'])
+            if retry_after:
+                return too_many_requests(retry_after, Response)
+
+            validate_party_fits(reservation['guests'], await get_floor_plan(session, location))
+
+            # Upsert the customer and claim a free table in one transaction
+            allocation = await book_table(
+                session, location, reservation['name'], reservation['email'], reservation['phone'],
+                reservation['newsletter_signup'], reservation['reservation_datetime'],
+                reservation['duration'], reservation['guests'],
+                idempotent_request=keyed_request, confirmation=confirmation
+            )
+
+            if not allocation:
+                alternatives = await suggest_alternatives(
+                    session, location, reservation['reservation_datetime'], reservation['duration'], reservation['guests']
+                )
+                return jsonify({
+                    'error': 'Sorry, no table for your party is free at this time. Please choose another time.',
+                    'available': False,
+                    'alternatives': alternatives
+                }), 409
+
+        # The confirmation email was enqueued with the booking; let the worker send it now
+        job_worker.wake()
+        return jsonify(confirmation(*allocation)), 201
+
+    except DuplicateRequest as duplicate:
+        return replay(duplicate.stored, keyed_request, Response)
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error creating reservation")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Get reservations (for admin purposes)
+@app.route('/api/reservations', methods=['GET'])
+async def get_all_reservations_endpoint():
+    try:
+        location = validate_location(request.args.get('location'))
+        filters = validate_listing_filters(request.args)
+        limit, after = validate_listing_page(request.args)
+
+        # An unchanged page is answered from the remembered ETag without a query
+        key = response_etag_key('listing', location, *sorted(request.args.items(multi=True)))
+        etag = None if wrote_recently(request) else cached_etag(key)
+        if etag_matches(request, etag):
+            return cache_headers(Response(status=304), etag, PRIVATE_CACHE_CONTROL)
+
+        generation = response_etags.generation()
+        async with read_sessions(location)() as session:
+            reservations, has_more = await get_reservations_page(session, location, limit, after, **filters)
+
+        last = reservations[-1] if has_more else None
+
+        page = {
+            'reservations': [r.to_dict() for r in reservations],
+            'next_cursor': encode_cursor(last.timeslot, last.reservation_id) if last else None
+        }
+        etag = etag_for(page)
+        remember_etag(key, etag, generation)
+
+        if etag_matches(request, etag):
+            return cache_headers(Response(status=304), etag, PRIVATE_CACHE_CONTROL)
+        return cache_headers(jsonify(page), etag, PRIVATE_CACHE_CONTROL), 200
+
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error fetching reservations")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Check availability for a specific timeslot
+@app.route('/api/reservations/availability', methods=['GET'])
+async def check_availability():
+    try:
+        location = validate_location(request.args.get('location'))
+        timeslot, reservation_datetime, duration = validate_availability_args(request.args)
+
+        guests = validate_party_size(request.args)
+
+        async with read_sessions(location)() as session:
+            validate_party_fits(guests, await get_floor_plan(session, location))
+            availability = await get_availability(
+                session, location, reservation_datetime, duration, guests, fresh=wrote_recently(request)
+            )
+
+        # The answer depends only on the slot's occupancy, so its ETag is the same on every worker
+        data = {
+            'location': location,
+            'timeslot': timeslot,
+            'duration_minutes': int(duration.total_seconds() // 60),
+            **availability
+        }
+        etag = etag_for(data)
+
+        if etag_matches(request, etag):
+            return cache_headers(Response(status=304), etag, PUBLIC_CACHE_CONTROL)
+        return cache_headers(jsonify(data), etag, PUBLIC_CACHE_CONTROL), 200
+
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error checking availability")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Live availability for one day (Server-Sent Events)
+@app.route('/api/reservations/availability/stream', methods=['GET'])
+async def availability_stream():
+    try:
+        location = validate_location(request.args.get('location'))
+        day, interval, duration, guests = validate_availability_feed_args(request.args)
+        sessions = db['sessions'][location]
+
+        async with sessions() as session:
+            floor_plan = await get_floor_plan(session, location)
+
+        validate_party_fits(guests, floor_plan)
+        feed = AvailabilityFeed(location, day, interval, duration, guests, floor_plan)
+
+        async def snapshot():
+            async with sessions() as session:
+                return feed.snapshot(await load_schedule(session, location, day))
+
+        async def generate():
+            # Subscribe before the snapshot is loaded so no booking falls in between
+            subscription = availability_bus.subscribe(
+                database_url(location) or os.getenv('DATABASE_URL'), asyncio.get_running_loop()
+            )
+            try:
+                yield (await snapshot()).encode()
+
+                while True:
+                    try:
+                        event = await subscription.get_async(Config.SSE_KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        yield KEEPALIVE.encode()
+                        continue
+
+                    if subscription.overflowed:
+                        # Events were dropped: start over from the database
+                        subscription.reset()
+                        yield (await snapshot()).encode()
+                        continue
+
+                    message = feed.apply(event)
+                    if message:
+                        yield message.encode()
+            except Exception:
+                logger.exception("Error streaming availability")
+            finally:
+                availability_bus.unsubscribe(subscription)
+
+        response = await make_response(generate(), 200, {
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        response.timeout = None  # The stream stays open until the client leaves
+        return response
+
+    except ValidationError as ve:
+        return jsonify({'error': ve.message}), 400
+    except Exception:
+        logger.exception("Error opening availability stream")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Error handlers
+@app.errorhandler(404)
+async def not_found(error):
+    return jsonify({'error': 'Endpoint not found'}), 404
+
+@app.errorhandler(500)
+async def internal_error(error):
+    return jsonify({'error': 'Internal server error'}), 500
+
+if __name__ == '__main__':
+    port = int(os.environ.get("ASYNC_PORT", 5001))
+    app.run(debug=True, host='0.0.0.0', port=port)
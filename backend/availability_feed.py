@@ -0,0 +1,77 @@
+"""
+Live availability feed shared by the WSGI (app.py) and ASGI (asgi_app.py)
+Server-Sent Events streams
+A stream covers the slots of one service day at one location. It starts with a snapshot of
+every slot, then applies each booking event (see database/events.py) to its
+own copy of the day's schedule and pushes only the slots the booking changed,
+so keeping a browser up to date costs no database queries after the snapshot.
+"""
+
+from datetime import datetime, timedelta
+
+from json_provider import dumps
+
+KEEPALIVE = ': keepalive\n\n'
+
+def sse_message(event, data):
+    """Format one Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+class AvailabilityFeed:
+    """Per-stream availability state for the slots of one service day"""
+
+    def __init__(self, location, day, interval, duration, guests, floor_plan):
+        self.location = location
+        self.day = day
+        self.duration = duration
+        self.guests = guests
+        self.floor_plan = floor_plan
+        self.schedule = None
+
+        self.slots = []
+        slot = day
+        while slot < day + timedelta(days=1):
+            self.slots.append(slot)
+            slot += interval
+        self.interval_minutes = int(interval.total_seconds() // 60)
+
+    def snapshot(self, schedule):
+        """
+        Take over a freshly loaded schedule of the day (see day_window)
+        Returns the 'snapshot' message with every slot
+        """
+        self.schedule = schedule
+        return sse_message('snapshot', {
+            'location': self.location,
+            'date': self.day.date().isoformat(),
+            'interval_minutes': self.interval_minutes,
+            'duration_minutes': int(self.duration.total_seconds() // 60),
+            'total_tables': self.floor_plan.total_tables,
+            'slots': [self._slot(slot) for slot in self.slots]
+        })
+
+    def apply(self, event):
+        """
+        Apply a booking event to the schedule
+        Returns the 'slots' message with the changed slots, or None when the
+        booking is at another location or does not touch this day
+        """
+        if event.get('location') != self.location:
+            return None
+
+        start = datetime.fromisoformat(event['timeslot'])
+        end = datetime.fromisoformat(event['ends_at'])
+        changed = [slot for slot in self.slots if slot < end and slot + self.duration > start]
+        if not changed:
+            return None
+
+        self.schedule.add(event['table_number'], start, end)
+        return sse_message('slots', {'slots': [self._slot(slot) for slot in changed]})
+
+    def _slot(self, slot):
+        """Return the availability of one slot"""
+        availability = self.floor_plan.availability(
+            self.schedule.occupancy(slot, slot + self.duration), self.guests
+        )
+        del availability['total_tables']
+        return {'timeslot': slot.isoformat(), **availability}
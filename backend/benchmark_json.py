@@ -0,0 +1,113 @@
+"""
+Micro-benchmark of reservation serialization
+Builds N in-memory reservations (no database needed) and times to_dict() plus
+JSON encoding of a listing response for:
+- baseline: isoformat() per datetime field and the stdlib encoder (the
+  serialization path before the orjson provider)
+- stdlib:   native datetimes through FastJSONProvider without orjson
+- orjson:   native datetimes through FastJSONProvider with orjson
+Both the ORM path (Reservation.to_dict) and the lean row path
+(reservation_row_to_dict, used by the NDJSON export) are measured.
+
+Run:
+    python benchmark_json.py --reservations 100000
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import time
+
+# The models only need a database URL to configure; nothing is queried
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from flask import Flask
+
+import json_provider
+from json_provider import FastJSONProvider
+from database.models import Customer, Reservation, reservation_row_to_dict
+
+def build_reservations(count):
+    """Return count transient reservations (with customers) and the same data as rows"""
+    start = datetime(2025, 1, 1, 17, 0)
+    customers = [
+        Customer(customer_id=n, customer_name=f'Guest {n}', email=f'guest{n}@example.com',
+                 phone_number='202-555-0100', created_at=start)
+        for n in range(1, 1001)
+    ]
+
+    reservations, rows = [], []
+    for n in range(count):
+        customer = customers[n % len(customers)]
+        timeslot = start + timedelta(minutes=30 * (n // 30))
+        created_at = start - timedelta(days=7, microseconds=n)
+        reservations.append(Reservation(
+            reservation_id=n + 1, location='main', customer_id=customer.customer_id, customer=customer,
+            timeslot=timeslot, ends_at=timeslot + timedelta(minutes=90),
+            table_number=n % 30 + 1, number_of_guests=2, created_at=created_at
+        ))
+        rows.append((
+            n + 1, 'main', customer.customer_id, timeslot, timeslot + timedelta(minutes=90), n % 30 + 1, 2,
+            created_at, customer.customer_name, customer.email, customer.phone_number
+        ))
+    return reservations, rows
+
+def baseline_dict(data):
+    """Apply the isoformat() calls to_dict made before the orjson provider"""
+    for key in ('timeslot', 'ends_at', 'created_at'):
+        data[key] = data[key].isoformat() if data[key] else None
+    return data
+
+def best_of(repeat, function):
+    """Return the fastest of repeat runs of function, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reservations', type=int, default=100000, help='reservations to serialize')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case (the fastest is reported)')
+    args = parser.parse_args()
+
+    reservations, rows = build_reservations(args.reservations)
+    provider = FastJSONProvider(Flask(__name__))
+    orjson = json_provider.orjson
+
+    def stdlib_provider():
+        json_provider.orjson = None
+        try:
+            return provider.dumps({'reservations': [r.to_dict() for r in reservations]})
+        finally:
+            json_provider.orjson = orjson
+
+    cases = [
+        ('to_dict, baseline', lambda: json.dumps(
+            {'reservations': [baseline_dict(r.to_dict()) for r in reservations]}, separators=(',', ':'))),
+        ('to_dict, stdlib provider', stdlib_provider),
+    ]
+    if orjson is not None:
+        cases.append(('to_dict, orjson provider',
+                      lambda: provider.dumps({'reservations': [r.to_dict() for r in reservations]})))
+
+    cases.append(('row NDJSON, baseline', lambda: [
+        json.dumps(baseline_dict(reservation_row_to_dict(row))) for row in rows]))
+    if orjson is not None:
+        cases.append(('row NDJSON, orjson', lambda: [
+            json_provider.dumps(reservation_row_to_dict(row)) for row in rows]))
+
+    print(f"Serializing {args.reservations} reservations (best of {args.repeat})"
+          f"{'' if orjson else ' - orjson is not installed'}\n")
+    results = {}
+    for name, function in cases:
+        results[name] = best_of(args.repeat, function)
+        path = name.split(',')[0]
+        speedup = results[f'{path}, baseline'] / results[name]
+        print(f"  {name:28} {results[name] * 1000:9.1f} ms  {speedup:5.2f}x")
+
+if __name__ == '__main__':
+    main()
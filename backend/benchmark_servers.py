@@ -0,0 +1,113 @@
+"""
+Load benchmark comparing the WSGI (app.py) and ASGI (asgi_app.py) servers
+Start both servers against the same database first, e.g.:
+    gunicorn -w 4 -b 0.0.0.0:5000 app:app
+    hypercorn -w 4 -b 0.0.0.0:5001 asgi_app:app
+Then run:
+    python benchmark_servers.py --target wsgi=http://localhost:5000 --target asgi=http://localhost:5001
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+import httpx
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a sorted list"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+def random_timeslot(days=14):
+    """Return an evening timeslot in the next few days, on the half hour"""
+    day = datetime.now() + timedelta(days=random.randint(1, days))
+    return day.replace(hour=random.randint(17, 21), minute=random.choice([0, 30]),
+                       second=0, microsecond=0).isoformat()
+
+async def availability(client):
+    return await client.get('/api/reservations/availability', params={'timeslot': random_timeslot()})
+
+async def booking(client):
+    return await client.post('/api/reservations', json={
+        'name': 'Load Test',
+        'email': f'load-{uuid.uuid4().hex[:12]}@example.com',
+        'timeslot': random_timeslot(),
+        'guests': random.randint(1, 6)
+    })
+
+async def listing(client):
+    return await client.get('/api/reservations', params={'limit': 50})
+
+# (operation, weight) - availability reads dominate real traffic
+WORKLOAD = [(availability, 80), (booking, 10), (listing, 10)]
+
+async def run_target(base_url, total_requests, concurrency):
+    """Fire total_requests mixed requests with at most concurrency in flight"""
+    operations = random.choices([op for op, _ in WORKLOAD],
+                                weights=[w for _, w in WORKLOAD], k=total_requests)
+    latencies = {op.__name__: [] for op, _ in WORKLOAD}
+    errors = 0
+    queue = asyncio.Queue()
+    for operation in operations:
+        queue.put_nowait(operation)
+
+    async def worker(client):
+        nonlocal errors
+        while not queue.empty():
+            operation = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await operation(client)
+                if response.status_code >= 500:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies[operation.__name__].append((time.perf_counter() - start) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, errors, elapsed
+
+def print_report(label, latencies, errors, elapsed):
+    total = sum(len(v) for v in latencies.values())
+    print(f"\n{label}: {total} requests in {elapsed:.2f}s "
+          f"({total / elapsed:.1f} req/s), {errors} errors")
+    print(f"  {'operation':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for name, values in latencies.items():
+        values.sort()
+        if not values:
+            continue
+        print(f"  {name:<14}{len(values):>7}{percentile(values, 50):>10.1f}"
+              f"{percentile(values, 95):>10.1f}{percentile(values, 99):>10.1f}"
+              f"{statistics.mean(values):>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', required=True,
+                        help='label=base_url of a running server (repeatable)')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per target')
+    parser.add_argument('--concurrency', type=int, default=64, help='requests in flight')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("  Café Fausse WSGI vs ASGI Benchmark")
+    print("=" * 60)
+    print(f"{args.requests} requests per target, concurrency {args.concurrency}")
+
+    for target in args.target:
+        label, _, base_url = target.partition('=')
+        latencies, errors, elapsed = asyncio.run(run_target(base_url, args.requests, args.concurrency))
+        print_report(label, latencies, errors, elapsed)
+
+if __name__ == '__main__':
+    main()
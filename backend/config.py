@@ -17,11 +17,126 @@ class Config:
     DB_HOST = os.getenv('DB_HOST', 'localhost')
     DB_PORT = os.getenv('DB_PORT', '5432')
 
+    # Connection pool configuration (per worker process)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))
+
+    # Locations served by this deployment (the first is the default for requests
+    # without a location). LOCATION_DATABASE_URLS gives locations their own
+    # database as 'location=url,...'; the others share DATABASE_URL
+    LOCATIONS = [name.strip() for name in os.getenv('LOCATIONS', 'main').split(',') if name.strip()]
+    DEFAULT_LOCATION = LOCATIONS[0]
+    LOCATION_DATABASE_URLS = dict(
+        entry.strip().split('=', 1)
+        for entry in os.getenv('LOCATION_DATABASE_URLS', '').split(',') if entry.strip()
+    )
+
+    # Read replicas: availability, reservation lookups, the listing and reports
+    # read from REPLICA_DATABASE_URL (the replica of DATABASE_URL) and from
+    # LOCATION_REPLICA_URLS ('location=url,...') for locations with their own
+    # database. A client that wrote is pinned to the primary for
+    # REPLICA_STICKY_SECONDS, which should exceed the replication lag
+    REPLICA_DATABASE_URL = os.getenv('REPLICA_DATABASE_URL', '')
+    LOCATION_REPLICA_URLS = dict(
+        entry.strip().split('=', 1)
+        for entry in os.getenv('LOCATION_REPLICA_URLS', '').split(',') if entry.strip()
+    )
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '10'))
+
     # CORS configuration
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(',')
 
-    # Restaurant configuration
-    TOTAL_TABLES = 30
+    # Restaurant configuration (tables and seats live in the dining_tables floor plan)
+    FLOOR_PLAN_TTL = int(os.getenv('FLOOR_PLAN_TTL', '300'))
+
+    # Reservation durations and alternative slot suggestions (minutes)
+    RESERVATION_MINUTES = int(os.getenv('RESERVATION_MINUTES', '90'))
+    MIN_RESERVATION_MINUTES = int(os.getenv('MIN_RESERVATION_MINUTES', '30'))
+    MAX_RESERVATION_MINUTES = int(os.getenv('MAX_RESERVATION_MINUTES', '240'))
+    ALTERNATIVE_STEP_MINUTES = int(os.getenv('ALTERNATIVE_STEP_MINUTES', '15'))
+    ALTERNATIVE_SEARCH_MINUTES = int(os.getenv('ALTERNATIVE_SEARCH_MINUTES', '180'))
+    ALTERNATIVE_COUNT = int(os.getenv('ALTERNATIVE_COUNT', '3'))
+    MAX_AVAILABILITY_RANGE_DAYS = int(os.getenv('MAX_AVAILABILITY_RANGE_DAYS', '31'))
+
+    # Availability cache configuration
+    AVAILABILITY_CACHE_SIZE = int(os.getenv('AVAILABILITY_CACHE_SIZE', '4096'))
+    AVAILABILITY_CACHE_TTL = int(os.getenv('AVAILABILITY_CACHE_TTL', '30'))
+
+    # Live availability stream (Server-Sent Events) configuration
+    SSE_KEEPALIVE_SECONDS = int(os.getenv('SSE_KEEPALIVE_SECONDS', '15'))
+    SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', '100'))
+    SSE_LISTENER_RETRY_SECONDS = int(os.getenv('SSE_LISTENER_RETRY_SECONDS', '5'))
+
+    # HTTP caching: ETags of reservation responses are remembered per worker for
+    # ETAG_CACHE_TTL seconds; availability may be reused by browsers and CDNs
+    ETAG_CACHE_SIZE = int(os.getenv('ETAG_CACHE_SIZE', '4096'))
+    ETAG_CACHE_TTL = int(os.getenv('ETAG_CACHE_TTL', '30'))
+    AVAILABILITY_MAX_AGE = int(os.getenv('AVAILABILITY_MAX_AGE', '5'))
+    AVAILABILITY_STALE_WHILE_REVALIDATE = int(os.getenv('AVAILABILITY_STALE_WHILE_REVALIDATE', '25'))
+
+    # Idempotency-Key support: stored responses are replayed for this long
+    IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+
+    # Reporting: longest date range a daily or hourly report may cover
+    MAX_REPORT_RANGE_DAYS = int(os.getenv('MAX_REPORT_RANGE_DAYS', '366'))
+
+    # Background jobs: JOBS_IN_PROCESS runs a worker pool inside each web process
+    # (the default only on SQLite); otherwise run `flask run-jobs`. Failed jobs
+    # are retried with exponential backoff up to JOB_MAX_ATTEMPTS times
+    JOBS_IN_PROCESS = os.getenv(
+        'JOBS_IN_PROCESS', str(os.getenv('DATABASE_URL', '').startswith('sqlite'))
+    ).lower() == 'true'
+    JOB_CONCURRENCY = int(os.getenv('JOB_CONCURRENCY', '4'))
+    JOB_BATCH_SIZE = int(os.getenv('JOB_BATCH_SIZE', '50'))
+    JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '2'))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+    JOB_BACKOFF_SECONDS = float(os.getenv('JOB_BACKOFF_SECONDS', '10'))
+    JOB_BACKOFF_MAX_SECONDS = float(os.getenv('JOB_BACKOFF_MAX_SECONDS', '3600'))
+    JOB_LOCK_TIMEOUT_SECONDS = int(os.getenv('JOB_LOCK_TIMEOUT_SECONDS', '300'))
+
+    # Outbound mail and newsletter provider stand-ins: simulated latency per call
+    OUTBOUND_LATENCY_MS = float(os.getenv('OUTBOUND_LATENCY_MS', '0'))
+
+    # Rate limiting: token buckets per client IP and per email, in requests per
+    # minute (bursts of the same size; 0 turns a limit off). Buckets are kept per
+    # process unless RATE_LIMIT_STORAGE_URL points at Redis. Behind a proxy, set
+    # TRUSTED_PROXY_COUNT so client IPs are read from X-Forwarded-For
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    RATE_LIMIT_STORAGE_URL = os.getenv('RATE_LIMIT_STORAGE_URL', '')
+    RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+    BOOKING_LIMIT_PER_IP = int(os.getenv('BOOKING_LIMIT_PER_IP', '20'))
+    BOOKING_LIMIT_PER_EMAIL = int(os.getenv('BOOKING_LIMIT_PER_EMAIL', '5'))
+    SIGNUP_LIMIT_PER_IP = int(os.getenv('SIGNUP_LIMIT_PER_IP', '10'))
+    SIGNUP_LIMIT_PER_EMAIL = int(os.getenv('SIGNUP_LIMIT_PER_EMAIL', '3'))
+    TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '0'))
+
+    # Admission control: booking and signup requests in flight per process beyond
+    # which new ones are shed with a 503 (default: the connection pool size plus
+    # overflow, so they never queue for a connection; 0 means no cap)
+    MAX_CONCURRENT_WRITES = int(os.getenv('MAX_CONCURRENT_WRITES', str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+    SHED_RETRY_AFTER_SECONDS = int(os.getenv('SHED_RETRY_AFTER_SECONDS', '1'))
+
+    # Reservation listing configuration
+    RESERVATIONS_PAGE_SIZE = int(os.getenv('RESERVATIONS_PAGE_SIZE', '50'))
+    RESERVATIONS_MAX_PAGE_SIZE = int(os.getenv('RESERVATIONS_MAX_PAGE_SIZE', '500'))
+
+    # Newsletter bulk import configuration
+    NEWSLETTER_IMPORT_BATCH_SIZE = int(os.getenv('NEWSLETTER_IMPORT_BATCH_SIZE', '1000'))
+    NEWSLETTER_IMPORT_MAX_ERRORS = int(os.getenv('NEWSLETTER_IMPORT_MAX_ERRORS', '1000'))
+
+    # Logging and instrumentation configuration
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '0.1'))
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '100'))
+    SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '500'))
+    PROFILE_REQUESTS = os.getenv('PROFILE_REQUESTS', 'False').lower() == 'true'
+    PROFILE_THRESHOLD_MS = float(os.getenv('PROFILE_THRESHOLD_MS', '500'))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
 
     # API configuration
     API_VERSION = 'v1'
@@ -0,0 +1,51 @@
+"""
+Read-your-writes for replica reads, shared by the WSGI (app.py) and ASGI
+(asgi_app.py) servers
+Availability, reservation lookups, the listing and reports may read from a
+replica (see database/locations.py), which lags the primary. A POST answered by
+either server pins the client to the primary for REPLICA_STICKY_SECONDS, so its
+reads see its own booking or signup; other clients keep reading from the
+replica. The pin is sent both as a cookie (for same-site clients) and as the
+Read-Primary-Until response header, which cross-origin clients such as the
+React app send back as a request header (cookies are not sent on their
+requests). The pin is only a routing hint, so it is neither signed nor tied to
+the client: forging it only costs a primary read.
+"""
+
+import time
+
+from config import Config
+from database.locations import replicas_enabled, use_replica
+
+COOKIE = 'read_primary_until'
+HEADER = 'Read-Primary-Until'
+
+def wrote_recently(request):
+    """Return True while a Flask or Quart request's client is pinned to the primary"""
+    try:
+        pinned_until = max(float(request.headers.get(HEADER, 0)), float(request.cookies.get(COOKIE, 0)))
+    except ValueError:
+        return False
+    return pinned_until > time.time()
+
+def reads_from_replica(request):
+    """Return True when the request's reads may go to a replica"""
+    return replicas_enabled() and not wrote_recently(request)
+
+def pin_to_primary(response):
+    """Set the cookie and header pinning the client's reads to the primary and return the response"""
+    if replicas_enabled() and Config.REPLICA_STICKY_SECONDS > 0:
+        pinned_until = f'{time.time() + Config.REPLICA_STICKY_SECONDS:.3f}'
+        response.set_cookie(
+            COOKIE, pinned_until, max_age=Config.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax'
+        )
+        response.headers[HEADER] = pinned_until
+    return response
+
+def route_reads(request):
+    """
+    Send the reads of a read-only Flask request to the replica of its location's
+    database, or keep them on the primary while its client is pinned there
+    """
+    if replicas_enabled():
+        use_replica(not wrote_recently(request))
@@ -0,0 +1,76 @@
+"""
+Async engine and session factory for the ASGI server (asgi_app.py)
+Uses asyncpg for PostgreSQL and aiosqlite for SQLite
+"""
+
+import os
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from config import Config
+from database.locations import bind_key, database_url, replica_bind_key, replica_url
+from database.pool import engine_options
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite'
+}
+
+def async_database_url(database_url):
+    """
+    Swap the sync driver in DATABASE_URL for its async counterpart
+    Returns the rewritten URL
+    """
+    scheme, separator, rest = database_url.partition('://')
+    return ASYNC_DRIVERS.get(scheme, scheme) + separator + rest
+
+def create_async_db(database_url=None):
+    """
+    Create the async engine and session factory from DATABASE_URL
+    Pool settings come from the same Config values as the sync engine
+    Returns (engine, session_factory)
+    """
+    database_url = database_url or os.getenv('DATABASE_URL')
+    options = engine_options(database_url)
+
+    # Async engines need their own pool class and asyncpg takes server settings directly
+    options.pop('poolclass', None)
+    if 'connect_args' in options:
+        options['connect_args'] = {
+            'server_settings': {'statement_timeout': str(Config.DB_STATEMENT_TIMEOUT_MS)}
+        }
+
+    engine = create_async_engine(async_database_url(database_url), **options)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    return engine, session_factory
+
+def create_location_dbs():
+    """
+    Create one async engine and session factory per database: locations in
+    LOCATION_DATABASE_URLS get their own, the others share DATABASE_URL.
+    Reads that tolerate lag use the replica factories, which are the primary's
+    for databases without a replica
+    Engines are named like the sync binds: None for DATABASE_URL,
+    'location:<name>' and 'replica'/'replica:<name>' (see database/locations.py)
+    Returns (engines by bind key, session factories by location, replica session factories by location)
+    """
+    created, engines = {}, {}
+    session_factories, replica_factories = {}, {}
+
+    def database(key, url):
+        if url not in created:
+            created[url] = create_async_db(url)
+            engines[key] = created[url][0]
+        return created[url][1]
+
+    for location in Config.LOCATIONS:
+        primary = database_url(location)
+        primary_key = bind_key(location) if primary else None
+        session_factories[location] = database(primary_key, primary or os.getenv('DATABASE_URL'))
+        replica = replica_url(location)
+        replica_factories[location] = (
+            database(replica_bind_key(location), replica) if replica else session_factories[location]
+        )
+    return engines, session_factories, replica_factories
@@ -0,0 +1,245 @@
+"""
+Async versions of the helpers in database/models.py
+They execute the same statement builders through an AsyncSession, so the
+WSGI and ASGI servers share one set of queries and allocation rules. Callers
+pass a session of the location's database (see async_db.create_location_dbs)
+"""
+
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from database.floor_plan import FloorPlan
+from database.schedule import Schedule, day_window
+from database.events import availability_bus, booking_event, notify_statement
+from database.reports import ReportAccumulator, booking_increments
+from database.models import (
+    Customer, HourlyOccupancy, occupancy_cache, floor_plan_cache, floor_plan_query,
+    customer_upsert_statement, claim_table_statement, timeslot_lock_statement, bookings_query,
+    customer_by_email_query, reservations_page_query,
+    service_day, max_duration, invalidate_schedules, invalidate_response_etags, alternative_slots,
+    stored_response_query, store_response_statement, repeat_booking_expression, report_increment_statement,
+    booking_job_statements
+)
+from idempotency import DuplicateRequest
+
+logger = logging.getLogger(__name__)
+
+async def upsert_customer(session, location, name, email, phone='', newsletter_signup=False):
+    """
+    Create a new customer or update existing customer of a location in the current transaction
+    Returns the customer_id
+    """
+    statement = customer_upsert_statement(
+        session.bind.dialect.name, location, name, email, phone, newsletter_signup
+    )
+    if statement is not None:
+        return (await session.execute(statement)).scalar_one()
+
+    customer = (await session.execute(customer_by_email_query(location, email))).scalar_one_or_none()
+    if customer:
+        if newsletter_signup:
+            customer.newsletter_signup = True
+        if phone:
+            customer.phone_number = phone
+        if name:
+            customer.customer_name = name
+    else:
+        customer = Customer(
+            location=location,
+            customer_name=name if name else 'Guest',
+            email=email,
+            phone_number=phone if phone else None,
+            newsletter_signup=newsletter_signup
+        )
+        session.add(customer)
+
+    await session.flush()
+    return customer.customer_id
+
+async def get_floor_plan(session, location):
+    """
+    Get a location's floor plan, from the cache when possible
+    Returns a FloorPlan
+    """
+    async def load_floor_plan():
+        return FloorPlan((await session.execute(floor_plan_query(location))).all())
+
+    return await floor_plan_cache.get_or_load_async(location, load_floor_plan)
+
+async def load_schedule(session, location, day):
+    """
+    Load every booking at a location that can overlap a reservation starting on day
+    Returns a Schedule
+    """
+    rows = await session.execute(bookings_query(location, *day_window(day, max_duration())))
+    return Schedule(rows.all())
+
+async def get_schedule(session, location, day, fresh=False):
+    """
+    Get a location's booking schedule around a service day, from the cache when
+    possible; fresh=True reads it from session (the client just wrote, see
+    models.get_schedule)
+    Returns a Schedule
+    """
+    if fresh:
+        generation = occupancy_cache.generation()
+        schedule = await load_schedule(session, location, day)
+        occupancy_cache.put_if_current((location, day), schedule, generation)
+        return schedule
+    return await occupancy_cache.get_or_load_async((location, day), lambda: load_schedule(session, location, day))
+
+async def announce_booking(session, location, table_number, timeslot, ends_at):
+    """
+    Commit the current booking transaction and announce the booking to the
+    live availability streams (see models.announce_booking)
+    """
+    event = booking_event(location, table_number, timeslot, ends_at)
+    notify = session.bind.dialect.name == 'postgresql'
+    if notify:
+        await session.execute(notify_statement(event))
+
+    await session.commit()
+    invalidate_schedules(location, timeslot)
+
+    if not notify:
+        availability_bus.publish(event)
+
+async def record_booking_report(session, location, customer_id, reservation_id, timeslot, ends_at, guests):
+    """Add a booking to the location's reporting aggregates in the current transaction (the caller commits)"""
+    statement = report_increment_statement(
+        session.bind.dialect.name, location, customer_id, reservation_id, timeslot, ends_at, guests
+    )
+    if statement is not None:
+        await session.execute(statement)
+        return
+
+    repeat = (await session.execute(select(repeat_booking_expression(customer_id, reservation_id)))).scalar()
+    for increment in booking_increments(timeslot, ends_at, guests, repeat):
+        row = await session.get(HourlyOccupancy, (location, increment['service_date'], increment['hour']))
+        if row is None:
+            session.add(HourlyOccupancy(location=location, **increment))
+        else:
+            for column in ReportAccumulator.COLUMNS:
+                setattr(row, column, getattr(row, column) + increment[column])
+    await session.flush()
+
+async def get_stored_response(session, idempotent_request):
+    """
+    Get the unexpired stored response for a request's key
+    Returns a (request_hash, status_code, response_body) row or None
+    """
+    return (await session.execute(stored_response_query(idempotent_request))).first()
+
+async def book_table(session, location, name, email, phone, newsletter_signup, timeslot, duration,
+                     number_of_guests, max_retries=3, idempotent_request=None, confirmation=None):
+    """
+    Upsert the customer and claim the location's best-fitting free table in one
+    transaction, storing the confirmation for an idempotent_request (see models.book_table)
+    Returns (reservation_id, table_number) on success, None if no free table fits
+    """
+    lock_slot = session.bind.dialect.name == 'postgresql'
+    floor_plan = await get_floor_plan(session, location)
+    ends_at = timeslot + duration
+    day = service_day(timeslot)
+
+    for attempt in range(max_retries):
+        try:
+            customer_id = await upsert_customer(session, location, name, email, phone, newsletter_signup)
+
+            # A cached schedule only ever misses bookings, so a party it cannot
+            # seat cannot be seated: skip the lock and the claim
+            cached = occupancy_cache.peek((location, day))
+            if cached is not None and not floor_plan.can_seat(cached.occupancy(timeslot, ends_at), number_of_guests):
+                await session.commit()
+                invalidate_response_etags(location, customer_id)
+                return None
+
+            if lock_slot:
+                await session.execute(timeslot_lock_statement(location, timeslot))
+
+            if idempotent_request is not None:
+                stored = await get_stored_response(session, idempotent_request)
+                if stored is not None:
+                    await session.rollback()
+                    raise DuplicateRequest(stored)
+
+            row = (await session.execute(
+                claim_table_statement(location, customer_id, timeslot, ends_at, number_of_guests)
+            )).first()
+
+            if row is None:
+                # Read the day while still holding the lock so later requests can skip it
+                schedule = await load_schedule(session, location, day)
+                await session.commit()
+                occupancy_cache.put((location, day), schedule)
+                invalidate_response_etags(location, customer_id)
+                return None
+
+            await record_booking_report(
+                session, location, customer_id, row.reservation_id, timeslot, ends_at, number_of_guests
+            )
+
+            for statement in booking_job_statements(row.reservation_id, email, newsletter_signup):
+                await session.execute(statement)
+
+            if idempotent_request is not None:
+                await session.execute(store_response_statement(
+                    session.bind.dialect.name, idempotent_request,
+                    201, confirmation(row.reservation_id, row.table_number)
+                ))
+
+            await announce_booking(session, location, row.table_number, timeslot, ends_at)
+            invalidate_response_etags(location, customer_id)
+            return row.reservation_id, row.table_number
+
+        except DuplicateRequest:
+            raise
+        except IntegrityError as e:
+            # Another booking claimed an overlapping slot on the same table first
+            await session.rollback()
+            logger.warning('Table allocation conflict', extra={
+                'attempt': attempt + 1, 'max_retries': max_retries, 'error': str(e)
+            })
+        except Exception:
+            await session.rollback()
+            raise
+
+    # Every attempt lost the race for a table: answer as if none is free, after
+    # dropping the cached schedule that missed the winning bookings
+    invalidate_schedules(location, timeslot)
+    return None
+
+async def get_availability(session, location, timeslot, duration, guests=None, fresh=False):
+    """
+    Get a location's table availability for [timeslot, timeslot + duration)
+    from its floor plan and the cached schedule (read from session when fresh)
+    Returns a dictionary (see FloorPlan.availability)
+    """
+    floor_plan = await get_floor_plan(session, location)
+    schedule = await get_schedule(session, location, service_day(timeslot), fresh)
+    return floor_plan.availability(schedule.occupancy(timeslot, timeslot + duration), guests)
+
+async def suggest_alternatives(session, location, timeslot, duration, guests):
+    """
+    Suggest other start times for a party that cannot be seated at timeslot
+    Returns a list of datetimes, nearest first (empty on errors)
+    """
+    try:
+        schedule = await get_schedule(session, location, service_day(timeslot))
+        floor_plan = await get_floor_plan(session, location)
+        return alternative_slots(schedule, floor_plan, timeslot, duration, guests)
+    except Exception:
+        logger.exception("Error suggesting alternative timeslots")
+        return []
+
+async def get_reservations_page(session, location, limit, after=None, start=None, end=None,
+                                customer_id=None, email=None):
+    """
+    Get one keyset page of a location's reservations with customers loaded in the same query
+    Returns (reservations, has_more)
+    """
+    query = reservations_page_query(location, limit, after, start, end, customer_id, email)
+    reservations = (await session.execute(query)).scalars().all()
+    return reservations[:limit], len(reservations) > limit
@@ -0,0 +1,138 @@
+"""
+In-process occupancy cache for reservation schedules
+Caches the booking schedule (see database/schedule.py) per service day so
+availability reads can be answered without a database round trip
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+class OccupancyCache:
+    """
+    Bounded LRU cache with TTL expiry, keyed by service day.
+    Entries are invalidated by the reservation write path; the TTL bounds
+    staleness for writes made by other worker processes.
+    """
+
+    def __init__(self, max_entries=4096, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value for key, calling loader() on a miss
+        The loaded value is only stored if no invalidation happened meanwhile
+        """
+        hit, value, generation, now = self._lookup(key)
+        if hit:
+            return value
+
+        value = loader()
+        self._store(key, value, generation, now)
+        return value
+
+    async def get_or_load_async(self, key, loader):
+        """Same as get_or_load for an async loader (used by the ASGI app)"""
+        hit, value, generation, now = self._lookup(key)
+        if hit:
+            return value
+
+        value = await loader()
+        self._store(key, value, generation, now)
+        return value
+
+    def _lookup(self, key):
+        """Return (hit, value, generation, now) and update the counters"""
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[0], self._generation, now
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None, self._generation, now
+
+    def _store(self, key, value, generation, now):
+        """Store a loaded value unless an invalidation happened since the lookup"""
+        with self._lock:
+            if generation == self._generation and self.max_entries > 0:
+                self._entries[key] = (value, now + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+    def peek(self, key):
+        """Return the cached value for key without loading it, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return entry[0]
+            return None
+
+    def put(self, key, value):
+        """
+        Store a value known to be current (e.g. from the write path)
+        Loads already in flight for any key will not overwrite it
+        """
+        with self._lock:
+            self._generation += 1
+            if self.max_entries > 0:
+                self._entries[key] = (value, time.monotonic() + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+    def generation(self):
+        """Return the invalidation counter, to pass to put_if_current after a read"""
+        with self._lock:
+            return self._generation
+
+    def put_if_current(self, key, value, generation):
+        """Store a value read after generation() unless an invalidation happened since"""
+        self._store(key, value, generation, time.monotonic())
+
+    def invalidate(self, key):
+        """Drop the cached value for key"""
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Drop every cached value for which predicate(key, value) is true"""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key, (value, _) in self._entries.items() if predicate(key, value)]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop all cached values"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
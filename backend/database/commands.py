@@ -0,0 +1,163 @@
+"""
+Flask CLI commands for schema management and data imports
+Run them with: flask --app app <command>
+"""
+
+import json
+
+import click
+from flask import current_app
+
+from config import Config
+from database.db_config import upgrade_db, reset_db
+from database.locations import location_context, use_location
+
+def register_commands(app):
+    """Register the database CLI commands on the Flask app"""
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Apply all pending migrations to create or update the schema."""
+        try:
+            upgrade_db(current_app._get_current_object())
+        except Exception as e:
+            click.echo(f"❌ Error initializing database: {e}", err=True)
+            click.echo("\nPlease ensure:", err=True)
+            click.echo("  1. PostgreSQL is running", err=True)
+            click.echo("  2. Database 'cafe_fausse' exists", err=True)
+            click.echo("  3. DATABASE_URL in .env is correct", err=True)
+            raise SystemExit(1)
+
+        click.echo("✅ Database initialized successfully!")
+
+    @app.cli.command('reset-db')
+    @click.option('--yes', is_flag=True, help='Skip the confirmation prompt.')
+    def reset_db_command(yes):
+        """Drop all tables and reapply the migrations (deletes all data!)."""
+        if not yes:
+            click.confirm("⚠️  This will delete all existing data. Continue?", abort=True)
+
+        try:
+            reset_db(current_app._get_current_object())
+        except Exception as e:
+            click.echo(f"❌ Error resetting database: {e}", err=True)
+            raise SystemExit(1)
+
+        click.echo("✅ Database reset successfully!")
+
+    @app.cli.command('import-newsletter')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+                  help='File format (default: from the file extension).')
+    @click.option('--batch-size', type=click.IntRange(min=1),
+                  help='Rows per upsert (default: NEWSLETTER_IMPORT_BATCH_SIZE).')
+    @click.option('--location', type=click.Choice(Config.LOCATIONS), default=Config.DEFAULT_LOCATION,
+                  help='Location whose newsletter the signups join (default: DEFAULT_LOCATION).')
+    def import_newsletter_command(path, fmt, batch_size, location):
+        """Bulk import newsletter signups from a CSV or NDJSON file."""
+        from newsletter_import import import_newsletter_signups
+        from validation import ValidationError
+
+        if not fmt:
+            fmt = 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+        use_location(location)
+        try:
+            with open(path, encoding='utf-8', newline='') as f:
+                summary = import_newsletter_signups(location, f, fmt, batch_size)
+        except ValidationError as ve:
+            click.echo(f"❌ {ve.message}", err=True)
+            raise SystemExit(1)
+
+        for error in summary['errors']:
+            click.echo(f"  row {error['row']}: {error['error']}", err=True)
+        if summary['errors_truncated']:
+            click.echo("  ... more errors omitted", err=True)
+
+        status = "✅" if not summary['failed'] else "⚠️ "
+        click.echo(f"{status} Imported {summary['imported']} of {summary['rows']} rows "
+                   f"({summary['failed']} failed)")
+
+    @app.cli.command('load-floor-plan')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--location', type=click.Choice(Config.LOCATIONS), default=Config.DEFAULT_LOCATION,
+                  help='Location whose floor plan is replaced (default: DEFAULT_LOCATION).')
+    def load_floor_plan_command(path, location):
+        """Replace a location's floor plan with the tables in a JSON file.
+
+        The file is a list of {"table_number", "room", "seats"} objects.
+        """
+        from database.models import replace_floor_plan
+
+        try:
+            with open(path, encoding='utf-8') as f:
+                tables = [(int(t['table_number']), str(t.get('room', 'Main')), int(t['seats']))
+                          for t in json.load(f)]
+        except (ValueError, KeyError, TypeError) as e:
+            click.echo(f"❌ Invalid floor plan file: {e}", err=True)
+            raise SystemExit(1)
+
+        if not tables or any(n < 1 or seats < 1 for n, _, seats in tables):
+            click.echo("❌ Floor plan needs at least one table, with positive numbers and seats", err=True)
+            raise SystemExit(1)
+
+        use_location(location)
+        try:
+            replace_floor_plan(location, tables)
+        except Exception as e:
+            click.echo(f"❌ Error loading floor plan: {e}", err=True)
+            raise SystemExit(1)
+
+        click.echo(f"✅ Floor plan of {location} loaded: {len(tables)} tables, "
+                   f"{sum(s for _, _, s in tables)} seats")
+
+    @app.cli.command('purge-idempotency-keys')
+    def purge_idempotency_keys_command():
+        """Delete stored Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL_HOURS."""
+        from database.models import purge_idempotency_keys
+
+        try:
+            deleted = purge_idempotency_keys()
+        except Exception as e:
+            click.echo(f"❌ Error purging idempotency keys: {e}", err=True)
+            raise SystemExit(1)
+
+        click.echo(f"✅ Purged {deleted} expired idempotency keys")
+
+    @app.cli.command('rebuild-reports')
+    @click.option('--location', 'locations', type=click.Choice(Config.LOCATIONS), multiple=True,
+                  help='Location to rebuild (repeatable; default: every location).')
+    def rebuild_reports_command(locations):
+        """Recompute the reporting aggregates from every reservation (run after upgrading)."""
+        from database.models import rebuild_reports
+
+        for location in locations or Config.LOCATIONS:
+            try:
+                with location_context(current_app._get_current_object(), location):
+                    rows = rebuild_reports(location)
+            except Exception as e:
+                click.echo(f"❌ Error rebuilding reports of {location}: {e}", err=True)
+                raise SystemExit(1)
+
+            click.echo(f"✅ Reports of {location} rebuilt: {rows} hourly rows")
+
+    @app.cli.command('run-jobs')
+    @click.option('--concurrency', type=click.IntRange(min=1), help='Jobs run at once (default: JOB_CONCURRENCY).')
+    @click.option('--batch-size', type=click.IntRange(min=1), help='Jobs claimed per poll (default: JOB_BATCH_SIZE).')
+    @click.option('--once', is_flag=True, help='Run the jobs due now and exit.')
+    def run_jobs_command(concurrency, batch_size, once):
+        """Run background jobs (confirmation emails, newsletter syncs) until interrupted."""
+        from jobs import JobWorker
+
+        worker = JobWorker(concurrency=concurrency, batch_size=batch_size)
+        if once:
+            claimed = worker.run_until_idle(current_app._get_current_object())
+            worker.stop()
+            click.echo(f"✅ Ran {claimed} jobs ({worker.stats()['failed']} failed for good)")
+            return
+
+        click.echo(f"Running jobs with {worker.concurrency} threads, press Ctrl+C to stop")
+        try:
+            worker.run(current_app._get_current_object())
+        except KeyboardInterrupt:
+            worker.stop()
@@ -1,22 +1,43 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate, upgrade
+from sqlalchemy import text
+from database.pool import engine_options, dispose_after_fork
+from database.locations import RoutingSession, location_binds, replica_binds
 import os
 
-db = SQLAlchemy()
+# Sessions route each location's statements to its database or its replica (see database/locations.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = Migrate()
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
 
 def init_app(app):
     """Initialize database with Flask app"""
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLALCHEMY_BINDS'] = {
+        key: {'url': url, **engine_options(url)}
+        for key, url in {**location_binds(), **replica_binds()}.items()
+    }
 
     db.init_app(app)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR)
+
+    # Forked workers (e.g. gunicorn --preload) must not reuse the parent's connections
+    with app.app_context():
+        engines = list(db.engines.values())
+    os.register_at_fork(after_in_child=lambda: dispose_after_fork(engines))
 
+def upgrade_db(app):
+    """Apply all pending migrations"""
     with app.app_context():
-        db.create_all()
-        print("Database tables initialized successfully!")
+        upgrade(directory=MIGRATIONS_DIR)
 
 def reset_db(app):
-    """Drop all tables and reinitialize (use with caution!)"""
+    """Drop all tables and reapply migrations (use with caution!)"""
     with app.app_context():
         db.drop_all()
-        db.create_all()
-        print("Database reset successfully!")
+        db.session.execute(text('DROP TABLE IF EXISTS alembic_version'))
+        db.session.commit()
+        upgrade(directory=MIGRATIONS_DIR)
@@ -0,0 +1,181 @@
+"""
+Booking events for the live availability stream
+Every committed booking is announced as a small JSON event. On PostgreSQL the
+booking transaction sends it with pg_notify, so it is delivered only if the
+booking commits, and a listener thread per database in each worker process fans
+it out to that worker's streams. Events carry their location; each stream
+keeps only those of its own location. Other databases (e.g. SQLite, single node) publish it
+straight onto the in-process bus after the commit.
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import select as selectors
+import threading
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'availability'
+
+def booking_event(location, table_number, timeslot, ends_at):
+    """Return the event announcing a booking of a location's table_number for [timeslot, ends_at)"""
+    return {
+        'type': 'booked',
+        'location': location,
+        'table_number': table_number,
+        'timeslot': timeslot.isoformat(),
+        'ends_at': ends_at.isoformat()
+    }
+
+def notify_statement(event):
+    """
+    Build the pg_notify call that delivers event to every listener when the
+    current transaction commits
+    Returns a select statement
+    """
+    return select(func.pg_notify(CHANNEL, json.dumps(event)))
+
+class Subscription:
+    """
+    Inbox of one stream. Sync streams block on a thread-safe queue; async
+    streams get events handed over to their event loop. When the inbox is
+    full, events are dropped and overflowed is set so the stream can reload.
+    """
+
+    def __init__(self, maxsize, loop=None):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize) if loop else queue.Queue(maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Queue event without blocking the publisher"""
+        if self.loop is None:
+            self._put(event)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The stream's event loop is already closed
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except (queue.Full, asyncio.QueueFull):
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Wait up to timeout seconds for an event (raises queue.Empty)"""
+        return self.queue.get(timeout=timeout)
+
+    async def get_async(self, timeout):
+        """Wait up to timeout seconds for an event (raises asyncio.TimeoutError)"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def reset(self):
+        """Drop queued events and clear the overflow flag (before a reload)"""
+        self.overflowed = False
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+class AvailabilityBus:
+    """In-process fan-out of booking events to the open streams"""
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._listeners = {}
+
+    def subscribe(self, database_url=None, loop=None):
+        """
+        Open an inbox for one stream; pass the event loop for async streams
+        On PostgreSQL, the first subscription to a database starts this
+        process's listener for it
+        Returns a Subscription
+        """
+        if database_url is not None and make_url(database_url).get_backend_name() == 'postgresql':
+            self._start_listener(database_url)
+
+        subscription = Subscription(self.maxsize, loop)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Close a stream's inbox"""
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        """Deliver event to every open stream in this process"""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+    def resync(self):
+        """Ask every open stream to reload (events may have been missed)"""
+        with self._lock:
+            for subscription in self._subscriptions:
+                subscription.overflowed = True
+
+    def stats(self):
+        """Return the number of open streams and of running listeners"""
+        with self._lock:
+            return {
+                'subscribers': len(self._subscriptions),
+                'listening': sum(listener.is_alive() for listener in self._listeners.values())
+            }
+
+    def _start_listener(self, database_url):
+        key = make_url(database_url).set(drivername='postgresql').render_as_string(hide_password=False)
+        with self._lock:
+            listener = self._listeners.get(key)
+            if listener is not None and listener.is_alive():
+                return
+            self._listeners[key] = threading.Thread(
+                target=self._listen, args=(database_url,), name='availability-listener', daemon=True
+            )
+            self._listeners[key].start()
+
+    def _listen(self, database_url):
+        """LISTEN on its own connection and publish every notification, reconnecting on errors"""
+        # The listener always uses psycopg2, also for the asyncpg URL of the ASGI app
+        url = make_url(database_url).set(drivername='postgresql+psycopg2')
+        engine = create_engine(url, poolclass=NullPool)
+
+        while True:
+            try:
+                connection = engine.raw_connection()
+                try:
+                    listener = connection.driver_connection
+                    listener.autocommit = True
+                    listener.cursor().execute(f'LISTEN {CHANNEL}')
+
+                    # Bookings made before LISTEN took effect were not seen
+                    self.resync()
+
+                    while True:
+                        if selectors.select([listener], [], [], 60) == ([], [], []):
+                            continue
+                        listener.poll()
+                        while listener.notifies:
+                            notification = listener.notifies.pop(0)
+                            self.publish(json.loads(notification.payload))
+                finally:
+                    connection.close()
+            except Exception:
+                logger.exception("Availability listener failed, reconnecting")
+                time.sleep(Config.SSE_LISTENER_RETRY_SECONDS)
+
+availability_bus = AvailabilityBus(maxsize=Config.SSE_QUEUE_SIZE)
@@ -0,0 +1,64 @@
+"""
+Floor plan: the restaurant's tables, their rooms and seat counts
+FloorPlan precomputes, for every party size, the bitmap of tables that can
+seat it. Combined with a timeslot's occupancy bitmap this answers "can we
+seat 6 at 8pm" with a couple of integer operations.
+"""
+
+from database.occupancy import bitmap_from_tables, count_booked
+
+class FloorPlan:
+    """Immutable table layout with per-party-size table bitmaps"""
+
+    def __init__(self, tables):
+        self.tables = sorted((int(n), room, int(seats)) for n, room, seats in tables)
+        self.all_tables = bitmap_from_tables(n for n, _, _ in self.tables)
+        self.total_tables = len(self.tables)
+        self.total_seats = sum(seats for _, _, seats in self.tables)
+        self.max_seats = max((seats for _, _, seats in self.tables), default=0)
+
+        # fits[g] is the bitmap of tables with at least g seats
+        self.fits = [self.all_tables]
+        for guests in range(1, self.max_seats + 1):
+            self.fits.append(bitmap_from_tables(n for n, _, seats in self.tables if seats >= guests))
+
+    def fitting_tables(self, guests):
+        """Return the bitmap of tables that can seat the party"""
+        return self.fits[guests] if guests <= self.max_seats else 0
+
+    def can_seat(self, occupancy, guests):
+        """Return True when a free table in the occupancy bitmap fits the party"""
+        return bool(self.fitting_tables(guests) & ~occupancy)
+
+    def availability(self, occupancy, guests=None):
+        """
+        Summarize a timeslot's occupancy bitmap against the floor plan
+        Returns a dictionary with total, booked and available table counts;
+        when guests is given, is_available means a table fits the party
+        """
+        booked = count_booked(occupancy & self.all_tables)
+        summary = {
+            'total_tables': self.total_tables,
+            'booked_tables': booked,
+            'available_tables': self.total_tables - booked,
+            'is_available': booked < self.total_tables
+        }
+        if guests is not None:
+            fitting = count_booked(self.fitting_tables(guests) & ~occupancy)
+            summary.update({
+                'guests': guests,
+                'fitting_tables': fitting,
+                'is_available': fitting > 0
+            })
+        return summary
+
+    def to_dict(self):
+        """Convert the floor plan to a dictionary grouped by room"""
+        rooms = {}
+        for n, room, seats in self.tables:
+            rooms.setdefault(room, []).append({'table_number': n, 'seats': seats})
+        return {
+            'total_tables': self.total_tables,
+            'total_seats': self.total_seats,
+            'rooms': [{'name': room, 'tables': tables} for room, tables in rooms.items()]
+        }
@@ -0,0 +1,115 @@
+"""
+Location (restaurant) routing
+One deployment serves every location in LOCATIONS. Customers, tables,
+reservations and reporting aggregates carry a location column, and every
+helper in models.py is scoped to one location. A location listed in
+LOCATION_DATABASE_URLS lives in its own database (a Flask-SQLAlchemy bind
+named 'location:<name>'); the others share DATABASE_URL.
+Requests pick their database with use_location before calling the helpers:
+the session then sends every statement of the app context to that database,
+so availability and allocation only touch the requested location's shard.
+Read-only requests may also call use_replica: their reads then go to the
+replica of that database (bind 'replica' or 'replica:<name>') when one is
+configured, while flushes and the booking path stay on the primary.
+"""
+
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+
+from config import Config
+
+def bind_key(location):
+    """Return the Flask-SQLAlchemy bind key of a location with its own database"""
+    return f'location:{location}'
+
+def location_binds():
+    """
+    Build SQLALCHEMY_BINDS for the locations in LOCATION_DATABASE_URLS
+    Returns a dictionary of bind key -> database URL
+    """
+    return {bind_key(location): url for location, url in Config.LOCATION_DATABASE_URLS.items()}
+
+def replica_bind_key(location):
+    """Return the Flask-SQLAlchemy bind key of the replica of a location's database"""
+    return f'replica:{location}' if location in Config.LOCATION_DATABASE_URLS else 'replica'
+
+def replica_url(location):
+    """Return the URL of the replica of a location's database, or None if it has none"""
+    if location in Config.LOCATION_DATABASE_URLS:
+        return Config.LOCATION_REPLICA_URLS.get(location)
+    return Config.REPLICA_DATABASE_URL or None
+
+def replica_binds():
+    """
+    Build SQLALCHEMY_BINDS for the configured read replicas
+    Returns a dictionary of bind key -> database URL
+    """
+    binds = {replica_bind_key(location): replica_url(location) for location in Config.LOCATIONS}
+    return {key: url for key, url in binds.items() if url}
+
+def replicas_enabled():
+    """Return True when any read replica is configured"""
+    return bool(replica_binds())
+
+def database_url(location):
+    """Return the database URL holding a location's data (None for DATABASE_URL)"""
+    return Config.LOCATION_DATABASE_URLS.get(location)
+
+def database_shards():
+    """
+    Return one location per database, None standing for DATABASE_URL, so work
+    that is not tied to a location (e.g. the job queue) visits every database once
+    """
+    shards = {None: None}
+    for location in Config.LOCATIONS:
+        shards.setdefault(database_url(location), location)
+    return list(shards.values())
+
+def use_location(location):
+    """Send the statements of the current app context to the location's database"""
+    g.location = location
+
+def use_replica(replica=True):
+    """
+    Send the reads of the current app context to the replica of the location's
+    database; with replica=False keep them on the primary and bypass the caches
+    that replica reads may have filled (the client wrote recently)
+    """
+    g.replica = replica
+
+def reading_replica():
+    """Return True when use_replica sent the current app context's reads to a replica"""
+    return has_app_context() and g.get('replica') is True
+
+def reading_own_writes():
+    """Return True when the current app context must see its client's latest writes"""
+    return has_app_context() and g.get('replica') is False
+
+def current_location():
+    """Return the location selected with use_location, or None"""
+    return g.get('location') if has_app_context() else None
+
+@contextmanager
+def location_context(app, location):
+    """Push an app context (with its own session) routed to a location's database"""
+    with app.app_context():
+        use_location(location)
+        yield
+
+class RoutingSession(Session):
+    """
+    Session that binds to the database of the location selected with
+    use_location, or to its replica after use_replica (except while flushing)
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        location = current_location()
+        if bind is None and reading_replica() and not self._flushing:
+            replica = self._db.engines.get(replica_bind_key(location))
+            if replica is not None:
+                return replica
+        if bind is None and location in Config.LOCATION_DATABASE_URLS:
+            return self._db.engines[bind_key(location)]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -1,32 +1,82 @@
 from database.db_config import db
-from datetime import datetime
+from database.cache import OccupancyCache
+from database.floor_plan import FloorPlan
+from database.schedule import Schedule, day_window
+from database.events import availability_bus, booking_event, notify_statement
+from database.locations import reading_own_writes
+from database.reports import ReportAccumulator, booking_increments, daily_report, hourly_report
+from config import Config
+from idempotency import DuplicateRequest
+from json_provider import dumps
+import json
+import zlib
+from datetime import datetime, time, timedelta
+import logging
+from sqlalchemy import and_, case, delete, exists, func, literal, or_, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager, joinedload
+
+logger = logging.getLogger(__name__)
 
 class Customer(db.Model):
     """Customer model for storing customer information"""
     __tablename__ = 'customers'
 
     customer_id = db.Column(db.Integer, primary_key=True)
+    location = db.Column(db.String(50), nullable=False)
     customer_name = db.Column(db.String(255), nullable=False)
-    email = db.Column(db.String(255), unique=True, nullable=False)
+    email = db.Column(db.String(255), nullable=False)
     phone_number = db.Column(db.String(20))
     newsletter_signup = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationship with reservations
-    reservations = db.relationship('Reservation', backref='customer', lazy=True, cascade='all, delete-orphan')
+    reservations = db.relationship('Reservation', back_populates='customer', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # Each location keeps its own guest list
+        db.UniqueConstraint('location', 'email', name='uq_customers_location_email'),
+    )
 
     def __repr__(self):
         return f'<Customer {self.customer_name} - {self.email}>'
 
     def to_dict(self):
-        """Convert customer object to dictionary"""
+        """Convert customer object to dictionary (datetimes are encoded by the JSON provider)"""
         return {
             'customer_id': self.customer_id,
+            'location': self.location,
             'name': self.customer_name,
             'email': self.email,
             'phone': self.phone_number,
             'newsletter_signup': self.newsletter_signup,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
+        }
+
+class DiningTable(db.Model):
+    """Dining table model for the floor plan"""
+    __tablename__ = 'dining_tables'
+
+    location = db.Column(db.String(50), primary_key=True)
+    table_number = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    room = db.Column(db.String(50), nullable=False, default='Main')
+    seats = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.CheckConstraint('seats >= 1', name='check_seats'),
+        # Best-fit allocation scans a location's tables by size
+        db.Index('ix_dining_tables_seats', 'location', 'seats', 'table_number'),
+    )
+
+    def __repr__(self):
+        return f'<DiningTable {self.table_number} - {self.seats} seats>'
+
+    def to_dict(self):
+        """Convert dining table object to dictionary"""
+        return {
+            'table_number': self.table_number,
+            'room': self.room,
+            'seats': self.seats
         }
 
 class Reservation(db.Model):
@@ -34,176 +84,1106 @@ class Reservation(db.Model):
     __tablename__ = 'reservations'
 
     reservation_id = db.Column(db.Integer, primary_key=True)
+    location = db.Column(db.String(50), nullable=False)
     customer_id = db.Column(db.Integer, db.ForeignKey('customers.customer_id'), nullable=False)
     timeslot = db.Column(db.DateTime, nullable=False)
+    ends_at = db.Column(db.DateTime, nullable=False)
     table_number = db.Column(db.Integer, nullable=False)
     number_of_guests = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    # Add constraint for table number range and unique timeslot-table combination
+    # Relationship with customer
+    customer = db.relationship('Customer', back_populates='reservations')
+
+    # Add constraint for party size and unique timeslot-table combination.
+    # On PostgreSQL migrations 0004 and 0008 also add no_overlapping_table_bookings,
+    # a GiST exclusion constraint on (location, table_number, tsrange(timeslot, ends_at))
     __table_args__ = (
-        db.CheckConstraint('table_number >= 1 AND table_number <= 30', name='check_table_number'),
         db.CheckConstraint('number_of_guests >= 1', name='check_guests'),
-        db.UniqueConstraint('timeslot', 'table_number', name='unique_timeslot_table'),
+        db.CheckConstraint('ends_at > timeslot', name='check_reservation_period'),
+        db.UniqueConstraint('location', 'timeslot', 'table_number', name='unique_timeslot_table'),
+        db.ForeignKeyConstraint(
+            ['location', 'table_number'], ['dining_tables.location', 'dining_tables.table_number'],
+            name='fk_reservations_table_number'
+        ),
+        # Keyset listing and timeslot range scans of a location, newest first
+        db.Index('ix_reservations_location_timeslot', 'location', 'timeslot', 'reservation_id'),
+        # Customer history ordered by timeslot
+        db.Index('ix_reservations_customer_timeslot', 'customer_id', 'timeslot', 'reservation_id'),
+        db.Index('ix_reservations_created_at', 'created_at'),
     )
 
     def __repr__(self):
         return f'<Reservation {self.reservation_id} - Table {self.table_number}>'
 
     def to_dict(self):
-        """Convert reservation object to dictionary"""
+        """Convert reservation object to dictionary (datetimes are encoded by the JSON provider)"""
+        customer = self.customer
         return {
             'reservation_id': self.reservation_id,
+            'location': self.location,
             'customer_id': self.customer_id,
-            'timeslot': self.timeslot.isoformat() if self.timeslot else None,
+            'timeslot': self.timeslot,
+            'ends_at': self.ends_at,
             'table_number': self.table_number,
             'guests': self.number_of_guests,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'customer_name': self.customer.customer_name if self.customer else None,
-            'email': self.customer.email if self.customer else None,
-            'phone': self.customer.phone_number if self.customer else None
+            'created_at': self.created_at,
+            'customer_name': customer.customer_name if customer else None,
+            'email': customer.email if customer else None,
+            'phone': customer.phone_number if customer else None
         }
 
-# Helper functions for database operations
-def create_or_update_customer(name, email, phone='', newsletter_signup=False):
+class IdempotencyKey(db.Model):
     """
-    Create a new customer or update existing customer
-    Returns customer object on success, None on failure
+    Stored response of a POST sent with an Idempotency-Key header, scoped by
+    location and client (the email of the request) so clients cannot collide
+    """
+    __tablename__ = 'idempotency_keys'
+
+    location = db.Column(db.String(50), primary_key=True)
+    client = db.Column(db.String(255), primary_key=True)
+    idempotency_key = db.Column(db.String(255), primary_key=True)
+    endpoint = db.Column(db.String(100), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=False)
+    response_body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Expired keys are purged by age
+        db.Index('ix_idempotency_keys_created_at', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.location} {self.client} {self.endpoint} {self.idempotency_key}>'
+
+class HourlyOccupancy(db.Model):
+    """Booking aggregates per location, service date and hour (see database/reports.py)"""
+    __tablename__ = 'hourly_occupancy'
+
+    location = db.Column(db.String(50), primary_key=True)
+    service_date = db.Column(db.Date, primary_key=True)
+    hour = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    reservations = db.Column(db.Integer, nullable=False, default=0)
+    covers = db.Column(db.Integer, nullable=False, default=0)
+    repeat_reservations = db.Column(db.Integer, nullable=False, default=0)
+    table_minutes = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.CheckConstraint('hour >= 0 AND hour <= 23', name='check_hour'),
+    )
+
+    def __repr__(self):
+        return f'<HourlyOccupancy {self.location} {self.service_date} {self.hour}:00 - {self.covers} covers>'
+
+# Columns read by the lean serializer, in the order reservation_row_to_dict expects
+RESERVATION_ROW_COLUMNS = (
+    Reservation.reservation_id,
+    Reservation.location,
+    Reservation.customer_id,
+    Reservation.timeslot,
+    Reservation.ends_at,
+    Reservation.table_number,
+    Reservation.number_of_guests,
+    Reservation.created_at,
+    Customer.customer_name,
+    Customer.email,
+    Customer.phone_number
+)
+
+class Job(db.Model):
+    """Background job (side effect of a request), polled by the worker pool in jobs.py"""
+    __tablename__ = 'jobs'
+
+    job_id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.CheckConstraint("status IN ('pending', 'running', 'failed')", name='check_job_status'),
+        # Workers claim due jobs by status and run time
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+    def __repr__(self):
+        return f'<Job {self.job_id} {self.kind} - {self.status}>'
+
+def reservation_row_to_dict(row):
+    """
+    Convert a RESERVATION_ROW_COLUMNS result tuple to the same dictionary as
+    Reservation.to_dict without building ORM objects
+    """
+    (reservation_id, location, customer_id, timeslot, ends_at, table_number, guests, created_at,
+     name, email, phone) = row
+    return {
+        'reservation_id': reservation_id,
+        'location': location,
+        'customer_id': customer_id,
+        'timeslot': timeslot,
+        'ends_at': ends_at,
+        'table_number': table_number,
+        'guests': guests,
+        'created_at': created_at,
+        'customer_name': name,
+        'email': email,
+        'phone': phone
+    }
+
+# Per-location, per-day cache of booking schedules keyed by (location, day),
+# invalidated on every reservation write
+occupancy_cache = OccupancyCache(
+    max_entries=Config.AVAILABILITY_CACHE_SIZE,
+    ttl=Config.AVAILABILITY_CACHE_TTL
+)
+
+# Floor plans by location rarely change; workers reload them after FLOOR_PLAN_TTL seconds
+floor_plan_cache = OccupancyCache(max_entries=len(Config.LOCATIONS), ttl=Config.FLOOR_PLAN_TTL)
+
+# ETags of served reservation and listing responses, keyed by response_etag_key and
+# dropped on reservation and customer writes; the TTL bounds staleness for writes
+# made by other worker processes
+response_etags = OccupancyCache(max_entries=Config.ETAG_CACHE_SIZE, ttl=Config.ETAG_CACHE_TTL)
+
+def response_etag_key(kind, location, *args):
+    """
+    Return the response_etags key of a reservation ('reservation', location, id)
+    or of a location's listing page
+    """
+    return (kind, location) + tuple(args)
+
+def cached_etag(key):
+    """Return the ETag last served for a response key, or None"""
+    entry = response_etags.peek(key)
+    return entry[1] if entry is not None else None
+
+def remember_etag(key, etag, generation, customer_id=None):
+    """
+    Remember the ETag of a response read after response_etags.generation(),
+    unless a write happened meanwhile. Pass the customer_id of a reservation
+    so updates of the customer (at the key's location) drop it.
+    """
+    response_etags.put_if_current(key, ((key[1], customer_id), etag), generation)
+
+def invalidate_response_etags(location, customer_id):
+    """Drop the remembered ETags of the location's listing pages and of the customer's reservations"""
+    response_etags.invalidate_where(
+        lambda key, value: (key[0] == 'listing' and key[1] == location) or value[0] == (location, customer_id)
+    )
+
+def floor_plan_query(location):
+    """
+    Build the query for every table in a location's floor plan
+    Returns a select statement of (table_number, room, seats)
+    """
+    return (
+        select(DiningTable.table_number, DiningTable.room, DiningTable.seats)
+        .where(DiningTable.location == location)
+    )
+
+def get_floor_plan(location):
+    """
+    Get a location's floor plan, from the cache when possible
+    Returns a FloorPlan
+    """
+    return floor_plan_cache.get_or_load(
+        location, lambda: FloorPlan(db.session.execute(floor_plan_query(location)).all())
+    )
+
+def replace_floor_plan(location, tables):
+    """
+    Replace a location's floor plan with a list of (table_number, room, seats) tuples
+    Tables that still have reservations cannot be removed; raises on errors
     """
     try:
-        customer = Customer.query.filter_by(email=email).first()
-
-        if customer:
-            # Update existing customer
-            if newsletter_signup:
-                customer.newsletter_signup = True
-            if phone:
-                customer.phone_number = phone
-            if name:
-                customer.customer_name = name
-        else:
-            # Create new customer
-            customer = Customer(
-                customer_name=name if name else 'Guest',
-                email=email,
-                phone_number=phone if phone else None,
-                newsletter_signup=newsletter_signup
-            )
-            db.session.add(customer)
+        keep = [table_number for table_number, _, _ in tables]
 
-        db.session.commit()
-        return customer
+        # Checked explicitly because SQLite does not enforce foreign keys by default
+        in_use = db.session.execute(
+            select(Reservation.table_number)
+            .where(Reservation.location == location, Reservation.table_number.not_in(keep))
+            .distinct()
+        ).scalars().all()
+        if in_use:
+            raise ValueError(f'Tables {sorted(in_use)} have reservations and cannot be removed')
 
-    except Exception as e:
+        db.session.execute(DiningTable.__table__.delete().where(
+            DiningTable.location == location, DiningTable.table_number.not_in(keep)
+        ))
+        for table_number, room, seats in tables:
+            db.session.merge(DiningTable(location=location, table_number=table_number, room=room, seats=seats))
+        db.session.commit()
+    except Exception:
         db.session.rollback()
-        print(f"Error creating/updating customer: {e}")
+        raise
+    finally:
+        floor_plan_cache.invalidate(location)
+        occupancy_cache.invalidate_where(lambda key, value: key[0] == location)
+
+# Helper functions for database operations
+def upsert_insert(dialect_name):
+    """
+    Return the dialect's insert() construct with ON CONFLICT support
+    Returns None for dialects without it
+    """
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
         return None
+    return insert
 
-def create_reservation(customer_id, timeslot, table_number, number_of_guests):
+def customer_upsert_statement(dialect_name, location, name, email, phone='', newsletter_signup=False):
     """
-    Create a new reservation
-    Returns reservation object on success, None on failure
+    Build the INSERT ... ON CONFLICT (location, email) DO UPDATE that creates or
+    updates a customer of a location
+    A blank name or phone keeps the stored value, and a booking never unsubscribes
+    Returns an insert statement returning customer_id, or None if the dialect
+    has no ON CONFLICT support
     """
-    try:
-        reservation = Reservation(
-            customer_id=customer_id,
-            timeslot=timeslot,
-            table_number=table_number,
-            number_of_guests=number_of_guests
+    insert = upsert_insert(dialect_name)
+    if insert is None:
+        return None
+
+    statement = insert(Customer).values(
+        location=location,
+        customer_name=name if name else 'Guest',
+        email=email,
+        phone_number=phone if phone else None,
+        newsletter_signup=bool(newsletter_signup),
+        created_at=datetime.utcnow()
+    )
+
+    # Always set at least one column so RETURNING also yields existing rows
+    update = {'newsletter_signup': True if newsletter_signup else Customer.__table__.c.newsletter_signup}
+    if name:
+        update['customer_name'] = statement.excluded.customer_name
+    if phone:
+        update['phone_number'] = statement.excluded.phone_number
+
+    return statement.on_conflict_do_update(
+        index_elements=[Customer.location, Customer.email],
+        set_=update
+    ).returning(Customer.customer_id)
+
+def upsert_customer(location, name, email, phone='', newsletter_signup=False):
+    """
+    Create a new customer or update existing customer of a location in the
+    current transaction (the caller commits)
+    Returns the customer_id
+    """
+    statement = customer_upsert_statement(
+        db.session.get_bind().dialect.name, location, name, email, phone, newsletter_signup
+    )
+    if statement is not None:
+        return db.session.execute(statement).scalar_one()
+
+    # Dialects without ON CONFLICT: look the customer up, then insert or update
+    customer = db.session.execute(customer_by_email_query(location, email)).scalar_one_or_none()
+    if customer:
+        if newsletter_signup:
+            customer.newsletter_signup = True
+        if phone:
+            customer.phone_number = phone
+        if name:
+            customer.customer_name = name
+    else:
+        customer = Customer(
+            location=location,
+            customer_name=name if name else 'Guest',
+            email=email,
+            phone_number=phone if phone else None,
+            newsletter_signup=newsletter_signup
+        )
+        db.session.add(customer)
+
+    db.session.flush()
+    return customer.customer_id
+
+def announce_booking(location, table_number, timeslot, ends_at):
+    """
+    Commit the current booking transaction and announce the booking to the
+    live availability streams. On PostgreSQL the event is sent with pg_notify
+    inside the transaction, so it reaches every worker only if the commit
+    succeeds; elsewhere it is published on the in-process bus after the commit.
+    """
+    event = booking_event(location, table_number, timeslot, ends_at)
+    notify = db.session.get_bind().dialect.name == 'postgresql'
+    if notify:
+        db.session.execute(notify_statement(event))
+
+    db.session.commit()
+    invalidate_schedules(location, timeslot)
+
+    if not notify:
+        availability_bus.publish(event)
+
+def default_duration():
+    """Return the reservation length used when none is given"""
+    return timedelta(minutes=Config.RESERVATION_MINUTES)
+
+def max_duration():
+    """Return the longest allowed reservation, which bounds overlap searches"""
+    return timedelta(minutes=Config.MAX_RESERVATION_MINUTES)
+
+def service_day(timeslot):
+    """Return midnight of the timeslot's day (with the location, the schedule cache key)"""
+    return datetime.combine(timeslot.date(), time())
+
+def location_lock_key(location):
+    """Return a location's advisory lock namespace: a signed 32-bit hash of its name"""
+    key = zlib.crc32(location.encode())
+    return key - 2 ** 32 if key >= 2 ** 31 else key
+
+def timeslot_lock_statement(location, timeslot):
+    """
+    Build the PostgreSQL transaction-scoped advisory lock for a timeslot's day
+    at a location. Overlapping bookings of one day are serialized; the exclusion
+    constraint covers the rest (e.g. bookings crossing midnight)
+    Returns a select statement
+    """
+    return select(func.pg_advisory_xact_lock(location_lock_key(location), int(timeslot.strftime('%Y%m%d'))))
+
+def used_tables_query(location, start, end):
+    """
+    Build the query for a location's table numbers with a booking overlapping [start, end)
+    Bounding timeslot by MAX_RESERVATION_MINUTES keeps it an index range scan
+    Returns a select statement
+    """
+    return select(Reservation.table_number).where(
+        Reservation.location == location,
+        Reservation.timeslot > start - max_duration(),
+        Reservation.timeslot < end,
+        Reservation.ends_at > start
+    )
+
+def claim_table_statement(location, customer_id, start, end, number_of_guests):
+    """
+    Build the INSERT ... SELECT that claims the location's best-fitting table free
+    for [start, end): the smallest table that seats the party, lowest number first
+    Returns an insert statement returning (reservation_id, table_number)
+    """
+    free_table = (
+        select(
+            literal(location, type_=Reservation.location.type),
+            literal(customer_id),
+            literal(start, type_=Reservation.timeslot.type),
+            literal(end, type_=Reservation.ends_at.type),
+            DiningTable.table_number,
+            literal(number_of_guests),
+            literal(datetime.utcnow(), type_=Reservation.created_at.type)
+        )
+        .where(
+            DiningTable.location == location,
+            DiningTable.seats >= number_of_guests,
+            DiningTable.table_number.not_in(used_tables_query(location, start, end))
         )
+        .order_by(DiningTable.seats, DiningTable.table_number)
+        .limit(1)
+    )
+    return (
+        Reservation.__table__.insert()
+        .from_select(
+            ['location', 'customer_id', 'timeslot', 'ends_at', 'table_number', 'number_of_guests', 'created_at'],
+            free_table
+        )
+        .returning(Reservation.reservation_id, Reservation.table_number)
+    )
+
+def book_table(location, name, email, phone, newsletter_signup, timeslot, duration, number_of_guests,
+               max_retries=3, idempotent_request=None, confirmation=None):
+    """
+    Upsert the customer and claim the location's best-fitting table free for the
+    whole reservation in one transaction. The table is picked and claimed in a single
+    INSERT ... SELECT. On PostgreSQL the day is serialized with a transaction-scoped
+    advisory lock and overlaps are rejected by an exclusion constraint; other
+    dialects (e.g. SQLite) serialize writes and rely on unique_timeslot_table.
+    Conflicts are retried up to max_retries times, then answered like a full slot.
+    With an idempotent_request, confirmation(reservation_id, table_number) builds
+    the 201 body, which is stored with the key in the booking transaction; a key
+    that already has a stored response raises DuplicateRequest instead.
+    Returns (reservation_id, table_number) on success, None if no free table fits
+    (or every attempt lost the race for one)
+    """
+    lock_slot = db.session.get_bind().dialect.name == 'postgresql'
+    floor_plan = get_floor_plan(location)
+    ends_at = timeslot + duration
+    day = service_day(timeslot)
+
+    for attempt in range(max_retries):
+        try:
+            customer_id = upsert_customer(location, name, email, phone, newsletter_signup)
+
+            # A cached schedule only ever misses bookings, so a party it cannot
+            # seat cannot be seated: skip the lock and the claim
+            cached = occupancy_cache.peek((location, day))
+            if cached is not None and not floor_plan.can_seat(cached.occupancy(timeslot, ends_at), number_of_guests):
+                db.session.commit()
+                invalidate_response_etags(location, customer_id)
+                return None
+
+            if lock_slot:
+                db.session.execute(timeslot_lock_statement(location, timeslot))
+
+            if idempotent_request is not None:
+                # A retry racing the original waited for the day's lock (or SQLite's
+                # write lock), so a stored response is visible here
+                stored = db.session.execute(stored_response_query(idempotent_request)).first()
+                if stored is not None:
+                    db.session.rollback()
+                    raise DuplicateRequest(stored)
+
+            row = db.session.execute(
+                claim_table_statement(location, customer_id, timeslot, ends_at, number_of_guests)
+            ).first()
+
+            if row is None:
+                # Read the day while still holding the lock so later requests
+                # (and the alternatives for this one) skip the database
+                schedule = _load_schedule(location, day)
+                db.session.commit()
+                occupancy_cache.put((location, day), schedule)
+                invalidate_response_etags(location, customer_id)
+                return None
+
+            record_booking_report(location, customer_id, row.reservation_id, timeslot, ends_at, number_of_guests)
+
+            for statement in booking_job_statements(row.reservation_id, email, newsletter_signup):
+                db.session.execute(statement)
+
+            if idempotent_request is not None:
+                db.session.execute(store_response_statement(
+                    db.session.get_bind().dialect.name, idempotent_request,
+                    201, confirmation(row.reservation_id, row.table_number)
+                ))
+
+            announce_booking(location, row.table_number, timeslot, ends_at)
+            invalidate_response_etags(location, customer_id)
+            return row.reservation_id, row.table_number
+
+        except DuplicateRequest:
+            raise
+        except IntegrityError as e:
+            # Another booking claimed an overlapping slot on the same table first
+            db.session.rollback()
+            logger.warning('Table allocation conflict', extra={
+                'attempt': attempt + 1, 'max_retries': max_retries, 'error': str(e)
+            })
+        except Exception:
+            db.session.rollback()
+            raise
+
+    # Every attempt lost the race for a table: answer as if none is free, after
+    # dropping the cached schedule that missed the winning bookings
+    invalidate_schedules(location, timeslot)
+    return None
+
+def repeat_booking_expression(customer_id, reservation_id):
+    """Return a SQL expression that is 1 when the customer booked before reservation_id, else 0"""
+    earlier = exists().where(
+        Reservation.customer_id == customer_id,
+        Reservation.reservation_id < reservation_id
+    )
+    return case((earlier, 1), else_=0)
+
+def report_increment_statement(dialect_name, location, customer_id, reservation_id, timeslot, ends_at, guests):
+    """
+    Build the upsert adding one booking to the location's hourly_occupancy, one
+    row per hour it spans
+    Returns an insert statement, or None if the dialect has no ON CONFLICT support
+    """
+    insert = upsert_insert(dialect_name)
+    if insert is None:
+        return None
+
+    increments = booking_increments(timeslot, ends_at, guests, repeat_booking_expression(customer_id, reservation_id))
+    statement = insert(HourlyOccupancy).values([{'location': location, **row} for row in increments])
+    table = HourlyOccupancy.__table__
+    return statement.on_conflict_do_update(
+        index_elements=[HourlyOccupancy.location, HourlyOccupancy.service_date, HourlyOccupancy.hour],
+        set_={column: table.c[column] + statement.excluded[column]
+              for column in ReportAccumulator.COLUMNS}
+    )
+
+def record_booking_report(location, customer_id, reservation_id, timeslot, ends_at, guests):
+    """Add a booking to the location's reporting aggregates in the current transaction (the caller commits)"""
+    statement = report_increment_statement(
+        db.session.get_bind().dialect.name, location, customer_id, reservation_id, timeslot, ends_at, guests
+    )
+    if statement is not None:
+        db.session.execute(statement)
+        return
+
+    # Dialects without ON CONFLICT: read and update each hour
+    repeat = db.session.execute(select(repeat_booking_expression(customer_id, reservation_id))).scalar()
+    for increment in booking_increments(timeslot, ends_at, guests, repeat):
+        row = db.session.get(HourlyOccupancy, (location, increment['service_date'], increment['hour']))
+        if row is None:
+            db.session.add(HourlyOccupancy(location=location, **increment))
+        else:
+            for column in ReportAccumulator.COLUMNS:
+                setattr(row, column, getattr(row, column) + increment[column])
+    db.session.flush()
+
+def rebuild_reports(location, batch_size=1000):
+    """
+    Recompute a location's hourly_occupancy from every reservation (backfill or repair)
+    On PostgreSQL bookings wait until the rebuild commits, so none is counted
+    twice or lost
+    Returns the number of hourly rows written
+    """
+    try:
+        if db.session.get_bind().dialect.name == 'postgresql':
+            db.session.execute(text('LOCK TABLE reservations IN SHARE MODE'))
+        db.session.execute(delete(HourlyOccupancy).where(HourlyOccupancy.location == location))
+
+        accumulator = ReportAccumulator()
+        seen_customers = set()
+        bookings = db.session.execute(
+            select(Reservation.customer_id, Reservation.timeslot, Reservation.ends_at, Reservation.number_of_guests)
+            .where(Reservation.location == location)
+            .order_by(Reservation.reservation_id)
+        ).yield_per(batch_size)
+        for customer_id, timeslot, ends_at, guests in bookings:
+            accumulator.add(timeslot, ends_at, guests, customer_id in seen_customers)
+            seen_customers.add(customer_id)
 
-        db.session.add(reservation)
+        rows = [{'location': location, **row} for row in accumulator.rows()]
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(HourlyOccupancy.__table__.insert(), rows[start:start + batch_size])
         db.session.commit()
+        return len(rows)
+    except Exception:
+        db.session.rollback()
+        raise
+
+def daily_report_query(location, start, end):
+    """
+    Build the query summing a location's hourly_occupancy per date for the dates [start, end]
+    Returns a select of (service_date, reservations, covers, repeat_reservations, table_minutes)
+    """
+    return (
+        select(
+            HourlyOccupancy.service_date,
+            func.sum(HourlyOccupancy.reservations),
+            func.sum(HourlyOccupancy.covers),
+            func.sum(HourlyOccupancy.repeat_reservations),
+            func.sum(HourlyOccupancy.table_minutes)
+        )
+        .where(
+            HourlyOccupancy.location == location,
+            HourlyOccupancy.service_date >= start,
+            HourlyOccupancy.service_date <= end
+        )
+        .group_by(HourlyOccupancy.service_date)
+    )
+
+def hourly_report_query(location, start, end):
+    """
+    Build the query reading a location's hourly_occupancy rows of the dates [start, end]
+    Returns a select of (service_date, hour, reservations, covers, table_minutes)
+    """
+    return (
+        select(
+            HourlyOccupancy.service_date, HourlyOccupancy.hour, HourlyOccupancy.reservations,
+            HourlyOccupancy.covers, HourlyOccupancy.table_minutes
+        )
+        .where(
+            HourlyOccupancy.location == location,
+            HourlyOccupancy.service_date >= start,
+            HourlyOccupancy.service_date <= end
+        )
+        .order_by(HourlyOccupancy.service_date, HourlyOccupancy.hour)
+    )
 
-        return reservation
+def get_daily_report(location, start, end):
+    """
+    Get a location's covers, reservations and repeat-customer rates per day for
+    the dates [start, end] from the hourly aggregates
+    Returns a dictionary (see reports.daily_report)
+    """
+    return daily_report(db.session.execute(daily_report_query(location, start, end)).all(), start, end)
+
+def get_hourly_report(location, start, end):
+    """
+    Get a location's table utilization per hour for the dates [start, end] from
+    the hourly aggregates and its floor plan
+    Returns a dictionary (see reports.hourly_report)
+    """
+    rows = db.session.execute(hourly_report_query(location, start, end)).all()
+    return hourly_report(rows, start, end, get_floor_plan(location).total_tables)
 
-    except Exception as e:
+def idempotency_cutoff():
+    """Return the creation time before which stored responses have expired"""
+    return datetime.utcnow() - timedelta(hours=Config.IDEMPOTENCY_KEY_TTL_HOURS)
+
+def stored_response_query(idempotent_request):
+    """
+    Build the lookup of the unexpired stored response for a request's key
+    Returns a select statement of (request_hash, status_code, response_body)
+    """
+    return select(
+        IdempotencyKey.request_hash, IdempotencyKey.status_code, IdempotencyKey.response_body
+    ).where(
+        IdempotencyKey.location == idempotent_request.location,
+        IdempotencyKey.client == idempotent_request.client,
+        IdempotencyKey.idempotency_key == idempotent_request.key,
+        IdempotencyKey.endpoint == idempotent_request.endpoint,
+        IdempotencyKey.created_at > idempotency_cutoff()
+    )
+
+def store_response_statement(dialect_name, idempotent_request, status_code, body):
+    """
+    Build the statement storing a response for a request's key. An expired
+    response still stored under the key is replaced.
+    Returns an insert statement
+    """
+    values = {
+        'location': idempotent_request.location,
+        'client': idempotent_request.client,
+        'idempotency_key': idempotent_request.key,
+        'endpoint': idempotent_request.endpoint,
+        'request_hash': idempotent_request.request_hash,
+        'status_code': status_code,
+        'response_body': dumps(body),
+        'created_at': datetime.utcnow()
+    }
+
+    insert = upsert_insert(dialect_name)
+    if insert is None:
+        return IdempotencyKey.__table__.insert().values(**values)
+
+    statement = insert(IdempotencyKey).values(**values)
+    return statement.on_conflict_do_update(
+        index_elements=[
+            IdempotencyKey.location, IdempotencyKey.client, IdempotencyKey.idempotency_key, IdempotencyKey.endpoint
+        ],
+        set_={column: statement.excluded[column]
+              for column in ('request_hash', 'status_code', 'response_body', 'created_at')}
+    )
+
+def get_stored_response(idempotent_request):
+    """
+    Get the unexpired stored response for a request's key
+    Returns a (request_hash, status_code, response_body) row or None
+    """
+    return db.session.execute(stored_response_query(idempotent_request)).first()
+
+def purge_idempotency_keys():
+    """
+    Delete the stored responses older than IDEMPOTENCY_KEY_TTL_HOURS
+    Returns the number of deleted rows
+    """
+    try:
+        result = db.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.created_at <= idempotency_cutoff())
+        )
+        db.session.commit()
+        return result.rowcount
+    except Exception:
         db.session.rollback()
-        print(f"Error creating reservation: {e}")
-        return None
+        raise
+
+# Job kinds enqueued by the booking and newsletter helpers (handlers are in notifications.py)
+CONFIRMATION_EMAIL = 'reservation_confirmation'
+NEWSLETTER_SYNC = 'newsletter_sync'
+
+def enqueue_job_statement(kind, payload, run_at=None):
+    """
+    Build the insert of one pending job; it runs once the transaction commits
+    Returns an insert statement
+    """
+    now = datetime.utcnow()
+    return Job.__table__.insert().values(
+        kind=kind, payload=dumps(payload), status='pending', attempts=0,
+        run_at=run_at or now, created_at=now
+    )
+
+def booking_job_statements(reservation_id, email, newsletter_signup):
+    """
+    Build the job inserts for the side effects of a booking: the confirmation
+    email, and a newsletter sync when the guest opted in
+    Returns a list of insert statements
+    """
+    statements = [enqueue_job_statement(CONFIRMATION_EMAIL, {'reservation_id': reservation_id})]
+    if newsletter_signup:
+        statements.append(enqueue_job_statement(NEWSLETTER_SYNC, {'emails': [email]}))
+    return statements
 
-def get_reservations_by_timeslot(timeslot):
+def due_jobs_query(limit, lock_timeout, now):
+    """
+    Build the selection of up to limit due jobs: pending ones whose run time
+    came, and running ones left for longer than lock_timeout (their worker
+    died). On PostgreSQL, FOR UPDATE SKIP LOCKED lets workers claim
+    concurrently without waiting on each other; SQLite serializes the claim
+    under its write lock.
+    Returns a select statement of job ids
     """
-    Get count of reservations for a specific timeslot
-    Returns count of existing reservations
+    return (
+        select(Job.job_id)
+        .where(or_(
+            and_(Job.status == 'pending', Job.run_at <= now),
+            and_(Job.status == 'running', Job.locked_at <= now - lock_timeout)
+        ))
+        .order_by(Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+def claim_jobs_statement(limit, lock_timeout):
+    """
+    Build the statement claiming up to limit due jobs for one worker
+    Returns an update statement returning (job_id, kind, payload, attempts)
+    """
+    now = datetime.utcnow()
+    return (
+        update(Job)
+        .where(Job.job_id.in_(due_jobs_query(limit, lock_timeout, now).scalar_subquery()))
+        .values(status='running', locked_at=now, attempts=Job.attempts + 1)
+        .returning(Job.job_id, Job.kind, Job.payload, Job.attempts)
+        .execution_options(synchronize_session=False)
+    )
+
+def claim_jobs(limit):
+    """
+    Claim up to limit due jobs and commit
+    Returns a list of (job_id, kind, payload dict, attempts) tuples
     """
     try:
-        count = Reservation.query.filter_by(timeslot=timeslot).count()
-        return count
-    except Exception as e:
-        print(f"Error getting reservations by timeslot: {e}")
-        return 0
+        rows = db.session.execute(claim_jobs_statement(
+            limit, timedelta(seconds=Config.JOB_LOCK_TIMEOUT_SECONDS)
+        )).all()
+        db.session.commit()
+        return [(row.job_id, row.kind, json.loads(row.payload), row.attempts) for row in rows]
+    except Exception:
+        db.session.rollback()
+        raise
+
+def finish_jobs(job_ids):
+    """Delete jobs that ran successfully and commit"""
+    try:
+        db.session.execute(delete(Job).where(Job.job_id.in_(job_ids)))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+def retry_jobs(job_ids, error, run_at):
+    """Put failed jobs back in the queue to run again at run_at and commit"""
+    try:
+        db.session.execute(
+            update(Job).where(Job.job_id.in_(job_ids))
+            .values(status='pending', run_at=run_at, locked_at=None, last_error=error)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+def fail_jobs(job_ids, error):
+    """Mark jobs that used up their attempts as failed (kept for inspection) and commit"""
+    try:
+        db.session.execute(
+            update(Job).where(Job.job_id.in_(job_ids))
+            .values(status='failed', locked_at=None, last_error=error)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+def job_stats():
+    """
+    Count the queued jobs by status
+    Returns a dictionary with pending, running and failed counts and the age
+    in seconds of the oldest due job
+    """
+    counts = dict(db.session.execute(select(Job.status, func.count()).group_by(Job.status)).all())
+    oldest = db.session.execute(
+        select(func.min(Job.run_at)).where(Job.status == 'pending', Job.run_at <= datetime.utcnow())
+    ).scalar()
+    return {
+        'pending': counts.get('pending', 0),
+        'running': counts.get('running', 0),
+        'failed': counts.get('failed', 0),
+        'oldest_due_seconds': round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else 0.0
+    }
+
+def bookings_query(location, start, end):
+    """
+    Build the query for (table_number, timeslot, ends_at) of every booking at
+    a location starting in [start, end)
+    Returns a select statement
+    """
+    return (
+        select(Reservation.table_number, Reservation.timeslot, Reservation.ends_at)
+        .where(Reservation.location == location, Reservation.timeslot >= start, Reservation.timeslot < end)
+    )
+
+def load_schedule(location, start, end):
+    """
+    Load a location's bookings starting in [start, end) into an interval index
+    Returns a Schedule
+    """
+    return Schedule(db.session.execute(bookings_query(location, start, end)).yield_per(1000))
+
+def _load_schedule(location, day):
+    """Load every booking at a location that can overlap a reservation starting on day"""
+    return load_schedule(location, *day_window(day, max_duration()))
 
-def get_used_tables(timeslot):
+def get_schedule(location, day):
     """
-    Get list of used table numbers for a specific timeslot
-    Returns list of table numbers
+    Get a location's booking schedule around a service day, from the cache when possible
+    A client that just wrote reads the primary instead, since the cached schedule
+    may have been loaded from a replica that lags its write
+    Returns a Schedule
+    """
+    if reading_own_writes():
+        generation = occupancy_cache.generation()
+        schedule = _load_schedule(location, day)
+        occupancy_cache.put_if_current((location, day), schedule, generation)
+        return schedule
+    return occupancy_cache.get_or_load((location, day), lambda: _load_schedule(location, day))
+
+def invalidate_schedules(location, timeslot):
+    """Drop every cached day of a location whose schedule can contain a booking at timeslot"""
+    day = service_day(timeslot - max_duration())
+    while day <= timeslot + max_duration():
+        occupancy_cache.invalidate((location, day))
+        day += timedelta(days=1)
+
+def get_occupancy(location, start, end):
+    """
+    Get a location's occupancy bitmap for [start, end), from the cache when possible
+    Returns an integer with bit n set when table n has an overlapping booking
+    """
+    return get_schedule(location, service_day(start)).occupancy(start, end)
+
+def get_availability(location, timeslot, duration, guests=None):
+    """
+    Get a location's table availability for [timeslot, timeslot + duration)
+    from its floor plan and the cached schedule
+    Returns a dictionary (see FloorPlan.availability)
+    """
+    occupancy = get_occupancy(location, timeslot, timeslot + duration)
+    return get_floor_plan(location).availability(occupancy, guests)
+
+def alternative_slots(schedule, floor_plan, timeslot, duration, guests):
+    """
+    Find the nearest start times on the same day at which the party fits
+    Returns a list of datetimes, nearest first
+    """
+    day = service_day(timeslot)
+    return schedule.alternatives(
+        floor_plan, timeslot, duration, guests,
+        step=timedelta(minutes=Config.ALTERNATIVE_STEP_MINUTES),
+        search=timedelta(minutes=Config.ALTERNATIVE_SEARCH_MINUTES),
+        limit=Config.ALTERNATIVE_COUNT,
+        earliest=max(day, datetime.now()),
+        latest=day + timedelta(days=1)
+    )
+
+def suggest_alternatives(location, timeslot, duration, guests):
+    """
+    Suggest other start times for a party that cannot be seated at timeslot
+    Returns a list of datetimes, nearest first (empty on errors)
     """
     try:
-        reservations = Reservation.query.filter_by(timeslot=timeslot).all()
-        return [r.table_number for r in reservations]
-    except Exception as e:
-        print(f"Error getting used tables: {e}")
+        schedule = get_schedule(location, service_day(timeslot))
+        return alternative_slots(schedule, get_floor_plan(location), timeslot, duration, guests)
+    except Exception:
+        logger.exception("Error suggesting alternative timeslots")
         return []
 
-def add_newsletter_signup(email, name=''):
+def newsletter_upsert_statement(dialect_name, location, signups):
     """
-    Add email to newsletter signup
-    Returns True on success, False on failure
+    Build one INSERT ... ON CONFLICT (location, email) DO UPDATE for a batch of
+    signups to a location's newsletter
+    signups is a list of (email, name) tuples with unique emails
+    Returns an insert statement, or None if the dialect has no ON CONFLICT support
     """
+    insert = upsert_insert(dialect_name)
+    if insert is None:
+        return None
+
+    now = datetime.utcnow()
+    statement = insert(Customer).values([
+        {
+            'location': location,
+            'customer_name': name if name else 'Newsletter Subscriber',
+            'email': email,
+            'newsletter_signup': True,
+            'created_at': now
+        }
+        for email, name in signups
+    ])
+    return statement.on_conflict_do_update(
+        index_elements=[Customer.location, Customer.email],
+        set_={'newsletter_signup': True}
+    )
+
+def upsert_newsletter_signups(location, signups, idempotent_request=None, response_body=None):
+    """
+    Subscribe a batch of (email, name) tuples to a location's newsletter in one
+    statement and one commit, enqueueing one newsletter sync job for the batch
+    Existing customers keep their name and are flagged as subscribed
+    With an idempotent_request, response_body is stored as its 201 response in
+    the same transaction
+    Returns the number of signups written; raises on database errors
+    """
+    # ON CONFLICT cannot touch the same row twice in one statement
+    unique = list({email: (email, name) for email, name in signups}.values())
+    if not unique:
+        return 0
+
     try:
-        customer = Customer.query.filter_by(email=email).first()
+        statement = newsletter_upsert_statement(db.session.get_bind().dialect.name, location, unique)
 
-        if customer:
-            # Update existing customer
-            customer.newsletter_signup = True
-            db.session.commit()
-            return True
+        if statement is not None:
+            db.session.execute(statement)
         else:
-            # Create new customer
-            customer = Customer(
-                customer_name=name if name else 'Newsletter Subscriber',
-                email=email,
-                newsletter_signup=True
-            )
-            db.session.add(customer)
-            db.session.commit()
-            return True
-
-    except Exception as e:
+            # Dialects without ON CONFLICT: look up the whole batch at once, then insert the rest
+            existing = {
+                customer.email: customer
+                for customer in Customer.query.filter(
+                    Customer.location == location, Customer.email.in_([email for email, _ in unique])
+                )
+            }
+            for email, name in unique:
+                if email in existing:
+                    existing[email].newsletter_signup = True
+                else:
+                    db.session.add(Customer(
+                        location=location,
+                        customer_name=name if name else 'Newsletter Subscriber',
+                        email=email,
+                        newsletter_signup=True
+                    ))
+
+        # One sync job per batch, committed with the signups
+        db.session.execute(enqueue_job_statement(NEWSLETTER_SYNC, {'emails': [email for email, _ in unique]}))
+
+        if idempotent_request is not None:
+            db.session.execute(store_response_statement(
+                db.session.get_bind().dialect.name, idempotent_request, 201, response_body
+            ))
+
+        db.session.commit()
+        return len(unique)
+
+    except Exception:
         db.session.rollback()
-        print(f"Error adding newsletter signup: {e}")
-        return False
+        raise
 
-def get_customer_by_email(email):
+def add_newsletter_signup(location, email, name='', idempotent_request=None, response_body=None):
     """
-    Get customer by email
-    Returns customer object or None
+    Add email to a location's newsletter signup, storing response_body for an
+    idempotent_request in the same transaction
+    Returns True on success, False on failure
     """
     try:
-        return Customer.query.filter_by(email=email).first()
-    except Exception as e:
-        print(f"Error getting customer by email: {e}")
-        return None
+        upsert_newsletter_signups(location, [(email, name)], idempotent_request, response_body)
+        return True
+
+    except Exception:
+        logger.exception("Error adding newsletter signup")
+        return False
 
-def get_reservation_by_id(reservation_id):
+def customer_by_email_query(location, email):
     """
-    Get reservation by ID
+    Build the lookup query of a location's customer by email
+    Returns a select statement
+    """
+    return select(Customer).where(Customer.location == location, Customer.email == email)
+
+def get_reservation_by_id(location, reservation_id):
+    """
+    Get a location's reservation by ID
     Returns reservation object or None
     """
     try:
-        return Reservation.query.get(reservation_id)
-    except Exception as e:
-        print(f"Error getting reservation by ID: {e}")
+        return db.session.execute(
+            select(Reservation)
+            .options(joinedload(Reservation.customer))
+            .where(Reservation.reservation_id == reservation_id, Reservation.location == location)
+        ).scalar_one_or_none()
+    except Exception:
+        logger.exception("Error getting reservation by ID")
         return None
 
-def get_all_reservations():
+def _filter_reservations(query, location, start=None, end=None, customer_id=None, email=None):
     """
-    Get all reservations ordered by timeslot
-    Returns list of reservation objects
+    Apply the location and listing filters to a query that already joins Customer
+    Returns the query ordered newest first on (timeslot, reservation_id)
     """
-    try:
-        return Reservation.query.order_by(Reservation.timeslot.desc()).all()
-    except Exception as e:
-        print(f"Error getting all reservations: {e}")
-        return []
+    query = query.where(Reservation.location == location)
+    if start is not None:
+        query = query.where(Reservation.timeslot >= start)
+    if end is not None:
+        query = query.where(Reservation.timeslot <= end)
+    if customer_id is not None:
+        query = query.where(Reservation.customer_id == customer_id)
+    if email is not None:
+        query = query.where(Customer.email == email)
+
+    return query.order_by(Reservation.timeslot.desc(), Reservation.reservation_id.desc())
+
+def reservations_page_query(location, limit, after=None, start=None, end=None, customer_id=None, email=None):
+    """
+    Build one keyset page of a location's listing with customers loaded in the same query
+    Returns a select statement fetching limit + 1 rows
+    """
+    query = (
+        select(Reservation)
+        .join(Reservation.customer)
+        .options(contains_eager(Reservation.customer))
+    )
+    query = _filter_reservations(query, location, start, end, customer_id, email)
+
+    if after is not None:
+        after_timeslot, after_id = after
+        query = query.where(or_(
+            Reservation.timeslot < after_timeslot,
+            and_(Reservation.timeslot == after_timeslot, Reservation.reservation_id < after_id)
+        ))
+
+    return query.limit(limit + 1)
+
+def get_reservations_page(location, limit, after=None, start=None, end=None, customer_id=None, email=None):
+    """
+    Get one page of a location's reservations using keyset pagination on (timeslot, reservation_id)
+    after is the (timeslot, reservation_id) of the last row of the previous page
+    Customers are loaded in the same query so to_dict issues no extra SELECTs
+    Returns (reservations, has_more)
+    """
+    query = reservations_page_query(location, limit, after, start, end, customer_id, email)
+    reservations = db.session.execute(query).scalars().all()
+    return reservations[:limit], len(reservations) > limit
+
+def reservation_rows_query(location, start=None, end=None, customer_id=None, email=None):
+    """
+    Build the column projection of a location's reservations used by the lean serializer
+    Returns a select statement over RESERVATION_ROW_COLUMNS
+    """
+    return _filter_reservations(
+        select(*RESERVATION_ROW_COLUMNS).join(Reservation.customer),
+        location, start, end, customer_id, email
+    )
+
+def iter_reservation_dicts(location, start=None, end=None, customer_id=None, email=None, batch_size=1000):
+    """
+    Stream a location's reservations from a server-side cursor as plain
+    dictionaries, projecting columns directly instead of loading ORM objects
+    Yields dictionaries ordered newest first
+    """
+    query = reservation_rows_query(location, start, end, customer_id, email)
+    result = db.session.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+
+    for row in result:
+        yield reservation_row_to_dict(row)
@@ -0,0 +1,26 @@
+"""
+Per-timeslot occupancy bitmaps
+A timeslot's booked tables are kept as one integer with bit n set when table
+n is taken. Python integers are unbounded, so the same representation works
+for a 30-table room or several rooms with hundreds of tables.
+"""
+
+def bitmap_from_tables(table_numbers):
+    """Return the occupancy bitmap for an iterable of booked table numbers"""
+    bitmap = 0
+    for table_number in table_numbers:
+        bitmap |= 1 << table_number
+    return bitmap
+
+def tables_from_bitmap(bitmap):
+    """Return the booked table numbers in a bitmap, in ascending order"""
+    tables = []
+    while bitmap:
+        lowest = bitmap & -bitmap
+        tables.append(lowest.bit_length() - 1)
+        bitmap ^= lowest
+    return tables
+
+def count_booked(bitmap):
+    """Return the number of booked tables"""
+    return bin(bitmap).count('1')
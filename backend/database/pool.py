@@ -0,0 +1,150 @@
+"""
+Connection pool configuration and per-worker pool metrics
+Each pool keeps its own checkout counters, so the default database, location
+databases and replicas are reported separately; a pool replaced by dispose()
+(e.g. after a fork) starts from zero.
+"""
+
+import os
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from config import Config
+
+class PoolMetrics:
+    """Counters for connection checkouts of one pool in the current worker process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_checkout(self, wait):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'total_wait_ms': round(self.total_wait * 1000, 3),
+                'avg_wait_ms': round(self.total_wait * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3)
+            }
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection in its metrics"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+def engine_options(database_uri):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS from Config
+    Sizing only applies to server databases; SQLite files keep SQLAlchemy's
+    default pool size (in-memory databases use a StaticPool and are not instrumented)
+    """
+    options = {
+        'pool_pre_ping': Config.DB_POOL_PRE_PING,
+        'poolclass': InstrumentedQueuePool
+    }
+
+    if database_uri and database_uri.startswith('sqlite'):
+        return options
+
+    options.update({
+        'pool_size': Config.DB_POOL_SIZE,
+        'max_overflow': Config.DB_MAX_OVERFLOW,
+        'pool_timeout': Config.DB_POOL_TIMEOUT,
+        'pool_recycle': Config.DB_POOL_RECYCLE
+    })
+
+    if Config.DB_STATEMENT_TIMEOUT_MS and database_uri.startswith('postgresql'):
+        options['connect_args'] = {
+            'options': f'-c statement_timeout={Config.DB_STATEMENT_TIMEOUT_MS}'
+        }
+
+    return options
+
+def pool_stats(engine):
+    """
+    Return the current pool state plus this worker's checkout counters
+    """
+    pool = engine.pool
+    stats = {
+        'pool_class': type(pool).__name__
+    }
+
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'timeout_seconds': pool.timeout()
+        })
+
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(pool.metrics.snapshot())
+    return stats
+
+def engine_name(bind_key):
+    """Return the name reported for a Flask-SQLAlchemy bind ('default' for DATABASE_URL)"""
+    return bind_key or 'default'
+
+def all_pool_stats(engines):
+    """
+    Return the pool state of every engine of this worker
+    engines maps Flask-SQLAlchemy bind keys to engines (db.engines)
+    Returns {'pid': ..., 'engines': {name: pool_stats}}
+    """
+    return {
+        'pid': os.getpid(),
+        'engines': {engine_name(key): pool_stats(engine) for key, engine in engines.items()}
+    }
+
+POOL_GAUGES = ('checked_out', 'overflow', 'checkouts', 'timeouts', 'avg_wait_ms', 'max_wait_ms')
+
+def pool_gauges(engines):
+    """
+    Return the /api/metrics gauges of every engine's pool, labelled by engine
+    and grouped by metric name
+    """
+    stats = {engine_name(key): pool_stats(engine) for key, engine in engines.items()}
+    return {
+        f'db_pool_{name}{{engine="{engine}"}}': values[name]
+        for name in POOL_GAUGES
+        for engine, values in sorted(stats.items())
+        if name in values
+    }
+
+def dispose_after_fork(engines):
+    """
+    Drop connections inherited from the parent process without closing them,
+    so a preloaded app never shares sockets between forked workers
+    """
+    for engine in engines:
+        engine.dispose(close=False)
@@ -0,0 +1,142 @@
+"""
+Reporting aggregates over reservations
+Bookings are summed per (service date, hour) into the hourly_occupancy table:
+reservations and covers count in the hour the booking starts, and booked
+table-minutes are spread over every hour the booking spans. The booking
+transaction adds its increments (see models.report_increment_statement), and
+`flask rebuild-reports` recomputes the table from history. Daily and hourly
+reports then read at most 24 rows per day of the requested range, however much
+history there is. Hours are the UTC hours of the stored timeslots.
+"""
+
+from datetime import timedelta
+
+def hour_buckets(start, end):
+    """
+    Split [start, end) at clock hours
+    Returns a list of (service_date, hour, minutes) tuples
+    """
+    buckets = []
+    bucket = start.replace(minute=0, second=0, microsecond=0)
+    while bucket < end:
+        following = bucket + timedelta(hours=1)
+        minutes = (min(end, following) - max(start, bucket)).total_seconds() / 60
+        buckets.append((bucket.date(), bucket.hour, int(round(minutes))))
+        bucket = following
+    return buckets
+
+def booking_increments(timeslot, ends_at, guests, repeat=0):
+    """
+    Return the hourly_occupancy increments of one booking as row dictionaries
+    (repeat may be a SQL expression evaluated by the database)
+    """
+    rows = []
+    for service_date, hour, minutes in hour_buckets(timeslot, ends_at):
+        first = not rows
+        rows.append({
+            'service_date': service_date,
+            'hour': hour,
+            'reservations': 1 if first else 0,
+            'covers': guests if first else 0,
+            'repeat_reservations': repeat if first else 0,
+            'table_minutes': minutes
+        })
+    return rows
+
+class ReportAccumulator:
+    """Sums bookings into hourly_occupancy rows in memory (used by the rebuild)"""
+
+    COLUMNS = ('reservations', 'covers', 'repeat_reservations', 'table_minutes')
+
+    def __init__(self):
+        self._rows = {}
+
+    def add(self, timeslot, ends_at, guests, repeat):
+        """Add one booking; repeat is True when the customer booked before"""
+        for increment in booking_increments(timeslot, ends_at, guests, int(repeat)):
+            key = (increment['service_date'], increment['hour'])
+            row = self._rows.setdefault(key, dict.fromkeys(self.COLUMNS, 0))
+            for column in self.COLUMNS:
+                row[column] += increment[column]
+
+    def rows(self):
+        """Return the accumulated rows as dictionaries, in time order"""
+        return [
+            {'service_date': service_date, 'hour': hour, **row}
+            for (service_date, hour), row in sorted(self._rows.items())
+        ]
+
+def rate(part, whole):
+    """Return part / whole rounded for reports, or 0.0 when whole is 0"""
+    return round(part / whole, 4) if whole else 0.0
+
+def daily_report(rows, start, end):
+    """
+    Build the daily report for the dates [start, end] from
+    (service_date, reservations, covers, repeat_reservations, table_minutes) rows
+    Every date in the range is listed, with zeros when nothing was booked
+    Returns a dictionary with days and totals
+    """
+    by_date = {row[0]: row for row in rows}
+    days = []
+    totals = {'reservations': 0, 'covers': 0, 'repeat_reservations': 0}
+
+    day = start
+    while day <= end:
+        _, reservations, covers, repeat, table_minutes = by_date.get(day, (day, 0, 0, 0, 0))
+        days.append({
+            'date': day,
+            'reservations': reservations,
+            'covers': covers,
+            'repeat_reservations': repeat,
+            'repeat_rate': rate(repeat, reservations),
+            'booked_table_hours': round(table_minutes / 60, 2)
+        })
+        totals['reservations'] += reservations
+        totals['covers'] += covers
+        totals['repeat_reservations'] += repeat
+        day += timedelta(days=1)
+
+    totals['repeat_rate'] = rate(totals['repeat_reservations'], totals['reservations'])
+    totals['covers_per_day'] = round(totals['covers'] / len(days), 2) if days else 0.0
+    return {'start': start, 'end': end, 'days': days, 'totals': totals}
+
+def hourly_report(rows, start, end, total_tables):
+    """
+    Build the hourly utilization report for the dates [start, end] from
+    (service_date, hour, reservations, covers, table_minutes) rows
+    Utilization is booked table-minutes over the minutes all tables were available
+    Returns a dictionary with the booked hours and averages per hour of day
+    """
+    capacity = total_tables * 60
+    days = (end - start).days + 1
+    hours = []
+    by_hour = [{'hour': hour, 'covers': 0, 'table_minutes': 0} for hour in range(24)]
+
+    for service_date, hour, reservations, covers, table_minutes in rows:
+        hours.append({
+            'date': service_date,
+            'hour': hour,
+            'reservations': reservations,
+            'covers': covers,
+            'booked_table_minutes': table_minutes,
+            'utilization': rate(table_minutes, capacity)
+        })
+        by_hour[hour]['covers'] += covers
+        by_hour[hour]['table_minutes'] += table_minutes
+
+    by_hour_of_day = [
+        {
+            'hour': entry['hour'],
+            'covers': entry['covers'],
+            'avg_utilization': rate(entry['table_minutes'], capacity * days)
+        }
+        for entry in by_hour
+    ]
+    return {
+        'start': start,
+        'end': end,
+        'total_tables': total_tables,
+        'hours': hours,
+        'by_hour_of_day': by_hour_of_day
+    }
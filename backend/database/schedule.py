@@ -0,0 +1,74 @@
+"""
+In-memory interval index of table bookings
+Each table keeps its bookings as parallel sorted lists of start and end
+times. Bookings on one table never overlap (the database guarantees it),
+so both lists are sorted and an overlap check is one binary search per
+table. This is the fallback for databases without range types and the
+structure behind cached availability and "next free slot" suggestions.
+"""
+
+from bisect import bisect_left
+from datetime import timedelta
+
+from database.occupancy import bitmap_from_tables
+
+class Schedule:
+    """Booked [start, end) intervals per table for a window of time"""
+
+    def __init__(self, bookings=()):
+        self._starts = {}
+        self._ends = {}
+        for table_number, start, end in bookings:
+            self.add(table_number, start, end)
+
+    def add(self, table_number, start, end):
+        """Record a booking (must not overlap another booking of the table)"""
+        starts = self._starts.setdefault(table_number, [])
+        ends = self._ends.setdefault(table_number, [])
+        index = bisect_left(starts, start)
+        starts.insert(index, start)
+        ends.insert(index, end)
+
+    def is_free(self, table_number, start, end):
+        """Return True when the table has no booking overlapping [start, end)"""
+        starts = self._starts.get(table_number)
+        if not starts:
+            return True
+        # The only booking that can overlap is the last one starting before end
+        index = bisect_left(starts, end)
+        return index == 0 or self._ends[table_number][index - 1] <= start
+
+    def occupancy(self, start, end):
+        """Return the bitmap of tables with a booking overlapping [start, end)"""
+        return bitmap_from_tables(
+            table_number for table_number in self._starts
+            if not self.is_free(table_number, start, end)
+        )
+
+    def alternatives(self, floor_plan, start, duration, guests, step, search, limit, earliest=None, latest=None):
+        """
+        Find the start times nearest to start, in multiples of step up to search
+        away and within [earliest, latest), at which the party can be seated
+        Returns up to limit datetimes, nearest first (earlier first on ties)
+        """
+        found = []
+        offset = step
+        while offset <= search and len(found) < limit:
+            for candidate in (start - offset, start + offset):
+                if earliest is not None and candidate < earliest:
+                    continue
+                if latest is not None and candidate >= latest:
+                    continue
+                if floor_plan.can_seat(self.occupancy(candidate, candidate + duration), guests):
+                    found.append(candidate)
+            offset += step
+        return found[:limit]
+
+def day_window(day, max_duration):
+    """
+    Return the [start, end) window of booking start times a schedule for day
+    needs: anything that can overlap a reservation starting on that day
+    """
+    start = day - max_duration
+    end = day + timedelta(days=1) + max_duration
+    return start, end
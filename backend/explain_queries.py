@@ -0,0 +1,136 @@
+"""
+Query plan check for Café Fausse
+Runs EXPLAIN on every helper query in database/models.py and fails if any
+of them reads the customers, reservations, hourly_occupancy or jobs table with
+a sequential scan.
+Run this after applying migrations: python explain_queries.py
+"""
+
+from datetime import datetime, timedelta
+import json
+import sys
+
+from sqlalchemy import select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app import app
+from config import Config
+from database.db_config import db
+from database.models import (
+    claim_table_statement, used_tables_query, bookings_query,
+    customer_by_email_query, reservations_page_query, reservation_rows_query,
+    repeat_booking_expression, daily_report_query, hourly_report_query, due_jobs_query
+)
+
+CHECKED_TABLES = ('customers', 'reservations', 'hourly_occupancy', 'jobs')
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN wrapper that keeps the wrapped statement's bound parameters"""
+    inherit_cache = False
+
+    def __init__(self, statement, prefix):
+        self.statement = statement
+        self.prefix = prefix
+
+@compiles(Explain)
+def visit_explain(element, compiler, **kw):
+    return f"{element.prefix} {compiler.process(element.statement, **kw)}"
+
+def helper_queries():
+    """
+    Return (name, statement, ordered_scan_ok) tuples covering every query shape
+    the API runs. ordered_scan_ok marks unfiltered listings, which are expected
+    to walk an index in order and stop at the LIMIT.
+    """
+    tomorrow = datetime.now() + timedelta(days=1)
+    slot = tomorrow.replace(hour=19, minute=0, second=0, microsecond=0)
+    day_start = slot.replace(hour=0)
+    day_end = day_start + timedelta(days=1)
+    location = Config.DEFAULT_LOCATION
+
+    return [
+        # EXPLAIN the free-table SELECT that feeds the claiming INSERT
+        ('claim table', claim_table_statement(location, 1, slot, slot + timedelta(minutes=90), 2).select, False),
+        ('used tables', used_tables_query(location, slot, slot + timedelta(minutes=90)), False),
+        ('day schedule', bookings_query(location, day_start, day_end), False),
+        ('customer by email', customer_by_email_query(location, 'john.doe@example.com'), False),
+        ('listing page', reservations_page_query(location, 50), True),
+        ('listing page after cursor', reservations_page_query(location, 50, after=(slot, 100)), True),
+        ('listing by date range', reservations_page_query(location, 50, start=day_start, end=day_end), False),
+        ('customer history', reservations_page_query(location, 50, customer_id=1), False),
+        ('customer history by email', reservations_page_query(location, 50, email='john.doe@example.com'), False),
+        ('export by date range', reservation_rows_query(location, start=day_start, end=day_end), False),
+        ('repeat customer check', select(repeat_booking_expression(1, 100)), False),
+        ('daily report', daily_report_query(location, day_start.date(), day_end.date()), False),
+        ('hourly report', hourly_report_query(location, day_start.date(), day_end.date()), False),
+        # EXPLAIN the selection that feeds the claiming UPDATE
+        ('due jobs', due_jobs_query(50, timedelta(minutes=5), slot), False),
+    ]
+
+def postgresql_seq_scans(statement, ordered_scan_ok):
+    """Return the checked tables read by a Seq Scan node in the plan"""
+    # Make sequential scans prohibitively expensive so the planner only
+    # picks one when no usable index exists, even on small tables
+    db.session.execute(db.text('SET LOCAL enable_seqscan = off'))
+    plan = db.session.execute(Explain(statement, 'EXPLAIN (FORMAT JSON)')).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans = []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node.get('Node Type') == 'Seq Scan' and node.get('Relation Name') in CHECKED_TABLES:
+            scans.append(node['Relation Name'])
+        nodes.extend(node.get('Plans', []))
+    return scans
+
+def sqlite_seq_scans(statement, ordered_scan_ok):
+    """
+    Return the checked tables read by a full SCAN in the plan. SQLite reports
+    a full walk of an index as SCAN ... USING INDEX, which only counts as
+    acceptable for unfiltered listings.
+    """
+    scans = []
+    for row in db.session.execute(Explain(statement, 'EXPLAIN QUERY PLAN')):
+        words = row[-1].split()
+        if len(words) < 2 or words[0] != 'SCAN' or words[1] not in CHECKED_TABLES:
+            continue
+        if ordered_scan_ok and 'INDEX' in words:
+            continue
+        scans.append(words[1])
+    return scans
+
+def main():
+    print("=" * 50)
+    print("Café Fausse Query Plan Check")
+    print("=" * 50)
+
+    failures = []
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        find_seq_scans = postgresql_seq_scans if dialect == 'postgresql' else sqlite_seq_scans
+        print(f"\nDialect: {dialect}\n")
+
+        for name, statement, ordered_scan_ok in helper_queries():
+            try:
+                scans = find_seq_scans(statement, ordered_scan_ok)
+            finally:
+                db.session.rollback()
+
+            if scans:
+                failures.append(name)
+                print(f"❌ {name}: sequential scan on {', '.join(sorted(set(scans)))}")
+            else:
+                print(f"✅ {name}")
+
+    if failures:
+        print(f"\n{len(failures)} helper queries fall back to a sequential scan")
+        sys.exit(1)
+
+    print("\nAll helper queries use an index")
+
+if __name__ == '__main__':
+    main()
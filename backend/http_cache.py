@@ -0,0 +1,40 @@
+"""
+HTTP caching helpers shared by the WSGI (app.py) and ASGI (asgi_app.py) servers
+ETags are derived from the JSON a response carries, so every worker computes
+the same ETag for the same data and a client (or CDN) revalidating against any
+worker gets a 304. Cache-Control policies:
+- availability and the floor plan hold no personal data: shared caches may keep
+  them briefly and serve them stale while revalidating
+- reservations hold customer contact details: browsers may keep them, but must
+  revalidate every time, and shared caches must not store them
+"""
+
+import hashlib
+
+from config import Config
+from json_provider import dumps
+
+PUBLIC_CACHE_CONTROL = (
+    f'public, max-age={Config.AVAILABILITY_MAX_AGE}, '
+    f'stale-while-revalidate={Config.AVAILABILITY_STALE_WHILE_REVALIDATE}'
+)
+FLOOR_PLAN_CACHE_CONTROL = f'public, max-age={Config.FLOOR_PLAN_TTL}'
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
+
+def etag_for(data):
+    """Return the (unquoted) ETag of a JSON-serializable value"""
+    encoded = dumps(data, sort_keys=True).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+def etag_matches(request, etag):
+    """
+    Return True when the request's If-None-Match covers etag
+    Weak comparison, since proxies weaken ETags when they compress responses
+    """
+    return etag is not None and request.if_none_match.contains_weak(etag)
+
+def cache_headers(response, etag, cache_control):
+    """Set the ETag and Cache-Control headers of a response and return it"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
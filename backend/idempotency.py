@@ -0,0 +1,72 @@
+"""
+Idempotency-Key support shared by the WSGI (app.py) and ASGI (asgi_app.py) servers
+A client that may retry a POST sends a unique Idempotency-Key header. The first
+successful response is stored with the key (see IdempotencyKey in
+database/models.py) and a retry with the same key and body gets that stored
+response back instead of running the request again. Reusing a key with a
+different body is rejected. Keys are scoped by location and client (the email
+of the request), so clients sending the same key never see each other's
+responses, and expire after IDEMPOTENCY_KEY_TTL_HOURS.
+Endpoints look up the stored response before charging rate limits, so a retry
+is never refused what it already got.
+"""
+
+import hashlib
+
+from json_provider import dumps
+from validation import ValidationError
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+class IdempotentRequest:
+    """A POST sent with an Idempotency-Key: its scope, endpoint, key and body fingerprint"""
+
+    def __init__(self, endpoint, key, data, location, client):
+        self.location = location
+        self.client = client.lower()
+        self.endpoint = endpoint
+        self.key = key
+        self.request_hash = hashlib.sha256(dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def matches(self, stored):
+        """Return True when a stored response was recorded for the same body"""
+        return stored.request_hash == self.request_hash
+
+class DuplicateRequest(Exception):
+    """Raised inside a write transaction when the key already has a stored response"""
+
+    def __init__(self, stored):
+        super().__init__('Idempotency key already has a stored response')
+        self.stored = stored
+
+def idempotent_request(endpoint, headers, data, location, client):
+    """
+    Read the Idempotency-Key header of a request to a location by a client (its email)
+    Returns an IdempotentRequest, or None when the header is absent
+    """
+    key = headers.get(HEADER)
+    if key is None:
+        return None
+
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise ValidationError(f'{HEADER} must be between 1 and {MAX_KEY_LENGTH} characters')
+
+    return IdempotentRequest(endpoint, key, data, location, client)
+
+def replay(stored, request, response_class):
+    """
+    Build the response for a retried request from its stored response
+    Returns a response_class instance, or a 422 when the key was used for another body
+    """
+    if not request.matches(stored):
+        return response_class(
+            dumps({'error': f'{HEADER} was already used with a different request'}),
+            status=422, mimetype='application/json'
+        )
+
+    response = response_class(stored.response_body, status=stored.status_code, mimetype='application/json')
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
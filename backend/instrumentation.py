@@ -0,0 +1,322 @@
+"""
+Request profiling and query instrumentation for the Flask app and the Quart
+(ASGI) app
+- Times every request per route and counts/times its SQL statements
+- Logs slow queries with their parameters
+- Exposes per-worker aggregates in Prometheus text format
+- Configures structured (JSON) logging with sampling of routine records
+- Optionally captures a profile (pyinstrument or cProfile) for slow requests
+"""
+
+from contextvars import ContextVar
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import Config
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:
+    PyinstrumentProfiler = None
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets in seconds for request durations
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Per-request statement counters; a ContextVar keeps threads and coroutines apart
+current_request_stats = ContextVar('current_request_stats', default=None)
+
+class RequestStats:
+    """SQL statement counters for the request being served"""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+
+class StructuredFormatter(logging.Formatter):
+    """Format log records as one JSON object per line, including extra fields"""
+
+    RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+    def format(self, record):
+        entry = {
+            'timestamp': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in self.RESERVED})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keep every WARNING and above, and a random sample of lower-level records"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+def configure_logging():
+    """Send application logs to stderr as sampled, structured JSON lines"""
+    handler = logging.StreamHandler()
+    if Config.LOG_FORMAT == 'json':
+        handler.setFormatter(StructuredFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+    handler.addFilter(SamplingFilter(Config.LOG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(Config.LOG_LEVEL)
+
+class Metrics:
+    """Per-worker request and query aggregates"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.durations = {}
+        self.db_queries = {}
+        self.db_time = {}
+        self.slow_queries = 0
+        self.gauges = []
+
+    def record_request(self, method, route, status, duration, stats):
+        with self._lock:
+            key = (method, route, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            histogram = self.durations.setdefault((method, route), [0] * len(DURATION_BUCKETS) + [0, 0.0])
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += duration
+
+            self.db_queries[(method, route)] = self.db_queries.get((method, route), 0) + stats.queries
+            self.db_time[(method, route)] = self.db_time.get((method, route), 0.0) + stats.query_time
+
+    def record_slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def register_gauges(self, collector):
+        """Add a callable returning {metric_name: value} to the /api/metrics output"""
+        self.gauges.append(collector)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines += ['# HELP http_requests_total Requests served by this worker',
+                      '# TYPE http_requests_total counter']
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+            lines += ['# HELP http_request_duration_seconds Request latency',
+                      '# TYPE http_request_duration_seconds histogram']
+            for (method, route), histogram in sorted(self.durations.items()):
+                labels = f'method="{method}",route="{route}"'
+                for bound, count in zip(DURATION_BUCKETS, histogram):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram[-2]}')
+                lines.append(f'http_request_duration_seconds_count{{{labels}}} {histogram[-2]}')
+                lines.append(f'http_request_duration_seconds_sum{{{labels}}} {histogram[-1]:.6f}')
+
+            lines += ['# HELP db_queries_total SQL statements executed while serving requests',
+                      '# TYPE db_queries_total counter']
+            for (method, route), count in sorted(self.db_queries.items()):
+                lines.append(f'db_queries_total{{method="{method}",route="{route}"}} {count}')
+
+            lines += ['# HELP db_query_duration_seconds_total Time spent in SQL statements',
+                      '# TYPE db_query_duration_seconds_total counter']
+            for (method, route), seconds in sorted(self.db_time.items()):
+                lines.append(f'db_query_duration_seconds_total{{method="{method}",route="{route}"}} {seconds:.6f}')
+
+            lines += ['# HELP db_slow_queries_total Statements slower than SLOW_QUERY_MS',
+                      '# TYPE db_slow_queries_total counter',
+                      f'db_slow_queries_total {self.slow_queries}']
+            gauges = list(self.gauges)
+
+        # Gauges may carry labels (name{label="..."}): one TYPE line per metric name.
+        # A process serving both apps registers some gauges twice; the first wins
+        typed, seen = set(), set()
+        for collector in gauges:
+            try:
+                values = collector()
+            except Exception:
+                logger.exception('Metrics collector failed')
+                continue
+            for name, value in values.items():
+                if name in seen:
+                    continue
+                seen.add(name)
+                family = name.split('{', 1)[0]
+                if family not in typed:
+                    typed.add(family)
+                    lines.append(f'# TYPE {family} gauge')
+                lines.append(f'{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_start'].pop()
+
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_time += duration
+
+    if duration * 1000 >= Config.SLOW_QUERY_MS:
+        metrics.record_slow_query()
+        logger.warning('Slow query', extra={
+            'duration_ms': round(duration * 1000, 2),
+            'statement': statement,
+            'parameters': parameters
+        })
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get('query_start'):
+        context.connection.info['query_start'].pop()
+
+def _start_profiler():
+    """Start pyinstrument when installed, otherwise cProfile"""
+    if PyinstrumentProfiler is not None:
+        profiler = PyinstrumentProfiler()
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    return profiler
+
+def _stop_profiler(profiler):
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+    else:
+        profiler.stop()
+
+def _save_profile(profiler, route, duration):
+    """Write the captured profile to PROFILE_DIR"""
+    os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+    name = f"{int(time.time() * 1000)}-{slug}-{int(duration * 1000)}ms"
+
+    if isinstance(profiler, cProfile.Profile):
+        path = os.path.join(Config.PROFILE_DIR, name + '.prof')
+        profiler.dump_stats(path)
+    else:
+        path = os.path.join(Config.PROFILE_DIR, name + '.html')
+        with open(path, 'w') as f:
+            f.write(profiler.output_html())
+
+    logger.warning('Slow request profiled', extra={'route': route, 'profile': path})
+
+def install_query_events():
+    """Count and time SQL statements of every engine (async engines included)"""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+def start_request_timer(request):
+    """Start timing a Flask or Quart request and counting its statements"""
+    request.instrumentation_start = time.perf_counter()
+    request.instrumentation_token = current_request_stats.set(RequestStats())
+    request.instrumentation_profiler = _start_profiler() if Config.PROFILE_REQUESTS else None
+
+def record_request(request, response):
+    """Record the metrics of a finished Flask or Quart request and log it"""
+    start = getattr(request, 'instrumentation_start', None)
+    if start is None:
+        return
+
+    duration = time.perf_counter() - start
+    stats = current_request_stats.get() or RequestStats()
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.record_request(request.method, route, response.status_code, duration, stats)
+
+    profiler = request.instrumentation_profiler
+    if profiler is not None:
+        _stop_profiler(profiler)
+        if duration * 1000 >= Config.PROFILE_THRESHOLD_MS:
+            _save_profile(profiler, route, duration)
+
+    fields = {
+        'method': request.method,
+        'route': route,
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 2),
+        'db_queries': stats.queries,
+        'db_time_ms': round(stats.query_time * 1000, 2)
+    }
+    # Errors and slow requests are always logged; routine requests are sampled
+    if response.status_code >= 500 or duration * 1000 >= Config.SLOW_REQUEST_MS:
+        logger.warning('Request completed', extra=fields)
+    else:
+        logger.info('Request completed', extra=fields)
+
+def reset_request_stats(request):
+    """Drop the request's statement counters"""
+    token = getattr(request, 'instrumentation_token', None)
+    if token is not None:
+        current_request_stats.reset(token)
+        request.instrumentation_token = None
+
+def init_instrumentation(app):
+    """Install logging, query events and request hooks on the Flask app"""
+    configure_logging()
+    install_query_events()
+
+    @app.before_request
+    def start_instrumentation():
+        start_request_timer(request)
+
+    @app.after_request
+    def record_instrumentation(response):
+        record_request(request, response)
+        return response
+
+    @app.teardown_request
+    def reset_instrumentation(error):
+        reset_request_stats(request)
+
+def init_async_instrumentation(app):
+    """Install logging, query events and request hooks on the Quart app (asgi_app.py)"""
+    from quart import request as async_request
+
+    configure_logging()
+    install_query_events()
+
+    @app.before_request
+    async def start_instrumentation():
+        start_request_timer(async_request)
+
+    @app.after_request
+    async def record_instrumentation(response):
+        record_request(async_request, response)
+        return response
+
+    @app.teardown_request
+    async def reset_instrumentation(error):
+        reset_request_stats(async_request)
@@ -0,0 +1,218 @@
+"""
+Background job worker for request side effects
+Requests enqueue their side effects (confirmation emails, newsletter syncs) as
+rows of the jobs table in the same transaction as the booking or signup (see
+enqueue_job_statement in database/models.py), so a job exists exactly when its
+data committed and the request never waits for the outbound call. A JobWorker
+claims due jobs in batches and runs them on a thread pool:
+- on PostgreSQL any number of `flask run-jobs` processes claim with
+  FOR UPDATE SKIP LOCKED; with JOBS_IN_PROCESS (the default on SQLite) each
+  WSGI and ASGI web process runs its own worker
+- batch handlers get all claimed payloads of their kind in one call
+- a failing job is retried after an exponential backoff with jitter and kept
+  as failed after JOB_MAX_ATTEMPTS attempts
+- jobs run at least once: a job whose worker died is claimed again after
+  JOB_LOCK_TIMEOUT_SECONDS, so handlers must tolerate running twice
+- jobs live in the database of the location that enqueued them, so a worker
+  polls every database (see database_shards) and runs each job routed there
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+import logging
+import os
+import random
+import threading
+
+from config import Config
+from database.locations import database_shards, location_context
+from database.models import CONFIRMATION_EMAIL, NEWSLETTER_SYNC, claim_jobs, finish_jobs, retry_jobs, fail_jobs
+from notifications import send_confirmation_email, sync_newsletter
+
+logger = logging.getLogger(__name__)
+
+# Job kind -> (handler, batch). Batch handlers take a list of payloads
+HANDLERS = {
+    CONFIRMATION_EMAIL: (send_confirmation_email, False),
+    NEWSLETTER_SYNC: (sync_newsletter, True),
+}
+
+def retry_delay(attempts):
+    """Return the seconds to wait before retrying a job that failed attempts times"""
+    delay = min(Config.JOB_BACKOFF_SECONDS * 2 ** (attempts - 1), Config.JOB_BACKOFF_MAX_SECONDS)
+    # Jitter keeps jobs that failed together (e.g. during an outage) from retrying together
+    return delay * random.uniform(0.5, 1.0)
+
+class JobWorker:
+    """Polls the jobs table and runs due jobs on a thread pool"""
+
+    def __init__(self, concurrency=None, batch_size=None, poll_seconds=None):
+        self.concurrency = concurrency or Config.JOB_CONCURRENCY
+        self.batch_size = batch_size or Config.JOB_BATCH_SIZE
+        self.poll_seconds = poll_seconds or Config.JOB_POLL_SECONDS
+        self.app = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._executor = None
+        self._thread = None
+        self._pid = None
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self, app):
+        """
+        Start polling in a background thread, once per process (threads do not
+        survive a fork, so a forked worker starts its own)
+        """
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self.app = app
+            self._pid = os.getpid()
+            self._executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix='job')
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._poll, name='job-poller', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Poll now instead of at the next interval (jobs were just committed)"""
+        self._wake.set()
+
+    def stop(self):
+        """Stop polling and wait for the running jobs to finish"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def run(self, app):
+        """Poll in the calling thread until stop() (used by `flask run-jobs`)"""
+        self.app = app
+        self._executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix='job')
+        self._poll()
+
+    def run_until_idle(self, app):
+        """
+        Run due jobs until none are left
+        Returns the number of jobs claimed
+        """
+        self.app = app
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix='job')
+        total = 0
+        while True:
+            claimed = self.run_once()
+            if not claimed:
+                return total
+            total += claimed
+
+    def run_once(self):
+        """
+        Claim one batch of due jobs from every database and run them, batch
+        handlers once per kind and database and other handlers once per job
+        Returns the number of jobs claimed
+        """
+        claimed = 0
+        tasks = []
+        for shard in database_shards():
+            with location_context(self.app, shard):
+                jobs = claim_jobs(self.batch_size)
+            claimed += len(jobs)
+
+            groups = {}
+            for job in jobs:
+                groups.setdefault(job[1], []).append(job)
+
+            for kind, kind_jobs in groups.items():
+                _, batch = HANDLERS.get(kind, (None, True))
+                tasks.extend([(shard, kind_jobs)] if batch else [(shard, [job]) for job in kind_jobs])
+
+        wait([self._executor.submit(self._run, shard, jobs) for shard, jobs in tasks])
+        return claimed
+
+    def stats(self):
+        """Return this process's worker state and job counters"""
+        with self._lock:
+            return {
+                'running': self._thread is not None and self._thread.is_alive() and self._pid == os.getpid(),
+                'concurrency': self.concurrency,
+                'batch_size': self.batch_size,
+                'completed': self.completed,
+                'retried': self.retried,
+                'failed': self.failed
+            }
+
+    def _poll(self):
+        while not self._stop.is_set():
+            # Cleared before claiming, so jobs committed meanwhile are not missed
+            self._wake.clear()
+            try:
+                claimed = self.run_once()
+            except Exception:
+                logger.exception("Job worker failed to claim jobs")
+                claimed = 0
+            if claimed < self.batch_size:
+                self._wake.wait(self.poll_seconds)
+
+    def _run(self, shard, jobs):
+        """Run the jobs of one task in the database they were claimed from and record the outcome"""
+        kind = jobs[0][1]
+        job_ids = [job_id for job_id, _, _, _ in jobs]
+        try:
+            with location_context(self.app, shard):
+                if kind not in HANDLERS:
+                    fail_jobs(job_ids, f'No handler for job kind {kind}')
+                    self._count('failed', len(jobs))
+                    return
+
+                handler, batch = HANDLERS[kind]
+                try:
+                    handler([payload for _, _, payload, _ in jobs] if batch else jobs[0][2])
+                except Exception as e:
+                    self._handle_failure(kind, jobs, f'{type(e).__name__}: {e}')
+                    return
+
+                finish_jobs(job_ids)
+                self._count('completed', len(jobs))
+        except Exception:
+            # The jobs stay claimed and are retried after JOB_LOCK_TIMEOUT_SECONDS
+            logger.exception("Job bookkeeping failed", extra={'kind': kind, 'job_ids': job_ids})
+
+    def _handle_failure(self, kind, jobs, error):
+        """Retry the failed jobs with backoff, or give up on those out of attempts"""
+        exhausted = [job_id for job_id, _, _, attempts in jobs if attempts >= Config.JOB_MAX_ATTEMPTS]
+        retry = [job for job in jobs if job[0] not in exhausted]
+        logger.warning('Job failed', extra={
+            'kind': kind, 'job_ids': [job[0] for job in jobs], 'error': error, 'gave_up': exhausted
+        })
+
+        if retry:
+            attempts = max(job[3] for job in retry)
+            retry_jobs([job[0] for job in retry], error, datetime.utcnow() + timedelta(seconds=retry_delay(attempts)))
+            self._count('retried', len(retry))
+        if exhausted:
+            fail_jobs(exhausted, error)
+            self._count('failed', len(exhausted))
+
+    def _count(self, counter, value):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + value)
+
+def create_job_app():
+    """
+    Create a Flask app holding only the database, for running jobs outside the
+    WSGI app (the ASGI server's in-process worker)
+    Returns the Flask app
+    """
+    from flask import Flask
+    from database.db_config import init_app
+
+    app = Flask(__name__)
+    init_app(app)
+    return app
+
+job_worker = JobWorker()
@@ -0,0 +1,58 @@
+"""
+JSON encoding for the WSGI (app.py) and ASGI (asgi_app.py) servers
+Uses orjson when it is installed, which encodes datetimes natively in C, and
+falls back to the stdlib encoder otherwise. Both paths write dates and
+datetimes as ISO 8601, so to_dict() can hand over datetime objects instead of
+calling isoformat() on every field.
+"""
+
+from datetime import date, time
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Non-string keys are converted to strings, as the stdlib encoder does
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+def encode_default(value):
+    """Encode values the encoders do not handle: dates as ISO 8601, then Flask's defaults"""
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+def dumps(value, sort_keys=False):
+    """Encode a value as a compact JSON string"""
+    if orjson is not None:
+        option = ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(value, default=encode_default, option=option).decode()
+    return json.dumps(value, default=encode_default, sort_keys=sort_keys, separators=(',', ':'))
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask/Quart JSON provider backed by orjson when available
+    Keys keep the order the routes build them in; debug mode still indents
+    """
+
+    default = staticmethod(encode_default)
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+
+        option = ORJSON_OPTIONS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -0,0 +1,53 @@
+"""Initial schema: customers and reservations
+
+Matches the tables previously created by db.create_all(). Existing
+databases created that way should be stamped instead of upgraded:
+    flask --app app db stamp 0001_initial_schema
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2026-10-18 18:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_initial_schema'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'customers',
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.Column('customer_name', sa.String(length=255), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('phone_number', sa.String(length=20), nullable=True),
+        sa.Column('newsletter_signup', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('customer_id'),
+        sa.UniqueConstraint('email')
+    )
+    op.create_table(
+        'reservations',
+        sa.Column('reservation_id', sa.Integer(), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.Column('timeslot', sa.DateTime(), nullable=False),
+        sa.Column('table_number', sa.Integer(), nullable=False),
+        sa.Column('number_of_guests', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.CheckConstraint('number_of_guests >= 1', name='check_guests'),
+        sa.CheckConstraint('table_number >= 1 AND table_number <= 30', name='check_table_number'),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.customer_id']),
+        sa.PrimaryKeyConstraint('reservation_id'),
+        sa.UniqueConstraint('timeslot', 'table_number', name='unique_timeslot_table')
+    )
+
+
+def downgrade():
+    op.drop_table('reservations')
+    op.drop_table('customers')
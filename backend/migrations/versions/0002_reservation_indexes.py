@@ -0,0 +1,33 @@
+"""Add indexes for the reservation query shapes
+
+- (timeslot, reservation_id): timeslot range scans and keyset listing order
+- (customer_id, timeslot, reservation_id): customer history, also covers the FK
+- created_at: ordering by booking time for reporting
+
+Revision ID: 0002_reservation_indexes
+Revises: 0001_initial_schema
+Create Date: 2026-10-18 18:50:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_reservation_indexes'
+down_revision = '0001_initial_schema'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_reservations_timeslot_id', 'reservations',
+                    ['timeslot', 'reservation_id'])
+    op.create_index('ix_reservations_customer_timeslot', 'reservations',
+                    ['customer_id', 'timeslot', 'reservation_id'])
+    op.create_index('ix_reservations_created_at', 'reservations', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_reservations_created_at', table_name='reservations')
+    op.drop_index('ix_reservations_customer_timeslot', table_name='reservations')
+    op.drop_index('ix_reservations_timeslot_id', table_name='reservations')
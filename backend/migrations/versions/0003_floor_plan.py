@@ -0,0 +1,59 @@
+"""Floor plan: dining tables with seat counts
+
+- dining_tables holds each table's room and seats, seeded with the
+  previous 30 anonymous tables as a mix of 2-, 4-, 6- and 8-tops
+- reservations.table_number references dining_tables instead of the
+  fixed 1..30 check constraint
+
+Revision ID: 0003_floor_plan
+Revises: 0002_reservation_indexes
+Create Date: 2026-10-18 19:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_floor_plan'
+down_revision = '0002_reservation_indexes'
+branch_labels = None
+depends_on = None
+
+# Default floor plan: (table_number, room, seats); replace it with `flask load-floor-plan`
+FLOOR_PLAN = (
+    [(n, 'Main', 2) for n in range(1, 11)] +
+    [(n, 'Main', 4) for n in range(11, 23)] +
+    [(n, 'Terrace', 6) for n in range(23, 29)] +
+    [(n, 'Private Room', 8) for n in range(29, 31)]
+)
+
+
+def upgrade():
+    dining_tables = op.create_table(
+        'dining_tables',
+        sa.Column('table_number', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('room', sa.String(length=50), nullable=False),
+        sa.Column('seats', sa.Integer(), nullable=False),
+        sa.CheckConstraint('seats >= 1', name='check_seats'),
+        sa.PrimaryKeyConstraint('table_number')
+    )
+    op.create_index('ix_dining_tables_seats', 'dining_tables', ['seats', 'table_number'])
+    op.bulk_insert(dining_tables, [
+        {'table_number': n, 'room': room, 'seats': seats} for n, room, seats in FLOOR_PLAN
+    ])
+
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.drop_constraint('check_table_number', type_='check')
+        batch_op.create_foreign_key('fk_reservations_table_number', 'dining_tables',
+                                    ['table_number'], ['table_number'])
+
+
+def downgrade():
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.drop_constraint('fk_reservations_table_number', type_='foreignkey')
+        batch_op.create_check_constraint('check_table_number',
+                                         'table_number >= 1 AND table_number <= 30')
+
+    op.drop_index('ix_dining_tables_seats', table_name='dining_tables')
+    op.drop_table('dining_tables')
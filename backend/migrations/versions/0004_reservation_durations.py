@@ -0,0 +1,69 @@
+"""Reservation durations with non-overlapping table bookings
+
+- reservations.ends_at: end of the booking; existing rows get the default
+  90 minutes, cut short where the table's next booking starts earlier
+- check_reservation_period: ends_at must be after timeslot
+- PostgreSQL only: no_overlapping_table_bookings, a GiST exclusion constraint
+  on (table_number, tsrange(timeslot, ends_at)). It needs the btree_gist
+  extension, which this migration creates (requires the CREATE privilege
+  on the database)
+
+Revision ID: 0004_reservation_durations
+Revises: 0003_floor_plan
+Create Date: 2026-10-18 20:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_reservation_durations'
+down_revision = '0003_floor_plan'
+branch_labels = None
+depends_on = None
+
+DEFAULT_MINUTES = 90
+
+
+def upgrade():
+    op.add_column('reservations', sa.Column('ends_at', sa.DateTime(), nullable=True))
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # LEAST ignores the NULL from tables without a later booking
+        op.execute(f"""
+            UPDATE reservations AS r SET ends_at = LEAST(
+                r.timeslot + interval '{DEFAULT_MINUTES} minutes',
+                (SELECT min(n.timeslot) FROM reservations AS n
+                 WHERE n.table_number = r.table_number AND n.timeslot > r.timeslot)
+            )
+        """)
+    else:
+        op.execute(f"""
+            UPDATE reservations SET ends_at = min(
+                strftime('%Y-%m-%d %H:%M:%S', timeslot, '+{DEFAULT_MINUTES} minutes') || '.000000',
+                coalesce((SELECT min(n.timeslot) FROM reservations AS n
+                          WHERE n.table_number = reservations.table_number
+                          AND n.timeslot > reservations.timeslot), '9999-12-31 23:59:59.000000')
+            )
+        """)
+
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.alter_column('ends_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_check_constraint('check_reservation_period', 'ends_at > timeslot')
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        op.execute("""
+            ALTER TABLE reservations ADD CONSTRAINT no_overlapping_table_bookings
+            EXCLUDE USING gist (table_number WITH =, tsrange(timeslot, ends_at) WITH &&)
+        """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE reservations DROP CONSTRAINT no_overlapping_table_bookings')
+
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.drop_constraint('check_reservation_period', type_='check')
+        batch_op.drop_column('ends_at')
@@ -0,0 +1,40 @@
+"""Stored responses for Idempotency-Key requests
+
+- idempotency_keys: the first successful response of a POST sent with an
+  Idempotency-Key header, keyed by (idempotency_key, endpoint), so retries
+  get it back instead of booking again
+- ix_idempotency_keys_created_at: expired keys are purged by age
+
+Revision ID: 0005_idempotency_keys
+Revises: 0004_reservation_durations
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_idempotency_keys'
+down_revision = '0004_reservation_durations'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('idempotency_key', sa.String(length=255), nullable=False),
+        sa.Column('endpoint', sa.String(length=100), nullable=False),
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=False),
+        sa.Column('response_body', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('idempotency_key', 'endpoint')
+    )
+    op.create_index('ix_idempotency_keys_created_at', 'idempotency_keys', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_idempotency_keys_created_at', table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
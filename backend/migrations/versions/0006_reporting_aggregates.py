@@ -0,0 +1,41 @@
+"""Reporting aggregates
+
+- hourly_occupancy: reservations, covers, repeat-customer reservations and
+  booked table-minutes per (service_date, hour), kept up to date by every
+  booking transaction; daily and hourly reports read it instead of scanning
+  reservations
+- existing reservations are not aggregated here: run `flask rebuild-reports`
+  after upgrading
+
+Revision ID: 0006_reporting_aggregates
+Revises: 0005_idempotency_keys
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_reporting_aggregates'
+down_revision = '0005_idempotency_keys'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'hourly_occupancy',
+        sa.Column('service_date', sa.Date(), nullable=False),
+        sa.Column('hour', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('reservations', sa.Integer(), nullable=False),
+        sa.Column('covers', sa.Integer(), nullable=False),
+        sa.Column('repeat_reservations', sa.Integer(), nullable=False),
+        sa.Column('table_minutes', sa.Integer(), nullable=False),
+        sa.CheckConstraint('hour >= 0 AND hour <= 23', name='check_hour'),
+        sa.PrimaryKeyConstraint('service_date', 'hour')
+    )
+
+
+def downgrade():
+    op.drop_table('hourly_occupancy')
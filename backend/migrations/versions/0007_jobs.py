@@ -0,0 +1,44 @@
+"""Background job queue
+
+- jobs: side effects of requests (confirmation emails, newsletter syncs),
+  inserted in the same transaction as the booking or signup and deleted once
+  they ran; jobs out of attempts stay as 'failed'
+- ix_jobs_status_run_at: workers claim due pending jobs in run_at order
+
+Revision ID: 0007_jobs
+Revises: 0006_reporting_aggregates
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_jobs'
+down_revision = '0006_reporting_aggregates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'jobs',
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.CheckConstraint("status IN ('pending', 'running', 'failed')", name='check_job_status'),
+        sa.PrimaryKeyConstraint('job_id')
+    )
+    op.create_index('ix_jobs_status_run_at', 'jobs', ['status', 'run_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_jobs_status_run_at', table_name='jobs')
+    op.drop_table('jobs')
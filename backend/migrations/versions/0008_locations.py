@@ -0,0 +1,135 @@
+"""Locations: scope customers, tables, reservations and reports by location
+
+- customers, dining_tables, reservations and hourly_occupancy get a location
+  column; existing rows are assigned to DEFAULT_LOCATION (the first entry of
+  LOCATIONS when the migration runs)
+- customers: email is unique per location (uq_customers_location_email)
+- dining_tables and hourly_occupancy: the location leads the primary key
+- reservations: unique_timeslot_table, fk_reservations_table_number and the
+  listing index lead with the location; on PostgreSQL
+  no_overlapping_table_bookings excludes overlaps per (location, table_number)
+- a location with its own database (LOCATION_DATABASE_URLS) is migrated by
+  running the upgrade with DATABASE_URL pointing at it
+- downgrading keeps only the rows of DEFAULT_LOCATION
+
+Revision ID: 0008_locations
+Revises: 0007_jobs
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from config import Config
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_locations'
+down_revision = '0007_jobs'
+branch_labels = None
+depends_on = None
+
+TABLES = ('customers', 'dining_tables', 'reservations', 'hourly_occupancy')
+
+# Names for the constraints SQLite reflects without one (batch mode recreates the tables)
+NAMING_CONVENTION = {
+    'uq': 'uq_%(table_name)s_%(column_0_name)s',
+    'pk': 'pk_%(table_name)s',
+}
+
+
+def constraint_name(postgresql_name, sqlite_name):
+    """Return the name of an unnamed constraint on the current dialect"""
+    return postgresql_name if op.get_bind().dialect.name == 'postgresql' else sqlite_name
+
+
+def set_primary_key(table, columns):
+    """Replace a table's primary key"""
+    name = constraint_name(f'{table}_pkey', f'pk_{table}')
+    with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(name, type_='primary')
+        batch_op.create_primary_key(name, columns)
+
+
+def upgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+
+    for table in TABLES:
+        op.add_column(table, sa.Column('location', sa.String(length=50), nullable=True))
+        op.execute(sa.text(f'UPDATE {table} SET location = :location').bindparams(location=Config.DEFAULT_LOCATION))
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('location', existing_type=sa.String(length=50), nullable=False)
+
+    if postgresql:
+        op.execute('ALTER TABLE reservations DROP CONSTRAINT no_overlapping_table_bookings')
+
+    # The table FK goes first: it depends on the primary key of dining_tables
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.drop_constraint('fk_reservations_table_number', type_='foreignkey')
+        batch_op.drop_constraint('unique_timeslot_table', type_='unique')
+        batch_op.drop_index('ix_reservations_timeslot_id')
+
+    with op.batch_alter_table('customers', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(constraint_name('customers_email_key', 'uq_customers_email'), type_='unique')
+        batch_op.create_unique_constraint('uq_customers_location_email', ['location', 'email'])
+
+    op.drop_index('ix_dining_tables_seats', table_name='dining_tables')
+    set_primary_key('dining_tables', ['location', 'table_number'])
+    op.create_index('ix_dining_tables_seats', 'dining_tables', ['location', 'seats', 'table_number'])
+
+    set_primary_key('hourly_occupancy', ['location', 'service_date', 'hour'])
+
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.create_unique_constraint('unique_timeslot_table', ['location', 'timeslot', 'table_number'])
+        batch_op.create_foreign_key('fk_reservations_table_number', 'dining_tables',
+                                    ['location', 'table_number'], ['location', 'table_number'])
+        batch_op.create_index('ix_reservations_location_timeslot', ['location', 'timeslot', 'reservation_id'])
+
+    if postgresql:
+        op.execute("""
+            ALTER TABLE reservations ADD CONSTRAINT no_overlapping_table_bookings
+            EXCLUDE USING gist (location WITH =, table_number WITH =, tsrange(timeslot, ends_at) WITH &&)
+        """)
+
+
+def downgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+
+    # Only one location fits the previous schema
+    for table in ('reservations', 'customers', 'dining_tables', 'hourly_occupancy'):
+        op.execute(sa.text(f'DELETE FROM {table} WHERE location != :location')
+                   .bindparams(location=Config.DEFAULT_LOCATION))
+
+    if postgresql:
+        op.execute('ALTER TABLE reservations DROP CONSTRAINT no_overlapping_table_bookings')
+
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.drop_index('ix_reservations_location_timeslot')
+        batch_op.drop_constraint('fk_reservations_table_number', type_='foreignkey')
+        batch_op.drop_constraint('unique_timeslot_table', type_='unique')
+
+    set_primary_key('hourly_occupancy', ['service_date', 'hour'])
+
+    op.drop_index('ix_dining_tables_seats', table_name='dining_tables')
+    set_primary_key('dining_tables', ['table_number'])
+    op.create_index('ix_dining_tables_seats', 'dining_tables', ['seats', 'table_number'])
+
+    with op.batch_alter_table('customers') as batch_op:
+        batch_op.drop_constraint('uq_customers_location_email', type_='unique')
+        batch_op.create_unique_constraint(constraint_name('customers_email_key', 'uq_customers_email'), ['email'])
+
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.create_unique_constraint('unique_timeslot_table', ['timeslot', 'table_number'])
+        batch_op.create_foreign_key('fk_reservations_table_number', 'dining_tables',
+                                    ['table_number'], ['table_number'])
+        batch_op.create_index('ix_reservations_timeslot_id', ['timeslot', 'reservation_id'])
+
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('location')
+
+    if postgresql:
+        op.execute("""
+            ALTER TABLE reservations ADD CONSTRAINT no_overlapping_table_bookings
+            EXCLUDE USING gist (table_number WITH =, tsrange(timeslot, ends_at) WITH &&)
+        """)
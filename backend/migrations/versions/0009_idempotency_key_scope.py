@@ -0,0 +1,57 @@
+"""Scope stored Idempotency-Key responses by location and client
+
+- idempotency_keys: keyed by (location, client, idempotency_key, endpoint),
+  where client is the lowercased email of the request, so two clients (or
+  two locations sharing a database) sending the same key never collide
+- stored responses cannot be attributed to a client, so they are dropped;
+  they would have expired within IDEMPOTENCY_KEY_TTL_HOURS anyway
+- downgrading drops the scoped responses the same way
+
+Revision ID: 0009_idempotency_key_scope
+Revises: 0008_locations
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_idempotency_key_scope'
+down_revision = '0008_locations'
+branch_labels = None
+depends_on = None
+
+
+def create_idempotency_keys(*scope):
+    """Create idempotency_keys with scope columns leading the primary key"""
+    op.create_table(
+        'idempotency_keys',
+        *scope,
+        sa.Column('idempotency_key', sa.String(length=255), nullable=False),
+        sa.Column('endpoint', sa.String(length=100), nullable=False),
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=False),
+        sa.Column('response_body', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint(*[column.name for column in scope], 'idempotency_key', 'endpoint')
+    )
+    op.create_index('ix_idempotency_keys_created_at', 'idempotency_keys', ['created_at'], unique=False)
+
+
+def drop_idempotency_keys():
+    op.drop_index('ix_idempotency_keys_created_at', table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
+
+
+def upgrade():
+    drop_idempotency_keys()
+    create_idempotency_keys(
+        sa.Column('location', sa.String(length=50), nullable=False),
+        sa.Column('client', sa.String(length=255), nullable=False)
+    )
+
+
+def downgrade():
+    drop_idempotency_keys()
+    create_idempotency_keys()
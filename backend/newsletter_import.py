@@ -0,0 +1,111 @@
+"""
+Bulk newsletter import shared by POST /api/newsletter/import and the
+`flask import-newsletter` command
+Reads CSV (with an 'email' and optional 'name' header) or NDJSON records from
+a stream, validates them one by one and writes valid rows in batches with a
+single upsert each. Invalid rows are reported back without stopping the import.
+"""
+
+import csv
+import json
+import logging
+
+from config import Config
+from validation import ValidationError, validate_newsletter_signup
+from database.models import upsert_newsletter_signups
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'ndjson')
+
+def format_from_content_type(content_type):
+    """Return the import format for a request Content-Type, or None if unknown"""
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    if mimetype in ('text/csv', 'application/csv'):
+        return 'csv'
+    if mimetype in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        return 'ndjson'
+    return None
+
+def parse_records(lines, fmt):
+    """
+    Yield (row_number, record) for every record in a text stream
+    Rows that cannot be parsed yield a ValidationError in place of the record
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        if reader.fieldnames is None or 'email' not in reader.fieldnames:
+            raise ValidationError("CSV header must include an 'email' column")
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for row_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield row_number, ValidationError('Invalid JSON')
+            continue
+        if not isinstance(record, dict):
+            yield row_number, ValidationError('Each line must be a JSON object')
+            continue
+        yield row_number, record
+
+def import_newsletter_signups(location, lines, fmt, batch_size=None):
+    """
+    Import newsletter signups to a location from an iterable of text lines
+    Returns a summary dictionary with row counts and the per-row errors
+    (capped at NEWSLETTER_IMPORT_MAX_ERRORS)
+    """
+    if fmt not in FORMATS:
+        raise ValidationError(f"Format must be one of: {', '.join(FORMATS)}")
+
+    batch_size = batch_size or Config.NEWSLETTER_IMPORT_BATCH_SIZE
+    summary = {'rows': 0, 'imported': 0, 'failed': 0, 'errors': [], 'errors_truncated': False}
+
+    def record_error(row_number, message):
+        summary['failed'] += 1
+        if len(summary['errors']) < Config.NEWSLETTER_IMPORT_MAX_ERRORS:
+            summary['errors'].append({'row': row_number, 'error': message})
+        else:
+            summary['errors_truncated'] = True
+
+    def flush(batch):
+        try:
+            upsert_newsletter_signups(location, [(email, name) for _, email, name in batch])
+            summary['imported'] += len(batch)
+            return
+        except Exception:
+            logger.exception("Error importing newsletter batch", extra={'rows': len(batch)})
+
+        # Retry row by row so one bad row does not fail the rest of its batch
+        for row_number, email, name in batch:
+            try:
+                upsert_newsletter_signups(location, [(email, name)])
+                summary['imported'] += 1
+            except Exception:
+                record_error(row_number, 'Failed to save signup')
+
+    batch = []
+    for row_number, record in parse_records(lines, fmt):
+        summary['rows'] += 1
+        try:
+            if isinstance(record, ValidationError):
+                raise record
+            email, name = validate_newsletter_signup(record)
+        except ValidationError as ve:
+            record_error(row_number, ve.message)
+            continue
+
+        batch.append((row_number, email, name))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+
+    if batch:
+        flush(batch)
+
+    summary['errors'].sort(key=lambda error: error['row'])
+    return summary
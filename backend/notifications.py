@@ -0,0 +1,58 @@
+"""
+Post-booking side effects, run by the background job worker (see jobs.py)
+The outbound calls are stand-ins for a mail service and a newsletter provider:
+they log what would be sent and wait OUTBOUND_LATENCY_MS like a network call
+would. Replacing them with a provider client leaves the handlers unchanged.
+"""
+
+import logging
+import time
+
+from sqlalchemy.orm import joinedload
+
+from config import Config
+from database.db_config import db
+from database.models import Reservation
+
+logger = logging.getLogger(__name__)
+
+def outbound_call():
+    """Wait as long as a call to the outbound provider would take"""
+    if Config.OUTBOUND_LATENCY_MS:
+        time.sleep(Config.OUTBOUND_LATENCY_MS / 1000)
+
+def send_email(to, subject, body):
+    """Send one email (stand-in: logged, not delivered)"""
+    outbound_call()
+    logger.info('Email sent', extra={'to': to, 'subject': subject, 'body': body})
+
+def sync_newsletter_subscribers(emails):
+    """Add subscribers to the newsletter provider's list in one call (stand-in: logged)"""
+    outbound_call()
+    logger.info('Newsletter subscribers synced', extra={'count': len(emails)})
+
+def send_confirmation_email(payload):
+    """Email the guest the confirmation of reservation payload['reservation_id']"""
+    reservation = db.session.get(
+        Reservation, payload['reservation_id'], options=[joinedload(Reservation.customer)]
+    )
+    if reservation is None:
+        # Nothing to confirm: the reservation was deleted before the job ran
+        logger.warning('Confirmation skipped, reservation not found', extra=payload)
+        return
+
+    customer = reservation.customer
+    send_email(
+        customer.email,
+        'Your Café Fausse reservation',
+        f"Dear {customer.customer_name},\n\n"
+        f"your table for {reservation.number_of_guests} on "
+        f"{reservation.timeslot:%A, %B %d at %H:%M} is confirmed "
+        f"(table {reservation.table_number}, reservation #{reservation.reservation_id}).\n\n"
+        "We look forward to seeing you."
+    )
+
+def sync_newsletter(payloads):
+    """Sync the subscribers of a batch of newsletter jobs in one provider call"""
+    emails = sorted({email for payload in payloads for email in payload['emails']})
+    sync_newsletter_subscribers(emails)
@@ -0,0 +1,228 @@
+"""
+Rate limiting and admission control shared by the WSGI (app.py) and ASGI
+(asgi_app.py) servers
+- Token buckets per client IP and per email: a rule allows N requests per
+  minute, refilled continuously, with bursts of up to N. A client out of
+  tokens gets a 429 with Retry-After saying when the next token arrives.
+- Buckets live in process memory (each worker process limits on its own), or
+  in Redis when RATE_LIMIT_STORAGE_URL is set, so all workers share them. If
+  Redis is unreachable requests are let through rather than failed.
+- A concurrency limiter caps the booking and signup requests in flight per
+  process. Beyond it requests are shed at once with a 503 and Retry-After
+  instead of queueing for a database connection.
+"""
+
+from collections import OrderedDict
+import logging
+import math
+import threading
+import time
+
+from config import Config
+from json_provider import dumps
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+def take_token(tokens, updated, now, rate, burst):
+    """
+    Refill a bucket holding tokens at updated (seconds) up to now and take one token
+    Returns (tokens left, seconds until a token is available; 0 when one was taken)
+    """
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+class MemoryBucketStore:
+    """Token buckets of this process, least recently used dropped beyond max_keys"""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Take a token from key's bucket; returns the seconds to wait, 0 when allowed"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens, retry_after = take_token(tokens, updated, now, rate, burst)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def size(self):
+        with self._lock:
+            return len(self._buckets)
+
+# take_token in Lua, so a bucket is read and updated atomically on the Redis
+# server (on the server's clock); idle buckets expire once they would be full
+REDIS_TAKE_TOKEN = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(retry_after)
+"""
+
+class RedisBucketStore:
+    """Token buckets shared by every process through Redis"""
+
+    def __init__(self, url):
+        self._client = redis.Redis.from_url(url, socket_timeout=0.1, socket_connect_timeout=0.1)
+        self._take = self._client.register_script(REDIS_TAKE_TOKEN)
+
+    def take(self, key, rate, burst):
+        """Take a token from key's bucket; returns the seconds to wait, 0 when allowed"""
+        try:
+            return float(self._take(keys=[f'ratelimit:{key}'], args=[rate, burst]))
+        except redis.RedisError:
+            logger.warning("Rate limit store unavailable, request allowed", exc_info=True)
+            return 0.0
+
+    def size(self):
+        return None
+
+def bucket_store(url=None):
+    """
+    Create the bucket store for RATE_LIMIT_STORAGE_URL
+    Returns a RedisBucketStore for a redis:// URL (when the redis package is
+    installed), a MemoryBucketStore otherwise
+    """
+    url = Config.RATE_LIMIT_STORAGE_URL if url is None else url
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        if redis is not None:
+            return RedisBucketStore(url)
+        logger.warning("RATE_LIMIT_STORAGE_URL is set but redis is not installed, limiting per process")
+    return MemoryBucketStore(Config.RATE_LIMIT_MAX_KEYS)
+
+class Rule:
+    """A token-bucket limit of per_minute requests, with bursts of the same size"""
+
+    def __init__(self, name, per_minute):
+        self.name = name
+        self.per_minute = per_minute
+        self.rate = per_minute / 60
+        self.burst = per_minute
+
+class RateLimiter:
+    """Applies rules to request keys (client IPs, emails) and counts rejections"""
+
+    def __init__(self, store, enabled=True):
+        self.store = store
+        self.enabled = enabled
+        self.limited = 0
+        self._lock = threading.Lock()
+
+    def hit(self, rule, key):
+        """
+        Count one request of key against rule
+        Returns the seconds the client must wait, or 0 when the request is allowed
+        """
+        if not self.enabled or rule.per_minute <= 0 or not key:
+            return 0.0
+
+        retry_after = self.store.take(f'{rule.name}:{key}', rule.rate, rule.burst)
+        if retry_after:
+            with self._lock:
+                self.limited += 1
+        return retry_after
+
+    def stats(self):
+        """Return whether limiting is on, the rejected requests and the buckets held"""
+        with self._lock:
+            return {'enabled': self.enabled, 'limited': self.limited, 'buckets': self.store.size()}
+
+class ConcurrencyLimiter:
+    """Non-blocking cap on requests in flight in this process (0 means no cap)"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Return True and take a slot, or False (and count a shed request) when full"""
+        with self._lock:
+            if self.limit and self.in_flight >= self.limit:
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        """Give back a slot taken by try_acquire"""
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        """Return the cap, the requests in flight and the shed requests"""
+        with self._lock:
+            return {'limit': self.limit, 'in_flight': self.in_flight, 'shed': self.shed}
+
+def client_address(request):
+    """
+    Return the client IP of a Flask or Quart request. Behind TRUSTED_PROXY_COUNT
+    proxies it is read from X-Forwarded-For, counting from the right, since
+    clients can put anything on the left of that header.
+    """
+    if Config.TRUSTED_PROXY_COUNT and len(request.access_route) >= Config.TRUSTED_PROXY_COUNT:
+        return request.access_route[-Config.TRUSTED_PROXY_COUNT]
+    return request.remote_addr
+
+def limit_write(request, ip_rule, email_rule, email):
+    """
+    Count a booking or signup against its per-IP and per-email rules (the email
+    is not charged when the IP is out of tokens)
+    Returns the seconds the client must wait, or 0 when the request is allowed
+    """
+    return rate_limiter.hit(ip_rule, client_address(request)) or rate_limiter.hit(email_rule, email.lower())
+
+def retry_after_header(seconds):
+    """Return a Retry-After value: whole seconds, at least 1"""
+    return str(max(1, math.ceil(seconds)))
+
+def too_many_requests(retry_after, response_class):
+    """Build the 429 response of a rate-limited request"""
+    response = response_class(
+        dumps({'error': 'Too many requests. Please try again shortly.'}),
+        status=429, mimetype='application/json'
+    )
+    response.headers['Retry-After'] = retry_after_header(retry_after)
+    return response
+
+def overloaded(response_class):
+    """Build the 503 response of a request shed by admission control"""
+    response = response_class(
+        dumps({'error': 'The service is busy. Please try again shortly.'}),
+        status=503, mimetype='application/json'
+    )
+    response.headers['Retry-After'] = retry_after_header(Config.SHED_RETRY_AFTER_SECONDS)
+    return response
+
+BOOKING_PER_IP = Rule('booking-ip', Config.BOOKING_LIMIT_PER_IP)
+BOOKING_PER_EMAIL = Rule('booking-email', Config.BOOKING_LIMIT_PER_EMAIL)
+SIGNUP_PER_IP = Rule('signup-ip', Config.SIGNUP_LIMIT_PER_IP)
+SIGNUP_PER_EMAIL = Rule('signup-email', Config.SIGNUP_LIMIT_PER_EMAIL)
+
+rate_limiter = RateLimiter(bucket_store(), enabled=Config.RATE_LIMIT_ENABLED)
+admission = ConcurrencyLimiter(Config.MAX_CONCURRENT_WRITES)
@@ -0,0 +1,56 @@
+"""
+Allocation races: a booking that keeps losing the race for a table gets the
+same 409 with alternatives as a full slot, never a 500
+Runs against an in-memory SQLite database migrated to the current schema
+"""
+
+import os
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['JOBS_IN_PROCESS'] = 'False'
+os.environ['RATE_LIMIT_ENABLED'] = 'False'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import false, select
+
+from app import app
+from config import Config
+from database import models
+from database.db_config import upgrade_db
+
+TIMESLOT = datetime(2031, 4, 1, 19)
+
+@pytest.fixture(scope='module')
+def booked_table():
+    """Migrate the database and book the table a party of two gets at TIMESLOT"""
+    upgrade_db(app)
+    with app.app_context():
+        allocation = models.book_table(
+            Config.DEFAULT_LOCATION, 'First', 'first@example.com', '', False,
+            TIMESLOT, timedelta(minutes=90), 2
+        )
+    assert allocation is not None
+    return allocation[1]
+
+def test_exhausted_retries_answer_409(booked_table, monkeypatch):
+    """Every claim ignores the bookings, so each attempt hits unique_timeslot_table"""
+    attempts = []
+
+    def no_used_tables(location, start, end):
+        attempts.append(start)
+        return select(models.DiningTable.table_number).where(false())
+
+    monkeypatch.setattr(models, 'used_tables_query', no_used_tables)
+
+    response = app.test_client().post('/api/reservations', json={
+        'name': 'Second', 'email': 'second@example.com', 'timeslot': TIMESLOT.isoformat(), 'guests': 2
+    })
+
+    assert len(attempts) == 3
+    assert response.status_code == 409
+    body = response.get_json()
+    assert body['available'] is False
+    assert isinstance(body['alternatives'], list)
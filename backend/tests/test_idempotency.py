@@ -0,0 +1,74 @@
+"""
+Idempotency-Key handling: stored responses are scoped by location and client,
+retries are answered before rate limits are charged, and a signup's stored
+response commits with the signup
+Runs against an in-memory SQLite database migrated to the current schema
+"""
+
+import os
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['JOBS_IN_PROCESS'] = 'False'
+os.environ['RATE_LIMIT_ENABLED'] = 'False'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import pytest
+
+from app import app
+from config import Config
+from database import models
+from database.db_config import upgrade_db
+from rate_limit import rate_limiter
+
+@pytest.fixture(scope='module', autouse=True)
+def database():
+    upgrade_db(app)
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+def book(client, email, key, timeslot='2031-05-01T19:00:00'):
+    return client.post('/api/reservations', headers={'Idempotency-Key': key}, json={
+        'name': 'Guest', 'email': email, 'timeslot': timeslot, 'guests': 2
+    })
+
+def test_same_key_from_two_clients_books_twice(client):
+    first = book(client, 'one@example.com', 'shared-key')
+    second = book(client, 'two@example.com', 'shared-key')
+
+    assert first.status_code == second.status_code == 201
+    assert 'Idempotent-Replayed' not in second.headers
+    assert first.get_json()['reservation_id'] != second.get_json()['reservation_id']
+
+def test_retry_is_replayed_without_charging_rate_limits(client, monkeypatch):
+    monkeypatch.setattr(rate_limiter, 'enabled', True)
+    first = book(client, 'retry@example.com', 'retry-key', '2031-05-02T19:00:00')
+    assert first.status_code == 201
+
+    # Well past BOOKING_LIMIT_PER_EMAIL retries of the same request
+    for _ in range(Config.BOOKING_LIMIT_PER_EMAIL + 2):
+        retry = book(client, 'retry@example.com', 'retry-key', '2031-05-02T19:00:00')
+        assert retry.status_code == 201
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert retry.get_json() == first.get_json()
+
+def test_signup_response_commits_with_the_signup(client, monkeypatch):
+    def failing_store(*args):
+        raise RuntimeError('store failed')
+
+    signup = {'email': 'letters@example.com', 'name': 'Reader'}
+    monkeypatch.setattr(models, 'store_response_statement', failing_store)
+    failed = client.post('/api/newsletter/signup', headers={'Idempotency-Key': 'signup-key'}, json=signup)
+    assert failed.status_code == 400
+
+    # The signup was rolled back with the stored response
+    with app.app_context():
+        assert models.Customer.query.filter_by(email='letters@example.com').first() is None
+
+    monkeypatch.undo()
+    stored = client.post('/api/newsletter/signup', headers={'Idempotency-Key': 'signup-key'}, json=signup)
+    replayed = client.post('/api/newsletter/signup', headers={'Idempotency-Key': 'signup-key'}, json=signup)
+
+    assert stored.status_code == replayed.status_code == 201
+    assert replayed.headers['Idempotent-Replayed'] == 'true'
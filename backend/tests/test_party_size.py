@@ -0,0 +1,57 @@
+"""
+Party size limits: tables are not combined, so bookings and availability checks
+for parties larger than the location's largest table are rejected with a 400
+Runs against an in-memory SQLite database migrated to the current schema
+"""
+
+import os
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['JOBS_IN_PROCESS'] = 'False'
+os.environ['RATE_LIMIT_ENABLED'] = 'False'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import pytest
+
+from app import app
+from config import Config
+from database.db_config import upgrade_db
+from database.models import get_floor_plan
+
+TIMESLOT = '2031-03-01T20:00:00'
+
+@pytest.fixture(scope='module')
+def max_seats():
+    """Migrate the database and return the seats of the default floor plan's largest table"""
+    upgrade_db(app)
+    with app.app_context():
+        return get_floor_plan(Config.DEFAULT_LOCATION).max_seats
+
+@pytest.fixture
+def client(max_seats):
+    return app.test_client()
+
+def book(client, guests):
+    return client.post('/api/reservations', json={
+        'name': 'Party', 'email': 'party@example.com', 'timeslot': TIMESLOT, 'guests': guests
+    })
+
+def test_largest_table_can_be_booked(client, max_seats):
+    response = book(client, max_seats)
+    assert response.status_code == 201
+    assert response.get_json()['guests'] == max_seats
+
+def test_larger_party_is_rejected(client, max_seats):
+    response = book(client, max_seats + 1)
+    assert response.status_code == 400
+    assert f'more than {max_seats} guests' in response.get_json()['error']
+
+@pytest.mark.parametrize('path, query', [
+    ('/api/reservations/availability', {'timeslot': TIMESLOT}),
+    ('/api/reservations/availability/range', {'start': TIMESLOT, 'end': '2031-03-01T21:00:00'}),
+    ('/api/reservations/availability/stream', {'date': '2031-03-01'}),
+])
+def test_availability_rejects_larger_party(client, max_seats, path, query):
+    response = client.get(path, query_string={**query, 'guests': max_seats + 1})
+    assert response.status_code == 400
+    assert f'more than {max_seats} guests' in response.get_json()['error']
@@ -0,0 +1,88 @@
+"""
+N+1 regression tests: the reservation listing, lookup and export must load
+customers in the same statement as the reservations
+Runs against an in-memory SQLite database migrated to the current schema
+"""
+
+import os
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['JOBS_IN_PROCESS'] = 'False'
+os.environ['RATE_LIMIT_ENABLED'] = 'False'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import app
+from config import Config
+from database.db_config import db, upgrade_db
+from database.models import book_table, get_reservation_by_id, get_reservations_page, iter_reservation_dicts
+
+LOCATION = Config.DEFAULT_LOCATION
+CUSTOMERS = 5
+FIRST_SLOT = datetime(2030, 6, 1, 17)
+# Only this module's bookings (other tests share the in-memory database)
+WINDOW = {'start': FIRST_SLOT, 'end': FIRST_SLOT + timedelta(days=1)}
+
+@pytest.fixture(scope='module')
+def reservation_ids():
+    """Migrate the database and book two reservations for each of several customers"""
+    upgrade_db(app)
+    ids = []
+    with app.app_context():
+        for number in range(CUSTOMERS * 2):
+            allocation = book_table(
+                LOCATION, f'Guest {number % CUSTOMERS}', f'guest{number % CUSTOMERS}@example.com', '', False,
+                FIRST_SLOT + timedelta(hours=number), timedelta(minutes=90), 2
+            )
+            ids.append(allocation[0])
+    return ids
+
+@pytest.fixture
+def session_context(reservation_ids):
+    """An app context with an empty session, so nothing is served from the identity map"""
+    with app.app_context():
+        db.session.remove()
+        yield
+
+@contextmanager
+def count_statements():
+    """Count the statements executed on the engine inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+def test_listing_page_is_one_statement(session_context):
+    with count_statements() as statements:
+        reservations, _ = get_reservations_page(LOCATION, Config.RESERVATIONS_PAGE_SIZE, **WINDOW)
+        pages = [reservation.to_dict() for reservation in reservations]
+
+    assert len(pages) == CUSTOMERS * 2
+    assert all(page['email'] for page in pages)
+    assert len(statements) == 1, statements
+
+def test_reservation_lookup_is_one_statement(session_context, reservation_ids):
+    with count_statements() as statements:
+        reservation = get_reservation_by_id(LOCATION, reservation_ids[-1]).to_dict()
+
+    assert reservation['email'] == f'guest{(CUSTOMERS * 2 - 1) % CUSTOMERS}@example.com'
+    assert len(statements) == 1, statements
+
+def test_export_is_one_statement(session_context):
+    with count_statements() as statements:
+        rows = list(iter_reservation_dicts(LOCATION, **WINDOW))
+
+    assert len(rows) == CUSTOMERS * 2
+    assert all(row['email'] for row in rows)
+    assert len(statements) == 1, statements
@@ -0,0 +1,63 @@
+"""
+Read-your-writes for cross-origin clients: a POST returns the primary pin as a
+Read-Primary-Until header, and a GET sending it back reads from the primary
+(the React app sends no cookies to the API)
+Runs against an in-memory SQLite database migrated to the current schema
+"""
+
+import os
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['JOBS_IN_PROCESS'] = 'False'
+os.environ['RATE_LIMIT_ENABLED'] = 'False'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import pytest
+
+import consistency
+from app import app
+from config import Config
+from database.db_config import upgrade_db
+
+@pytest.fixture(scope='module', autouse=True)
+def database():
+    upgrade_db(app)
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Enable replicas and record where each read-only request was routed (True: replica)"""
+    monkeypatch.setattr(Config, 'REPLICA_DATABASE_URL', 'sqlite://')
+    routed = []
+
+    def use_replica(replica=True):
+        routed.append(replica)
+        original(replica)
+
+    original = consistency.use_replica
+    monkeypatch.setattr(consistency, 'use_replica', use_replica)
+    return routed
+
+def test_get_after_post_reads_from_primary(reads):
+    # Like a cross-origin fetch: no cookie jar, only headers
+    client = app.test_client(use_cookies=False)
+    booking = client.post('/api/reservations', json={
+        'name': 'Writer', 'email': 'writer@example.com', 'timeslot': '2031-06-01T19:00:00', 'guests': 2
+    })
+    assert booking.status_code == 201
+    pin = booking.headers[consistency.HEADER]
+    reservation_id = booking.get_json()['reservation_id']
+
+    pinned = client.get(f'/api/reservations/{reservation_id}', headers={consistency.HEADER: pin})
+    unpinned = client.get(f'/api/reservations/{reservation_id}')
+
+    assert pinned.status_code == 200
+    assert pinned.get_json()['email'] == 'writer@example.com'
+    assert unpinned.status_code == 200
+    assert reads == [False, True]
+
+def test_cors_exposes_the_pin_header(reads):
+    response = app.test_client().post(
+        '/api/newsletter/signup', json={'email': 'reader@example.com'}, headers={'Origin': 'http://localhost:3000'}
+    )
+    assert response.status_code == 201
+    assert consistency.HEADER in response.headers['Access-Control-Expose-Headers']
@@ -0,0 +1,303 @@
+"""
+Request validation shared by the WSGI (app.py) and ASGI (asgi_app.py) servers
+Each helper returns cleaned values or raises ValidationError with the message
+that should be sent back with a 400 response
+"""
+
+from datetime import datetime, timedelta, timezone
+import base64
+import json
+
+from config import Config
+
+class ValidationError(ValueError):
+    """Raised when request data is missing or invalid"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+def parse_datetime(value, error_message):
+    """
+    Parse an ISO 8601 timestamp, accepting a trailing 'Z' for UTC
+    Returns a datetime or raises ValidationError(error_message)
+    """
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (ValueError, AttributeError):
+        raise ValidationError(error_message)
+
+def to_naive_utc(value):
+    """Convert a timezone-aware datetime to naive UTC; naive values are returned unchanged"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def parse_duration(value):
+    """
+    Parse an optional reservation length in minutes
+    Returns a timedelta (RESERVATION_MINUTES when value is empty)
+    """
+    if value is None or value == '':
+        return timedelta(minutes=Config.RESERVATION_MINUTES)
+
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError('Duration must be a number of minutes')
+
+    if minutes < Config.MIN_RESERVATION_MINUTES or minutes > Config.MAX_RESERVATION_MINUTES:
+        raise ValidationError(
+            f'Duration must be between {Config.MIN_RESERVATION_MINUTES} '
+            f'and {Config.MAX_RESERVATION_MINUTES} minutes'
+        )
+
+    return timedelta(minutes=minutes)
+
+def parse_interval(value):
+    """
+    Parse an optional slot interval in minutes
+    Returns a timedelta (30 minutes when value is empty)
+    """
+    if value is None or value == '':
+        return timedelta(minutes=30)
+
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError('Interval must be a number of minutes')
+
+    if minutes < 1 or minutes > 1440:
+        raise ValidationError('Interval must be between 1 and 1440 minutes')
+
+    return timedelta(minutes=minutes)
+
+def is_valid_email(email):
+    """Basic email format check"""
+    return '@' in email and '.' in email
+
+def validate_location(value):
+    """
+    Validate the location a request is for (a query or body parameter)
+    Returns the location, DEFAULT_LOCATION when absent
+    """
+    if value is None or value == '':
+        return Config.DEFAULT_LOCATION
+
+    if value not in Config.LOCATIONS:
+        raise ValidationError(f"Location must be one of: {', '.join(Config.LOCATIONS)}")
+
+    return value
+
+def validate_newsletter_signup(data):
+    """
+    Validate a newsletter signup body
+    Returns (email, name)
+    """
+    if not data or not isinstance(data.get('email'), str) or not data['email'].strip():
+        raise ValidationError('Email is required')
+
+    email = data['email'].strip()
+    name = data.get('name') or ''
+
+    if not isinstance(name, str):
+        raise ValidationError('Name must be a string')
+    name = name.strip()
+
+    if not is_valid_email(email):
+        raise ValidationError('Invalid email format')
+
+    return email, name
+
+def validate_reservation(data):
+    """
+    Validate a reservation body
+    Returns a dictionary with location, name, email, phone, timeslot (as sent),
+    reservation_datetime (naive UTC if sent with an offset), duration,
+    guests and newsletter_signup
+    """
+    if not data:
+        raise ValidationError('Name is required')
+
+    required_fields = ['name', 'email', 'timeslot', 'guests']
+    for field in required_fields:
+        if field not in data or not data[field]:
+            raise ValidationError(f'{field.capitalize()} is required')
+
+    name = data['name'].strip()
+    email = data['email'].strip()
+    phone = data.get('phone', '').strip()
+    timeslot = data['timeslot']
+    newsletter_signup = data.get('newsletter_signup', False)
+
+    try:
+        guests = int(data['guests'])
+    except (TypeError, ValueError) as e:
+        raise ValidationError(f'Invalid data format: {str(e)}')
+
+    if not is_valid_email(email):
+        raise ValidationError('Invalid email format')
+
+    if guests < 1 or guests > 20:
+        raise ValidationError('Number of guests must be between 1 and 20')
+
+    reservation_datetime = parse_datetime(timeslot, 'Invalid timeslot format')
+
+    if reservation_datetime < datetime.now(reservation_datetime.tzinfo or None):
+        raise ValidationError('Reservation must be in the future')
+
+    duration = parse_duration(data.get('duration'))
+
+    return {
+        'location': validate_location(data.get('location')),
+        'name': name,
+        'email': email,
+        'phone': phone,
+        'timeslot': timeslot,
+        'reservation_datetime': to_naive_utc(reservation_datetime),
+        'duration': duration,
+        'guests': guests,
+        'newsletter_signup': newsletter_signup
+    }
+
+def validate_availability_args(args):
+    """
+    Validate the query string of the single-slot availability check
+    Returns (timeslot as sent, parsed datetime, duration)
+    """
+    timeslot = args.get('timeslot')
+
+    if not timeslot:
+        raise ValidationError('Timeslot parameter is required')
+
+    reservation_datetime = to_naive_utc(parse_datetime(timeslot, 'Invalid timeslot format'))
+    return timeslot, reservation_datetime, parse_duration(args.get('duration'))
+
+def validate_party_size(args):
+    """
+    Validate the optional guests argument of an availability check
+    Returns the party size, or None when absent
+    """
+    guests = args.get('guests')
+    if not guests:
+        return None
+
+    try:
+        guests = int(guests)
+    except ValueError:
+        raise ValidationError('Guests must be a number')
+
+    if guests < 1 or guests > 20:
+        raise ValidationError('Number of guests must be between 1 and 20')
+
+    return guests
+
+def validate_party_fits(guests, floor_plan):
+    """
+    Check that a party of guests fits the largest table of a location's floor plan
+    (tables are not combined, so larger parties cannot be seated online; a location
+    without tables is left to answer that nothing is free)
+    Returns the party size
+    """
+    if guests is not None and 0 < floor_plan.max_seats < guests:
+        raise ValidationError(
+            f'Parties of more than {floor_plan.max_seats} guests cannot be booked online; '
+            'please contact the restaurant'
+        )
+
+    return guests
+
+def validate_availability_feed_args(args):
+    """
+    Validate the query string of the live availability stream
+    Returns (service day as a midnight datetime, interval, duration, guests)
+    """
+    date = args.get('date')
+
+    if not date:
+        raise ValidationError('Date parameter is required')
+
+    try:
+        day = datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        raise ValidationError('Date must be formatted as YYYY-MM-DD')
+
+    return day, parse_interval(args.get('interval')), parse_duration(args.get('duration')), validate_party_size(args)
+
+def parse_report_date(args, name):
+    """Parse a required YYYY-MM-DD query parameter into a date"""
+    value = args.get(name)
+
+    if not value:
+        raise ValidationError(f'{name.capitalize()} parameter is required')
+
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValidationError(f'{name.capitalize()} must be formatted as YYYY-MM-DD')
+
+def validate_report_range(args):
+    """
+    Validate the start and end dates of a report (both inclusive)
+    Returns (start, end) as dates
+    """
+    start = parse_report_date(args, 'start')
+    end = parse_report_date(args, 'end')
+
+    if end < start:
+        raise ValidationError('End must not be before start')
+
+    if (end - start).days + 1 > Config.MAX_REPORT_RANGE_DAYS:
+        raise ValidationError(f'Reports cover at most {Config.MAX_REPORT_RANGE_DAYS} days')
+
+    return start, end
+
+def encode_cursor(timeslot, reservation_id):
+    """Encode a keyset position as an opaque cursor"""
+    position = json.dumps([timeslot.isoformat(), reservation_id])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+def decode_cursor(cursor):
+    """Decode an opaque cursor back into a (timeslot, reservation_id) tuple"""
+    timeslot, reservation_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return datetime.fromisoformat(timeslot), int(reservation_id)
+
+def validate_listing_filters(args):
+    """
+    Validate the listing filters; start and end are converted to naive UTC like
+    the stored timeslots
+    Returns a dictionary with start, end, customer_id and email (None when absent)
+    """
+    try:
+        start = args.get('start')
+        end = args.get('end')
+        customer_id = args.get('customer_id')
+        return {
+            'start': to_naive_utc(datetime.fromisoformat(start.replace('Z', '+00:00'))) if start else None,
+            'end': to_naive_utc(datetime.fromisoformat(end.replace('Z', '+00:00'))) if end else None,
+            'customer_id': int(customer_id) if customer_id else None,
+            'email': args.get('email', '').strip() or None
+        }
+    except ValueError:
+        raise ValidationError('Invalid filter format')
+
+def validate_listing_page(args):
+    """
+    Validate the keyset pagination arguments
+    Returns (limit, after) where after is None for the first page
+    """
+    try:
+        limit = int(args.get('limit', Config.RESERVATIONS_PAGE_SIZE))
+    except ValueError:
+        raise ValidationError('Limit must be a number')
+
+    if limit < 1 or limit > Config.RESERVATIONS_MAX_PAGE_SIZE:
+        raise ValidationError(f'Limit must be between 1 and {Config.RESERVATIONS_MAX_PAGE_SIZE}')
+
+    cursor = args.get('cursor')
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except (ValueError, TypeError):
+        raise ValidationError('Invalid cursor')
+
+    return limit, after
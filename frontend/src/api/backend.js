@@ -0,0 +1,24 @@
+const backendUrl = import.meta.env.VITE_BACKEND_URL || 'http://localhost:5000/api';
+
+// Read-your-writes: after a booking or signup the backend answers with a
+// Read-Primary-Until header. Sending it back until then keeps this browser's
+// reads on the primary database instead of a lagging read replica (the
+// backend's cookie is not sent on cross-origin requests).
+const PIN_HEADER = 'Read-Primary-Until';
+const PIN_STORAGE_KEY = 'readPrimaryUntil';
+
+export const backendFetch = async (path, options = {}) => {
+  const headers = new Headers(options.headers);
+  const pinnedUntil = sessionStorage.getItem(PIN_STORAGE_KEY);
+  if (pinnedUntil && Number(pinnedUntil) * 1000 > Date.now()) {
+    headers.set(PIN_HEADER, pinnedUntil);
+  }
+
+  const response = await fetch(`${backendUrl}${path}`, { ...options, headers });
+
+  const pin = response.headers.get(PIN_HEADER);
+  if (pin) {
+    sessionStorage.setItem(PIN_STORAGE_KEY, pin);
+  }
+  return response;
+};
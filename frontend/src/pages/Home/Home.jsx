@@ -1,5 +1,6 @@
 import { useState } from 'react';
 import Footer from '../../components/Footer/Footer.jsx';
+import { backendFetch } from '../../api/backend.js';
 import './Home.css';
 import Navigation from "../../components/Navigation/Navigation.jsx";
 import galleryCafeInterior from "../../assets/images/gallery-cafe-interior.webp";
@@ -26,8 +27,7 @@ const Home = () => {
     }
 
     try {
-      const backendUrl = import.meta.env.VITE_BACKEND_URL || 'http://localhost:5000/api';
-      const response = await fetch(`${backendUrl}/newsletter/signup`, {
+      const response = await backendFetch('/newsletter/signup', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ email })
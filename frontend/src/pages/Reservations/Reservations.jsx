@@ -1,6 +1,7 @@
 import { useState } from 'react';
 import Navigation from '../../components/Navigation/Navigation.jsx';
 import Footer from '../../components/Footer/Footer.jsx';
+import { backendFetch } from '../../api/backend.js';
 import './Reservations.css';
 
 const Reservations = () => {
@@ -88,8 +89,6 @@ const Reservations = () => {
     }
 
     try {
-      const backendUrl = import.meta.env.VITE_BACKEND_URL || 'http://localhost:5000/api';
-
       // Combine date and time into timeslot format expected by backend
       const timeslot = `${formData.date}T${formData.time}:00`;
 
@@ -104,7 +103,7 @@ const Reservations = () => {
         specialRequests: formData.specialRequests
       };
 
-      const response = await fetch(`${backendUrl}/reservations`, {
+      const response = await backendFetch('/reservations', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify(requestBody)